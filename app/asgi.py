@@ -0,0 +1,15 @@
+"""
+ASGI config for app project.
+
+It exposes the ASGI callable as a module-level variable named ``application``,
+run it with e.g. ``uvicorn app.asgi:application``. Django 2.2 views are
+synchronous, core.asgi runs them in thread pools sized by the ASGI setting.
+"""
+
+import os
+
+from core.asgi import get_asgi_application
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'app.settings')
+
+application = get_asgi_application()
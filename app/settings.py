@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/2.2/ref/settings/
 """
 
 import os
+from importlib.util import find_spec
 
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -47,11 +48,16 @@ INSTALLED_APPS = [
     'user',
     'timetable',
     'journal',
+    'sync',
+    'job',
 ]
 
 CORS_ORIGIN_ALLOW_ALL = True
 
 MIDDLEWARE = [
+    'core.profiling.ProfilingMiddleware',
+    'core.compression.CompressionMiddleware',
+    'core.routers.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -84,21 +90,87 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'app.wsgi.application'
 
+# Thread pools of the ASGI entry point app.asgi: GET requests of READ_PATHS
+# run in READ_THREADS threads, other requests in THREADS threads. Every
+# thread may hold a database connection, keep the sum under the pool
+# MAX_SIZE
+ASGI = {
+    'THREADS': 6,
+    'READ_THREADS': 8,
+    'READ_PATHS': (
+        r'^/api/journal/journals/grid/$',
+        r'^/api/journal/marks/$',
+        r'^/api/timetable/week/$',
+        r'^/api/event/events/$',
+    ),
+}
+
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Connections are kept open in an in-process pool (core.db.pool) and
+# handed back to it at the end of every request. With the stock
+# 'django.db.backends.postgresql' engine set CONN_MAX_AGE instead to keep
+# one persistent connection per thread.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2',
+        'ENGINE': 'core.db.backends.postgresql_pool',
         'NAME': 'eljdb',
         'USER': 'dbuser',
         'PASSWORD': 'django123',
         'HOST': 'localhost',
         'PORT': '',
+        'CONN_MAX_AGE': 0,
+        'POOL': {
+            'MAX_SIZE': 20,
+            'TIMEOUT': 10,
+            'MAX_IDLE': 300,
+            'CHECK_AFTER': 30,
+        },
+    }
+}
+
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# Aliases of DATABASES entries replicating 'default', safe requests under
+# REPLICA_READ_PATHS read from them. Clients are pinned to the primary for
+# REPLICA_PIN_SECONDS after a write to read their own writes.
+DATABASE_REPLICAS = []
+REPLICA_READ_PATHS = ('/api/journal/', '/api/timetable/')
+REPLICA_PIN_SECONDS = 10
+# Browsers are pinned with a cookie, token clients through this cache. It
+# must be shared by all processes (e.g. memcached) when replicas are used
+REPLICA_PIN_CACHE_ALIAS = 'default'
+# Models read from the primary even on replica requests: tokens must work
+# right after login and unique job enqueues must see jobs just created
+REPLICA_PRIMARY_MODELS = ('authtoken.token', 'job.job')
+
+
+# Cache
+# https://docs.djangoproject.com/en/2.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
 
+# Cache storing journal reference data responses, point it at a cache
+# shared by all processes (e.g. memcached) in production
+JOURNAL_CACHE_ALIAS = 'default'
+
+# Statistics of journal.analytics, students are flagged at risk when their
+# average, attendance rate or weekly grade trend falls below the thresholds
+JOURNAL_ANALYTICS = {
+    'PERCENTILES': (25, 50, 75, 90),
+    'ROLLING_WINDOW': 4,
+    'MIN_GRADES': 3,
+    'AT_RISK_AVERAGE': 3.0,
+    'AT_RISK_ATTENDANCE': 0.8,
+    'AT_RISK_SLOPE': -0.1,
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -138,4 +210,127 @@ USE_TZ = True
 
 STATIC_URL = '/static/'
 
+# Uploaded job input and generated job result files
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+MEDIA_URL = '/media/'
+
+# Background jobs of the job app, DatabaseBroker leaves them to
+# "manage.py run_jobs" workers, job.brokers.ThreadBroker runs them in the
+# web process without a separate worker
+JOB_QUEUE = {
+    'BROKER': 'job.brokers.DatabaseBroker',
+    'OPTIONS': {},
+    'POLL_INTERVAL': 1,
+    # Running jobs without a heartbeat for STALE_AFTER seconds are failed
+    'HEARTBEAT_INTERVAL': 10,
+    'STALE_AFTER': 60,
+}
+
 AUTH_USER_MODEL = 'core.User'
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.KeysetPagination',
+    'PAGE_SIZE': 100,
+    'DEFAULT_RENDERER_CLASSES': [
+        'rest_framework.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'rest_framework.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# MessagePack bodies with "Accept: application/msgpack" and
+# "Content-Type: application/msgpack" when msgpack is installed
+if find_spec('msgpack') is not None:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'].append(
+        'core.renderers.MessagePackRenderer')
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'].append(
+        'core.parsers.MessagePackParser')
+
+# Response compression of core.compression.CompressionMiddleware, brotli
+# is used only when the brotli package is installed
+COMPRESSION = {
+    'MIN_SIZE': 1024,
+    'GZIP_LEVEL': 6,
+    'BROTLI_QUALITY': 5,
+    'ENCODINGS': ('br', 'gzip'),
+}
+
+# /api/sync/ returns at most PAGE_SIZE objects of every kind per call and
+# looks LAG_SECONDS back past the previous cursor for rows of transactions
+# committed late
+SYNC = {
+    'PAGE_SIZE': 1000,
+    'LAG_SECONDS': 5,
+}
+
+# Upper bound for the page_size query parameter of list endpoints
+MAX_PAGE_SIZE = 1000
+
+# Request profiling of core.profiling.ProfilingMiddleware, BUDGETS maps
+# "<view>.<action>" to the number of queries the endpoint may run, token
+# and teaching scope cache misses included
+PROFILING = {
+    'HEADERS': DEBUG,
+    'BUDGETS': {
+        'JournalAPIView.list': 2,
+        'JournalAPIView.grid': 3,
+        'MarkViewSet.list': 2,
+        'StudentViewSet.list': 2,
+        'WeekAPIView.get': 3,
+        'DashboardView.get': 8,
+        'ManageUserView.get': 3,
+    },
+    'DEFAULT_BUDGET': None,
+    'RAISE_ON_BUDGET': False,
+}
+
+# Tests fail requests exceeding their PROFILING budget
+TEST_RUNNER = 'core.testing.BudgetTestRunner'
+
+# Sizes of /api/user/dashboard/ sections, CONCURRENCY threads build the
+# sections in parallel when not inside a transaction and not on SQLite.
+# At most MAX_THREADS such threads run in the process, requests finding
+# none free build their sections sequentially. Each thread holds a database
+# connection besides those of request threads, keep the sum under the pool
+# MAX_SIZE
+DASHBOARD = {
+    'EVENTS': 10,
+    'MARKS': 20,
+    'CONCURRENCY': 4,
+    'MAX_THREADS': 4,
+}
+
+# Month study years start in, marks are partitioned by study year on
+# PostgreSQL, see "manage.py partition_marks". Queries read only the
+# partitions of the year=, date_from= and date_to= filters given, journal
+# and mark lists without them read the current study year
+STUDY_YEAR_START_MONTH = 9
+
+# Longest start-end range of event occurrences one request may expand
+EVENT_MAX_RANGE_DAYS = 366
+
+# Per user cache of core.scope teaching scopes, subjects a teacher teaches
+# and the class ids of each
+TEACHING_SCOPE_CACHE = {
+    'CACHE_ALIAS': 'default',
+    'TIMEOUT': 60 * 60,
+}
+
+# Token to user cache of core.authentication.CachedTokenAuthentication,
+# CACHE_ALIAS names a cache shared between processes. Without it a deleted
+# token or a deactivated user is dropped at once only by the process that
+# made the change, other processes accept them until their copy expires
+# after LOCAL_TTL seconds. Set CACHE_ALIAS when running more than one
+# worker process: every process then checks its local copy against a user
+# version kept in the shared cache on each request and copies live TTL
+# seconds.
+TOKEN_AUTH_CACHE = {
+    'MAX_SIZE': 1024,
+    'TTL': 60,
+    'LOCAL_TTL': 5,
+    'CACHE_ALIAS': None,
+}
@@ -16,10 +16,16 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from core.views import ProfilingStatsView
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/user/', include('user.urls')),
     path('api/event/', include('event.urls')),
     path('api/timetable/', include('timetable.urls')),
     path('api/journal/', include('journal.urls')),
+    path('api/sync/', include('sync.urls')),
+    path('api/job/', include('job.urls')),
+    path('api/internal/profiling/', ProfilingStatsView.as_view(),
+         name='profiling'),
 ]
@@ -14,3 +14,5 @@ admin.site.register(models.StudentClass)
 admin.site.register(models.Student)
 admin.site.register(models.TeacherSubject)
 admin.site.register(models.School)
+admin.site.register(models.MarkSummary)
+admin.site.register(models.Tombstone)
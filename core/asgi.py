@@ -0,0 +1,160 @@
+import asyncio
+import io
+import re
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+
+
+def get_config():
+    """Return ASGI configuration with defaults applied"""
+    config = {
+        'THREADS': 6,
+        'READ_THREADS': 8,
+        'READ_PATHS': (),
+    }
+    config.update(getattr(settings, 'ASGI', {}))
+
+    return config
+
+
+def build_environ(scope, body):
+    """Return WSGI environ of the ASGI HTTP request scope"""
+    server = scope.get('server') or ('localhost', 80)
+    root_path = scope.get('root_path', '')
+    path = scope['path']
+    if root_path and path.startswith(root_path):
+        path = path[len(root_path):]
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': root_path.encode().decode('latin-1'),
+        # WSGI passes the raw path bytes as latin-1 text
+        'PATH_INFO': path.encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': True,
+        'wsgi.run_once': False,
+    }
+    if scope.get('client'):
+        environ['REMOTE_ADDR'] = scope['client'][0]
+        environ['REMOTE_PORT'] = str(scope['client'][1])
+    for name, value in scope.get('headers', ()):
+        name = name.decode('latin-1').upper().replace('-', '_')
+        value = value.decode('latin-1')
+        if name == 'CONTENT_LENGTH':
+            continue
+        if name != 'CONTENT_TYPE':
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+
+    return environ
+
+
+class ASGIHandler:
+    """ASGI application serving Django 2.2 views from thread pools, the
+    event loop holds waiting clients and GET requests of READ_PATHS run
+    in a pool of their own, so that slow reads do not hold up writes"""
+
+    def __init__(self):
+        config = get_config()
+        self.wsgi = WSGIHandler()
+        self.executor = ThreadPoolExecutor(config['THREADS'],
+                                           thread_name_prefix='asgi')
+        self.read_executor = ThreadPoolExecutor(
+            config['READ_THREADS'], thread_name_prefix='asgi-read')
+        self.read_paths = [re.compile(pattern)
+                           for pattern in config['READ_PATHS']]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            raise ValueError(f"Unsupported ASGI scope {scope['type']}")
+
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.get_executor(scope), self.respond,
+                                   build_environ(scope, body), send, loop)
+
+    def get_executor(self, scope):
+        """Return thread pool the request runs in"""
+        if scope['method'] in ('GET', 'HEAD') and any(
+                pattern.match(scope['path']) for pattern in self.read_paths):
+            return self.read_executor
+
+        return self.executor
+
+    async def read_body(self, receive):
+        """Return request body, None if the client went away"""
+        body = []
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                return None
+            body.append(message.get('body', b''))
+            if not message.get('more_body'):
+                return b''.join(body)
+
+    async def lifespan(self, receive, send):
+        """Answer server startup and shutdown"""
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown()
+                self.read_executor.shutdown()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    def respond(self, environ, send, loop):
+        """Run the request in this thread sending the response through
+        the event loop as it is produced"""
+        def send_message(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        started = []
+
+        def start_response(status, headers, exc_info=None):
+            started[:] = [{
+                'type': 'http.response.start',
+                'status': int(status.split(' ', 1)[0]),
+                'headers': [(name.lower().encode('latin-1'),
+                             value.encode('latin-1'))
+                            for name, value in headers],
+            }]
+
+        response = self.wsgi(environ, start_response)
+        try:
+            send_message(started[0])
+            for chunk in response:
+                if chunk:
+                    send_message({'type': 'http.response.body',
+                                  'body': chunk, 'more_body': True})
+            send_message({'type': 'http.response.body', 'body': b''})
+        finally:
+            # Ends the request, releasing its database connections
+            response.close()
+
+
+def get_asgi_application():
+    """Set up Django and return the ASGI application"""
+    import django
+    django.setup(set_prefix=False)
+
+    return ASGIHandler()
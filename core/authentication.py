@@ -0,0 +1,155 @@
+import copy
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+
+
+class TokenCache:
+    """Process local LRU mapping token keys to users for a limited time"""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return cached user and its version for the token key or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            user, version, expires = entry
+            if expires <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+
+            return user, version
+
+    def set(self, key, user, version=None):
+        """Cache user for the token key evicting least recently used"""
+        with self._lock:
+            self._entries[key] = (user, version,
+                                  time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Forget the token key"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_user(self, user_id):
+        """Forget all token keys of the user"""
+        with self._lock:
+            for key, (user, version, expires) in list(self._entries.items()):
+                if user.pk == user_id:
+                    del self._entries[key]
+
+    def clear(self):
+        """Forget all token keys"""
+        with self._lock:
+            self._entries.clear()
+
+
+def _get_config():
+    """Return token cache configuration with defaults applied"""
+    config = {'MAX_SIZE': 1024, 'TTL': 60, 'LOCAL_TTL': 5,
+              'CACHE_ALIAS': None}
+    config.update(getattr(settings, 'TOKEN_AUTH_CACHE', {}))
+
+    return config
+
+
+def _get_ttl(config):
+    """Return seconds local copies are used, without a shared cache other
+    processes learn of changes only when their copies expire"""
+    if config['CACHE_ALIAS']:
+        return config['TTL']
+
+    return min(config['TTL'], config['LOCAL_TTL'])
+
+
+_config = _get_config()
+token_cache = TokenCache(_config['MAX_SIZE'], _get_ttl(_config))
+
+
+def get_shared_cache():
+    """Return the cache shared between processes if one is configured"""
+    alias = _get_config()['CACHE_ALIAS']
+
+    return caches[alias] if alias else None
+
+
+def shared_cache_key(key):
+    """Return the shared cache key for the token key"""
+    return f'auth-token:{key}'
+
+
+def user_version_key(user_id):
+    """Return the shared cache key of the user version"""
+    return f'auth-user-version:{user_id}'
+
+
+def forget_tokens(keys, user_ids=()):
+    """Remove token keys from the local and the shared cache, and make
+    copies of the users cached by other processes stale"""
+    keys = list(keys)
+    for key in keys:
+        token_cache.delete(key)
+    shared = get_shared_cache()
+    if shared is None:
+        return
+    if keys:
+        shared.delete_many([shared_cache_key(key) for key in keys])
+    for user_id in user_ids:
+        shared.set(user_version_key(user_id), uuid.uuid4().hex,
+                   timeout=None)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Token authentication remembering recently seen tokens"""
+
+    def authenticate_credentials(self, key):
+        """Return user of the token looking in caches before the database,
+        local copies are checked against the user version in the shared
+        cache"""
+        shared = get_shared_cache()
+        entry = token_cache.get(key)
+        if entry is not None and shared is not None and \
+                shared.get(user_version_key(entry[0].pk)) != entry[1]:
+            entry = None
+
+        if entry is not None:
+            user = entry[0]
+        else:
+            user = None
+            if shared is not None:
+                user = shared.get(shared_cache_key(key))
+            if user is None:
+                user, token = super().authenticate_credentials(key)
+                if shared is not None:
+                    shared.set(shared_cache_key(key), user,
+                               timeout=_get_config()['TTL'])
+            version = None
+            if shared is not None:
+                version = shared.get(user_version_key(user.pk))
+            token_cache.set(key, user, version)
+
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+
+        user = copy.copy(user)
+        token = self.get_model()(key=key, user=user)
+
+        return (user, token)
@@ -0,0 +1,64 @@
+import time
+
+from django.core.management.base import CommandError
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from core.models import User
+
+
+def percentile(values, share):
+    """Return nearest-rank percentile of the values"""
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, round(share * len(ordered)) - 1))
+
+    return ordered[index]
+
+
+def timed(func, iterations):
+    """Call the function repeatedly, return milliseconds of every call"""
+    timings = []
+    for iteration in range(iterations):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+
+    return timings
+
+
+def summarize(timings):
+    """Return median, 95th percentile and mean of the timings"""
+    return {
+        'p50_ms': percentile(timings, 0.5),
+        'p95_ms': percentile(timings, 0.95),
+        'mean_ms': sum(timings) / len(timings),
+    }
+
+
+def get_user(email=None):
+    """Return active user requests are made by, a teacher if possible"""
+    users = User.objects.filter(is_active=True)
+    if email:
+        users = users.filter(email=email)
+    user = users.filter(day__isnull=False).first() or users.first()
+    if user is None:
+        raise CommandError('No user to run requests as, '
+                           'run generate_school first')
+
+    return user
+
+
+def get_client(user):
+    """Return test client authenticated with token of the user"""
+    token, created = Token.objects.get_or_create(user=user)
+
+    return Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+
+
+def read_response(client, url):
+    """Make request and read the whole response"""
+    response = client.get(url)
+    if response.streaming:
+        b''.join(response.streaming_content)
+
+    return response
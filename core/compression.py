@@ -0,0 +1,162 @@
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+COMPRESSIBLE_TYPES = {
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/msgpack',
+    'application/x-ndjson',
+}
+
+
+def get_config():
+    """Return response compression configuration with defaults applied"""
+    config = {
+        'MIN_SIZE': 1024,
+        'GZIP_LEVEL': 6,
+        'BROTLI_QUALITY': 5,
+        'ENCODINGS': ('br', 'gzip'),
+    }
+    config.update(getattr(settings, 'COMPRESSION', {}))
+
+    return config
+
+
+def _gzip_compressor(config):
+    """Return compressor object writing gzip container"""
+    return zlib.compressobj(config['GZIP_LEVEL'], zlib.DEFLATED, 31)
+
+
+def compress_gzip(data, config):
+    """Return data compressed with gzip"""
+    compressor = _gzip_compressor(config)
+
+    return compressor.compress(data) + compressor.flush()
+
+
+def iter_gzip(chunks, config):
+    """Yield gzip compressed stream of the chunks"""
+    compressor = _gzip_compressor(config)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_brotli(data, config):
+    """Return data compressed with brotli"""
+    return brotli.compress(data, quality=config['BROTLI_QUALITY'])
+
+
+def iter_brotli(chunks, config):
+    """Yield brotli compressed stream of the chunks"""
+    compressor = brotli.Compressor(quality=config['BROTLI_QUALITY'])
+    for chunk in chunks:
+        data = compressor.process(chunk)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+CODECS = {
+    'gzip': (compress_gzip, iter_gzip),
+    'br': (compress_brotli, iter_brotli),
+}
+
+
+def available_encodings(config):
+    """Return supported encodings in the order of preference"""
+    return [
+        encoding for encoding in config['ENCODINGS']
+        if encoding in CODECS and (encoding != 'br' or brotli is not None)
+    ]
+
+
+def choose_encoding(accept_encoding, encodings):
+    """Return the encoding client accepts with the highest quality,
+    ties are broken by the order of encodings"""
+    qualities = {}
+    for item in accept_encoding.split(','):
+        name, *params = [part.strip() for part in item.split(';')]
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if name:
+            qualities[name.lower()] = quality
+
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, qualities.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+
+    return best
+
+
+def is_compressible(content_type):
+    """Tell whether responses of the content type are worth compressing"""
+    media_type = content_type.split(';')[0].strip().lower()
+
+    return media_type.startswith('text/') \
+        or media_type in COMPRESSIBLE_TYPES \
+        or media_type.endswith(('+json', '+xml'))
+
+
+class CompressionMiddleware:
+    """Compress responses with brotli or gzip as the client accepts"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if response.has_header('Content-Encoding') or \
+                response.status_code in (204, 206, 304) or \
+                not is_compressible(response.get('Content-Type', '')):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        config = get_config()
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            available_encodings(config),
+        )
+        if encoding is None:
+            return response
+
+        compress, iter_compress = CODECS[encoding]
+        if response.streaming:
+            response.streaming_content = iter_compress(
+                response.streaming_content, config)
+            del response['Content-Length']
+        else:
+            if len(response.content) < config['MIN_SIZE']:
+                return response
+            content = compress(response.content, config)
+            if len(content) >= len(response.content):
+                return response
+            response.content = content
+            response['Content-Length'] = str(len(content))
+
+        # Compressed body differs byte by byte, see RFC 7232 section 2.1
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+
+        return response
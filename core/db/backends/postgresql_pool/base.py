@@ -0,0 +1,40 @@
+from django.db.backends.base.base import NO_DB_ALIAS
+from django.db.backends.postgresql import base
+
+from core.db.backends.postgresql_pool.creation import DatabaseCreation
+from core.db.pool import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """PostgreSQL backend borrowing connections from an in-process pool"""
+    creation_class = DatabaseCreation
+    _pool = None
+
+    def get_new_connection(self, conn_params):
+        """Take connection from the pool instead of opening one"""
+        if self.alias == NO_DB_ALIAS:
+            # Short lived connections for creating databases are not pooled
+            return super().get_new_connection(conn_params)
+
+        self._pool = get_pool(self.alias, conn_params,
+                              self.settings_dict.get('POOL', {}))
+        connection = self._pool.getconn()
+
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+
+        return connection
+
+    def _close(self):
+        """Give connection back to the pool instead of closing it"""
+        if self.connection is None or self._pool is None:
+            return super()._close()
+
+        with self.wrap_database_errors:
+            self._pool.putconn(self.connection)
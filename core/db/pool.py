@@ -0,0 +1,206 @@
+import threading
+import time
+from collections import deque
+
+try:
+    import psycopg2
+    from psycopg2 import extensions
+except ImportError:
+    # Pools are only created by the pool backend, which needs psycopg2,
+    # get_stats() works without it
+    psycopg2 = extensions = None
+
+
+class PoolTimeout(psycopg2.OperationalError if psycopg2 else Exception):
+    """Raised when no pooled connection frees up in time"""
+
+
+class ConnectionPool:
+    """Thread-safe pool of open psycopg2 connections"""
+
+    def __init__(self, conn_params, max_size=10, timeout=10,
+                 max_idle=300, check_after=30):
+        self.conn_params = conn_params
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.check_after = check_after
+
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self._counters = {
+            'created': 0,
+            'discarded': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_ms': 0.0,
+            'max_wait_time_ms': 0.0,
+        }
+
+    def getconn(self):
+        """Return a healthy connection, open one if the pool allows"""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+
+        while True:
+            with self._condition:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(
+                            f'No connection available in {self.timeout}s, '
+                            f'all {self.max_size} are in use')
+                    waited = True
+                    self._condition.wait(remaining)
+
+                if self._idle:
+                    connection, returned = self._idle.pop()
+                else:
+                    connection, returned = None, None
+                    self._size += 1
+                self._in_use += 1
+
+            if connection is None:
+                try:
+                    connection = psycopg2.connect(**self.conn_params)
+                except Exception:
+                    self._release(None)
+                    raise
+                with self._condition:
+                    self._counters['created'] += 1
+            elif not self._is_healthy(connection, returned):
+                self._release(connection)
+                continue
+
+            self._record_checkout(time.monotonic() - started, waited)
+
+            return connection
+
+    def putconn(self, connection):
+        """Return connection to the pool, discard it if broken"""
+        discard = bool(connection.closed)
+        if not discard:
+            try:
+                status = connection.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    connection.rollback()
+            except psycopg2.Error:
+                discard = True
+
+        if discard:
+            self._release(connection)
+            return
+
+        with self._condition:
+            self._in_use -= 1
+            self._idle.append((connection, time.monotonic()))
+            self._condition.notify()
+
+    def closeall(self):
+        """Close idle connections"""
+        with self._condition:
+            idle, self._idle = self._idle, deque()
+            self._size -= len(idle)
+            self._condition.notify_all()
+        for connection, returned in idle:
+            self._close(connection)
+
+    def stats(self):
+        """Return pool usage figures"""
+        with self._condition:
+            return {
+                'size': self._size,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'max_size': self.max_size,
+                **self._counters,
+            }
+
+    def _is_healthy(self, connection, returned):
+        """Check connection idle for a while still works"""
+        if connection.closed:
+            return False
+        idle = time.monotonic() - returned
+        if idle > self.max_idle:
+            return False
+        if idle > self.check_after:
+            try:
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            except psycopg2.Error:
+                return False
+
+        return True
+
+    def _release(self, connection):
+        """Forget checked out connection and close it"""
+        with self._condition:
+            self._size -= 1
+            self._in_use -= 1
+            if connection is not None:
+                self._counters['discarded'] += 1
+            self._condition.notify()
+        if connection is not None:
+            self._close(connection)
+
+    def _close(self, connection):
+        """Close connection ignoring errors of broken ones"""
+        try:
+            connection.close()
+        except psycopg2.Error:
+            pass
+
+    def _record_checkout(self, wait, waited):
+        """Update checkout counters"""
+        wait_ms = wait * 1000
+        with self._condition:
+            self._counters['checkouts'] += 1
+            self._counters['wait_time_ms'] += wait_ms
+            if waited:
+                self._counters['waits'] += 1
+            self._counters['max_wait_time_ms'] = max(
+                self._counters['max_wait_time_ms'], wait_ms)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, conn_params, options):
+    """Return pool of the database alias creating it on first use"""
+    key = (alias, repr(sorted(conn_params.items())))
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                conn_params,
+                max_size=options.get('MAX_SIZE', 10),
+                timeout=options.get('TIMEOUT', 10),
+                max_idle=options.get('MAX_IDLE', 300),
+                check_after=options.get('CHECK_AFTER', 30),
+            )
+            _pools[key] = pool
+
+    return pool
+
+
+def close_idle(alias):
+    """Close idle connections of all pools of the database alias"""
+    with _pools_lock:
+        pools = [pool for (pool_alias, params), pool in _pools.items()
+                 if pool_alias == alias]
+    for pool in pools:
+        pool.closeall()
+
+
+def get_stats():
+    """Return usage figures of all pools by database alias"""
+    with _pools_lock:
+        pools = list(_pools.items())
+
+    return {alias: pool.stats() for (alias, params), pool in pools}
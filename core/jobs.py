@@ -0,0 +1,10 @@
+from core.models import MarkSummary
+from job.registry import register
+
+
+@register('core.rebuild_mark_summaries')
+def rebuild_mark_summaries(job):
+    """Recompute per student and subject mark summaries from scratch"""
+    MarkSummary.objects.rebuild()
+
+    return {'summaries': MarkSummary.objects.count()}
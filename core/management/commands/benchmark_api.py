@@ -0,0 +1,140 @@
+import json
+import platform
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core.benchmark import (
+    get_client,
+    get_user,
+    percentile,
+    read_response,
+    timed,
+)
+from core.models import Mark, Student
+from core.profiling import QueryRecorder
+
+
+class Command(BaseCommand):
+    """Measure latency, queries and memory of API endpoints"""
+    help = 'Benchmark every API endpoint against the current database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--teacher', help='Email of the user to act as')
+        parser.add_argument('--output', help='Write results to JSON file')
+        parser.add_argument('--compare', help='JSON results of earlier run')
+
+    def handle(self, *args, **options):
+        client = get_client(get_user(options['teacher']))
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, url in self.get_endpoints().items():
+                results[name] = self.measure(client, url,
+                                             options['iterations'])
+                self.report(name, results[name])
+
+        run = {
+            'meta': {
+                'created': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'python': platform.python_version(),
+                'iterations': options['iterations'],
+                'marks': Mark.objects.count(),
+                'students': Student.objects.count(),
+            },
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump(run, stream, indent=2)
+        if options['compare']:
+            self.compare(options['compare'], results)
+
+    def get_endpoints(self):
+        """Return endpoint URLs by name, filled with existing data"""
+        mark = Mark.objects.select_related(
+            'student__student_class', 'subject').order_by('-date').first()
+        if mark is None:
+            raise CommandError('No marks found, run generate_school first')
+
+        student_class = mark.student.student_class
+        journal = f'student_class={student_class.name}' \
+                  f'&subject={mark.subject.name}'
+        student = f'student={mark.student_id}&subject={mark.subject_id}'
+
+        return {
+            'journal': f'/api/journal/journals/?{journal}',
+            'journal compact': f'/api/journal/journals/?{journal}&compact=1',
+            'journal grid': f'/api/journal/journals/grid/?{journal}',
+            'journal export': f'/api/journal/journals/export/?{journal}',
+            'marks': '/api/journal/marks/',
+            'marks of student': f'/api/journal/marks/?{student}',
+            'mark summaries': '/api/journal/mark_summaries/'
+                              f'?student_class={student_class.id}',
+            'students': '/api/journal/students/'
+                        f'?student_class={student_class.name}',
+            'student classes': '/api/journal/student_classes/',
+            'subjects': '/api/journal/subjects/',
+            'study years': '/api/journal/study_years/',
+            'school': '/api/journal/school/',
+            'lessons': '/api/timetable/lessons/',
+            'days': '/api/timetable/days/',
+            'week': '/api/timetable/week/',
+            'events': '/api/event/events/',
+            'me': '/api/user/me/',
+        }
+
+    def measure(self, client, url, iterations):
+        """Return latency, query and memory figures of the endpoint"""
+        response = read_response(client, url)
+        timings = timed(lambda: read_response(client, url), iterations)
+
+        queries = QueryRecorder()
+        with connection.execute_wrapper(queries):
+            read_response(client, url)
+
+        tracemalloc.start()
+        read_response(client, url)
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        return {
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': percentile(timings, 0.5),
+            'p95_ms': percentile(timings, 0.95),
+            'queries': queries.count,
+            'peak_memory_kb': peak / 1024,
+        }
+
+    def report(self, name, result):
+        """Print measurements of the endpoint"""
+        line = (f"{name:<20} {result['status']} "
+                f"p50 {result['p50_ms']:8.2f} ms  "
+                f"p95 {result['p95_ms']:8.2f} ms  "
+                f"{result['queries']:4} queries  "
+                f"{result['peak_memory_kb']:10.1f} KiB")
+        if result['status'] >= 400:
+            self.stdout.write(self.style.ERROR(line))
+        else:
+            self.stdout.write(line)
+
+    def compare(self, path, results):
+        """Print changes against results of an earlier run"""
+        with open(path) as stream:
+            previous = json.load(stream)['results']
+
+        self.stdout.write(self.style.MIGRATE_HEADING(f'Compared to {path}'))
+        for name, result in results.items():
+            if name not in previous:
+                continue
+            before = previous[name]
+            self.stdout.write(
+                f"{name:<20} p95 {before['p95_ms']:8.2f} -> "
+                f"{result['p95_ms']:8.2f} ms  "
+                f"queries {before['queries']} -> {result['queries']}")
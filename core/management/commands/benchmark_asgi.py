@@ -0,0 +1,192 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.core.handlers.wsgi import WSGIHandler
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core.asgi import ASGIHandler, build_environ, get_config
+from core.benchmark import summarize
+from core.models import Mark, User
+
+
+class Command(BaseCommand):
+    """Compare the threaded WSGI setup with the ASGI entry point under
+    many concurrent teachers"""
+    help = ('Simulate concurrent teachers reading the journal grid, marks, '
+            'timetable week and events through WSGI and ASGI handlers')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clients', type=int, default=500,
+                            help='Concurrent simulated teachers')
+        parser.add_argument('--requests', type=int, default=5,
+                            help='Requests per teacher')
+        parser.add_argument('--wsgi-threads', type=int,
+                            help='WSGI worker threads, by default as many '
+                                 'as both ASGI pools together')
+        parser.add_argument('--output', help='Write results to JSON file')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The benchmark needs a PostgreSQL database')
+
+        config = get_config()
+        threads = options['wsgi_threads'] or \
+            config['THREADS'] + config['READ_THREADS']
+        clients = self.get_clients(options['clients'])
+        urls = self.get_urls()
+
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for mode in ('wsgi', 'asgi'):
+                results[mode] = asyncio.run(self.run(
+                    mode, clients, urls, options['requests'], threads))
+                self.report(mode, results[mode])
+
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump({
+                    'created': timezone.now().isoformat(),
+                    'clients': len(clients),
+                    'requests': options['requests'],
+                    'wsgi_threads': threads,
+                    'asgi': config,
+                    'results': results,
+                }, stream, indent=2)
+
+    def get_clients(self, count):
+        """Return token keys of teachers, reused when there are fewer
+        teachers than clients"""
+        users = list(User.objects.filter(is_active=True, day__isnull=False)
+                     .distinct().order_by('id')[:count])
+        if not users:
+            raise CommandError('No teachers found, run generate_school first')
+        keys = [Token.objects.get_or_create(user=user)[0].key
+                for user in users]
+
+        return [keys[number % len(keys)] for number in range(count)]
+
+    def get_urls(self):
+        """Return (name, path, query) of requests teachers make"""
+        mark = Mark.objects.select_related(
+            'student__student_class', 'subject').order_by('-date').first()
+        if mark is None:
+            raise CommandError('No marks found, run generate_school first')
+        start = mark.date - timedelta(days=mark.date.weekday())
+        journal = f'student_class={mark.student.student_class.name}' \
+                  f'&subject={mark.subject.name}'
+
+        return [
+            ('grid', '/api/journal/journals/grid/', journal),
+            ('marks', '/api/journal/marks/',
+             f'student_class={mark.student.student_class_id}'),
+            ('week', '/api/timetable/week/', ''),
+            ('events', '/api/event/events/',
+             f'start={start}&end={start + timedelta(days=7)}'),
+            ('me', '/api/user/me/', ''),
+        ]
+
+    async def run(self, mode, clients, urls, requests, threads):
+        """Run requests of all clients at once, return throughput and
+        latencies by request name"""
+        if mode == 'asgi':
+            handler = ASGIHandler()
+            call = handler
+        else:
+            pool = ThreadPoolExecutor(threads, thread_name_prefix='wsgi')
+            call = self.wsgi_caller(WSGIHandler(), pool)
+        timings = {name: [] for name, path, query in urls}
+        errors = []
+
+        async def client(number, key):
+            for request in range(requests):
+                name, path, query = urls[(number + request) % len(urls)]
+                scope = {
+                    'type': 'http', 'method': 'GET', 'path': path,
+                    'query_string': query.encode(),
+                    'headers': [(b'host', b'testserver'),
+                                (b'authorization', f'Token {key}'.encode())],
+                }
+                start = time.perf_counter()
+                status = await self.request(call, scope)
+                timings[name].append((time.perf_counter() - start) * 1000)
+                if status != 200:
+                    errors.append(f'{name} {status}')
+
+        start = time.perf_counter()
+        await asyncio.gather(*(client(number, key)
+                               for number, key in enumerate(clients)))
+        elapsed = time.perf_counter() - start
+        if mode == 'asgi':
+            handler.executor.shutdown()
+            handler.read_executor.shutdown()
+        else:
+            pool.shutdown()
+        if errors:
+            raise CommandError(f'{len(errors)} requests failed: {errors[0]}')
+
+        every = [timing for values in timings.values() for timing in values]
+
+        return {
+            'requests_per_second': len(every) / elapsed,
+            **summarize(every),
+            'endpoints': {name: summarize(values)
+                          for name, values in timings.items()},
+        }
+
+    def wsgi_caller(self, handler, pool):
+        """Return ASGI style callable running requests in WSGI worker
+        threads, each holding its thread for the whole request"""
+        def respond(environ):
+            statuses = []
+
+            def start_response(status, headers, exc_info=None):
+                statuses.append(int(status.split(' ', 1)[0]))
+
+            response = handler(environ, start_response)
+            try:
+                for chunk in response:
+                    pass
+            finally:
+                response.close()
+
+            return statuses[0]
+
+        async def call(scope, receive, send):
+            await receive()
+            status = await asyncio.get_running_loop().run_in_executor(
+                pool, respond, build_environ(scope, b''))
+            await send({'type': 'http.response.start', 'status': status})
+
+        return call
+
+    async def request(self, call, scope):
+        """Make the request, return response status"""
+        statuses = []
+
+        async def receive():
+            return {'type': 'http.request', 'body': b''}
+
+        async def send(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        await call(scope, receive, send)
+
+        return statuses[0]
+
+    def report(self, mode, result):
+        """Print figures of the mode"""
+        self.stdout.write(
+            f"{mode}  {result['requests_per_second']:8.1f} req/s  "
+            f"p50 {result['p50_ms']:8.1f} ms  "
+            f"p95 {result['p95_ms']:8.1f} ms")
+        for name, timings in result['endpoints'].items():
+            self.stdout.write(f"  {name:<7} p50 {timings['p50_ms']:8.1f} ms  "
+                              f"p95 {timings['p95_ms']:8.1f} ms")
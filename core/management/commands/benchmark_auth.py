@@ -0,0 +1,84 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from core.authentication import token_cache
+from core.benchmark import (
+    get_client,
+    get_user,
+    read_response,
+    summarize,
+    timed,
+)
+from core.profiling import QueryRecorder
+
+
+ENDPOINTS = {
+    'study years': '/api/journal/study_years/',
+    'me': '/api/user/me/',
+}
+
+
+class Command(BaseCommand):
+    """Compare authenticated request rates with and without token cache"""
+    help = 'Measure requests per second with and without the token cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--teacher', help='Email of the user to act as')
+        parser.add_argument('--output', help='Write results to JSON file')
+
+    def handle(self, *args, **options):
+        client = get_client(get_user(options['teacher']))
+        results = {}
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for name, url in ENDPOINTS.items():
+                read_response(client, url)
+                for cached in (False, True):
+                    label = f"{name} {'cached' if cached else 'uncached'}"
+                    results[label] = self.measure(client, url, cached,
+                                                  options['requests'])
+                    self.report(label, results[label])
+
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump({
+                    'created': timezone.now().isoformat(),
+                    'database': connection.vendor,
+                    'results': results,
+                }, stream, indent=2)
+
+    def measure(self, client, url, cached, requests):
+        """Return request rate, latency and queries of the endpoint, the
+        token cache is emptied before every uncached request"""
+        def request():
+            if not cached:
+                token_cache.clear()
+            read_response(client, url)
+
+        start = time.perf_counter()
+        timings = timed(request, requests)
+        elapsed = time.perf_counter() - start
+
+        queries = QueryRecorder()
+        with connection.execute_wrapper(queries):
+            request()
+
+        return {
+            'url': url,
+            'requests_per_second': requests / elapsed,
+            'queries': queries.count,
+            **summarize(timings),
+        }
+
+    def report(self, name, result):
+        """Print measurements of the endpoint"""
+        self.stdout.write(
+            f"{name:<22} {result['requests_per_second']:8.1f} req/s  "
+            f"p50 {result['p50_ms']:7.2f} ms  "
+            f"p95 {result['p95_ms']:7.2f} ms  "
+            f"{result['queries']} queries")
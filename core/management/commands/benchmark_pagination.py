@@ -0,0 +1,125 @@
+import json
+import math
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.pagination import LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.benchmark import (
+    get_client,
+    get_user,
+    read_response,
+    summarize,
+    timed,
+)
+from core.models import Mark, StudyYear
+from core.pagination import MarkPagination
+from journal.serializers import MarkListSerializer
+
+
+CLASSES = 10
+SUBJECTS = 10
+WEEKS = 34
+MARKS_PER_WEEK = 2
+
+
+class Command(BaseCommand):
+    """Compare keyset and offset pagination of marks as the table grows"""
+    help = 'Grow the mark table with generate_school and time mark pages'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[10000, 100000, 1000000, 10000000],
+                            help='Mark table sizes to measure at')
+        parser.add_argument('--page-size', type=int, default=100)
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--output', help='Write results to JSON file')
+
+    def handle(self, *args, **options):
+        page_size = options['page_size']
+        results = []
+        for size in sorted(options['sizes']):
+            self.grow(size)
+            marks = Mark.objects.count()
+            client = get_client(get_user())
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                timings = self.measure(client, marks, page_size,
+                                       options['iterations'])
+            results.append({'marks': marks, 'timings': timings})
+            for name, timing in timings.items():
+                self.stdout.write(
+                    f"{marks:>10} marks  {name:<14} "
+                    f"p50 {timing['p50_ms']:8.2f} ms  "
+                    f"p95 {timing['p95_ms']:8.2f} ms")
+
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump({
+                    'created': timezone.now().isoformat(),
+                    'page_size': page_size,
+                    'results': results,
+                }, stream, indent=2)
+
+    def grow(self, size):
+        """Generate study years of marks until the table holds size rows"""
+        missing = size - Mark.objects.count()
+        if missing <= 0:
+            return
+
+        per_student = SUBJECTS * WEEKS * MARKS_PER_WEEK
+        first_year = StudyYear.objects.aggregate(first=Min('year'))['first']
+        call_command(
+            'generate_school',
+            start_year=(first_year or timezone.now().year) - 1,
+            classes=CLASSES,
+            students=math.ceil(missing / (CLASSES * per_student)),
+            subjects=SUBJECTS,
+            weeks=WEEKS,
+            marks_per_week=MARKS_PER_WEEK,
+            teachers=1,
+            stdout=self.stdout,
+        )
+
+    def measure(self, client, marks, page_size, iterations):
+        """Return timings of first, middle and last pages of marks, offset
+        pages run the count and slice queries of LimitOffsetPagination
+        without the HTTP round trip"""
+        ordered = Mark.objects.order_by(*MarkPagination.ordering)
+        url = f'/api/journal/marks/?page_size={page_size}'
+        paginator = MarkPagination()
+        middle = marks // 2
+        last = max(marks - page_size, 0)
+
+        def keyset(offset):
+            position = ordered.values_list(*paginator.ordering)[offset]
+            cursor = paginator.make_cursor(False, position)
+
+            return lambda: read_response(client, f'{url}&cursor={cursor}')
+
+        def offset_page(offset):
+            request = Request(APIRequestFactory().get(
+                '/', {'limit': page_size, 'offset': offset}))
+            values = ordered.values(*MarkListSerializer.values_fields)
+
+            return lambda: MarkListSerializer(
+                LimitOffsetPagination().paginate_queryset(values, request),
+                many=True,
+            ).data
+
+        pages = {
+            'keyset first': lambda: read_response(client, url),
+            'keyset middle': keyset(middle),
+            'keyset last': keyset(last),
+            'offset middle': offset_page(middle),
+            'offset last': offset_page(last),
+        }
+
+        return {
+            name: summarize(timed(page, iterations))
+            for name, page in pages.items()
+        }
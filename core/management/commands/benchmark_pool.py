@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils import timezone
+
+from core.benchmark import summarize
+from core.db.pool import get_stats
+from core.models import StudyYear
+
+
+MODES = {
+    'connect': ('django.db.backends.postgresql', 0),
+    'persistent': ('django.db.backends.postgresql', None),
+    'pool': ('core.db.backends.postgresql_pool', 0),
+}
+
+
+class Command(BaseCommand):
+    """Load test database connection handling under concurrency"""
+    help = ('Run concurrent short requests opening a connection each, '
+            'keeping persistent connections and borrowing from the pool')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=20)
+        parser.add_argument('--requests', type=int, default=100,
+                            help='Requests per thread')
+        parser.add_argument('--pool-size', type=int, default=10)
+        parser.add_argument('--modes', nargs='+', choices=sorted(MODES),
+                            default=list(MODES))
+        parser.add_argument('--output', help='Write results to JSON file')
+
+    def handle(self, *args, **options):
+        settings_dict = connections.databases[DEFAULT_DB_ALIAS]
+        if connections[DEFAULT_DB_ALIAS].vendor != 'postgresql':
+            raise CommandError('The load test needs a PostgreSQL database')
+
+        results = {}
+        for mode in options['modes']:
+            engine, max_age = MODES[mode]
+            alias = f'benchmark_{mode}'
+            connections.databases[alias] = {
+                **settings_dict,
+                'ENGINE': engine,
+                'CONN_MAX_AGE': max_age,
+                'POOL': {**settings_dict.get('POOL', {}),
+                         'MAX_SIZE': options['pool_size']},
+            }
+            connections.ensure_defaults(alias)
+            try:
+                results[mode] = self.run(alias, options['threads'],
+                                         options['requests'])
+            finally:
+                del connections.databases[alias]
+            if mode == 'pool':
+                results[mode]['pool'] = get_stats().get(alias)
+            self.report(mode, results[mode])
+
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump({
+                    'created': timezone.now().isoformat(),
+                    'threads': options['threads'],
+                    'requests': options['requests'],
+                    'pool_size': options['pool_size'],
+                    'results': results,
+                }, stream, indent=2)
+
+    def run(self, alias, threads, requests):
+        """Run requests in threads, return latency figures"""
+        timings = []
+        errors = []
+        lock = threading.Lock()
+
+        def worker():
+            connection = connections[alias]
+            local = []
+            try:
+                for number in range(requests):
+                    start = time.perf_counter()
+                    list(StudyYear.objects.using(alias)[:10])
+                    # What request_finished does at the end of a request
+                    connection.close_if_unusable_or_obsolete()
+                    local.append((time.perf_counter() - start) * 1000)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connection.close()
+                with lock:
+                    timings.extend(local)
+
+        workers = [threading.Thread(target=worker) for i in range(threads)]
+        start = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - start
+        if errors:
+            raise CommandError(f'{len(errors)} threads failed: {errors[0]}')
+
+        return {
+            'requests_per_second': len(timings) / elapsed,
+            **summarize(timings),
+        }
+
+    def report(self, mode, result):
+        """Print figures of the mode"""
+        line = (f"{mode:<11} {result['requests_per_second']:8.1f} req/s  "
+                f"p50 {result['p50_ms']:7.2f} ms  "
+                f"p95 {result['p95_ms']:7.2f} ms")
+        pool = result.get('pool')
+        if pool:
+            line += (f"  {pool['created']} connections, "
+                     f"{pool['waits']} waits, "
+                     f"max wait {pool['max_wait_time_ms']:.1f} ms")
+        self.stdout.write(line)
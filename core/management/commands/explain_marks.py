@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Min
+
+from core.models import Mark, Student
+
+
+class Command(BaseCommand):
+    """Print query plans of the hot mark lookups"""
+    help = 'Print EXPLAIN output for the journal and marks queries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--analyze', action='store_true',
+                            help='Execute queries and report real timings')
+
+    def handle(self, *args, **options):
+        mark = Mark.objects.select_related('student__student_class',
+                                           'subject').first()
+        if mark is None:
+            self.stderr.write('No marks in the database')
+            return
+
+        date_from = Mark.objects.filter(subject=mark.subject) \
+            .aggregate(date=Min('date'))['date']
+        queries = {
+            'marks by student and subject': Mark.objects.filter(
+                student=mark.student, subject=mark.subject),
+            'marks by student, subject and date': Mark.objects.filter(
+                student=mark.student, subject=mark.subject,
+                date__gte=date_from),
+            'marks by subject and date': Mark.objects.filter(
+                subject=mark.subject, date__gte=date_from),
+            'journal by class and subject name': Mark.objects.for_journal(
+                mark.student.student_class.name, mark.subject.name),
+            'students by class name': Student.objects.filter(
+                student_class__name=mark.student.student_class.name),
+            'marks page by date': Mark.objects.order_by('date', 'id')[:100],
+        }
+
+        explain_options = {'analyze': True} if options['analyze'] else {}
+        for title, queryset in queries.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(title))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
@@ -0,0 +1,165 @@
+import datetime
+import random
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import (
+    User,
+    Lesson,
+    Day,
+    StudyYear,
+    Subject,
+    Mark,
+    MarkSummary,
+    StudentClass,
+    Student,
+    TeacherSubject,
+    School,
+)
+from journal import cache
+
+
+SUBJECT_NAMES = ('Math', 'Physics', 'Chemistry', 'Biology', 'History',
+                 'Geography', 'Literature', 'English', 'Informatics', 'Art')
+MARK_WEIGHTS = {'PRE': 30, 'ABS': 5, 'TWO': 3, 'THR': 12, 'FOU': 25,
+                'FIV': 25}
+
+
+class Command(BaseCommand):
+    """Fill the database with a synthetic school"""
+    help = 'Generate study years, classes, students, marks and timetables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=int, default=1,
+                            help='Number of study years')
+        parser.add_argument('--start-year', type=int,
+                            default=datetime.date.today().year - 1)
+        parser.add_argument('--classes', type=int, default=4,
+                            help='Classes per study year')
+        parser.add_argument('--students', type=int, default=30,
+                            help='Students per class')
+        parser.add_argument('--subjects', type=int, default=8,
+                            help='Subjects per study year')
+        parser.add_argument('--weeks', type=int, default=34,
+                            help='Weeks with marks per study year')
+        parser.add_argument('--marks-per-week', type=int, default=2,
+                            help='Marks per student and subject a week')
+        parser.add_argument('--teachers', type=int, default=10)
+        parser.add_argument('--lessons-per-day', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+
+        with transaction.atomic():
+            School.objects.get_or_create(name='Synthetic school', defaults={
+                'address': 'Generated', 'phone': '000'})
+            teachers = self.create_teachers(options)
+            marks = 0
+            for grade in range(1, options['years'] + 1):
+                marks += self.create_year(grade, teachers, options)
+            MarkSummary.objects.rebuild()
+        cache.invalidate(StudyYear, Subject, StudentClass, Student, School,
+                         Mark)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {len(teachers)} teachers and {marks} marks, '
+            f'teacher password is "password"'))
+
+    def create_teachers(self, options):
+        """Create teachers with a weekly timetable"""
+        password = make_password('password')
+        first = User.objects.count()
+        User.objects.bulk_create(
+            User(email=f'teacher{first + number}@example.com',
+                 name=f'Teacher {first + number}', password=password)
+            for number in range(options['teachers'])
+        )
+        teachers = list(User.objects.order_by('-id')[:options['teachers']])
+
+        for teacher in teachers:
+            Lesson.objects.bulk_create(
+                Lesson(subject_name=self.random.choice(SUBJECT_NAMES),
+                       number=number, cabinet=str(100 + number),
+                       time=f'{8 + number}:00', class_name='1A',
+                       teacher=teacher)
+                for code, name in Day.DAYS_OF_THE_WEEK
+                for number in range(1, options['lessons_per_day'] + 1)
+            )
+            lessons = list(Lesson.objects.filter(teacher=teacher)
+                           .order_by('id').values_list('id', flat=True))
+            per_day = options['lessons_per_day']
+            for index, (code, name) in enumerate(Day.DAYS_OF_THE_WEEK):
+                day = Day.objects.create(day_of_week=code, teacher=teacher)
+                day.lessons.set(lessons[index * per_day:(index + 1) * per_day])
+
+        return teachers
+
+    def bulk_create(self, model, objs):
+        """Insert objects in batches without building them all at once"""
+        objs = iter(objs)
+        while True:
+            batch = list(islice(objs, self.batch_size))
+            if not batch:
+                break
+            model.objects.bulk_create(batch)
+
+    def create_year(self, grade, teachers, options):
+        """Create classes, subjects, students and marks of a study year"""
+        year = options['start_year'] + grade - 1
+        study_year = StudyYear.objects.create(year=year)
+        StudentClass.objects.bulk_create(
+            StudentClass(name=f'{grade}{chr(65 + number % 26)}',
+                         study_year=study_year)
+            for number in range(options['classes'])
+        )
+        Subject.objects.bulk_create(
+            Subject(name=SUBJECT_NAMES[number % len(SUBJECT_NAMES)],
+                    study_year=study_year)
+            for number in range(options['subjects'])
+        )
+        classes = list(StudentClass.objects.filter(study_year=study_year))
+        subjects = list(Subject.objects.filter(study_year=study_year))
+
+        for teacher in teachers:
+            subject = TeacherSubject.objects.create(
+                name=self.random.choice(subjects).name)
+            subject.student_classes.set(
+                self.random.sample(classes, min(2, len(classes))))
+            teacher.teaching_subjects.add(subject)
+
+        self.bulk_create(Student, (
+            Student(name=f'Name {number}', surname=f'Surname {number}',
+                    lastname='Generated', birth_date=datetime.date(
+                        year - 10, 1 + number % 12, 1 + number % 28),
+                    address='Generated', phone='000',
+                    student_class=student_class)
+            for student_class in classes
+            for number in range(options['students'])
+        ))
+        students = Student.objects.filter(student_class__in=classes) \
+            .values_list('id', flat=True)
+
+        start = datetime.date(year, 9, 1)
+        dates = [
+            start + datetime.timedelta(weeks=week, days=day)
+            for week in range(options['weeks'])
+            for day in range(options['marks_per_week'])
+        ]
+        codes = list(MARK_WEIGHTS)
+        weights = list(MARK_WEIGHTS.values())
+        marks = (
+            Mark(student_id=student, subject=subject, date=date,
+                 value=self.random.choices(codes, weights)[0])
+            for student in students.iterator()
+            for subject in subjects
+            for date in dates
+        )
+        self.bulk_create(Mark, marks)
+
+        return len(students) * len(subjects) * len(dates)
@@ -0,0 +1,73 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core import partitions
+from core.models import StudyYear
+
+
+class Command(BaseCommand):
+    """Maintain study year partitions of marks"""
+    help = 'Create partitions of upcoming study years and archive closed ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ahead', type=int, default=1,
+                            help='Study years after the current one '
+                                 'to create partitions for')
+        parser.add_argument('--archive-before', type=int, metavar='YEAR',
+                            help='Make partitions of study years before '
+                                 'YEAR read-only')
+        parser.add_argument('--unarchive', type=int, metavar='YEAR',
+                            help='Allow changes of the study year again')
+        parser.add_argument('--tablespace',
+                            help='Tablespace to move archived partitions to')
+
+    def handle(self, *args, **options):
+        try:
+            partitions.check_support(connection)
+        except partitions.PartitioningError as error:
+            raise CommandError(error)
+
+        current = StudyYear.year_of(timezone.localdate())
+        with transaction.atomic(), connection.cursor() as cursor:
+            if not partitions.is_partitioned(cursor):
+                raise CommandError('Marks are not partitioned, '
+                                   'run migrations first')
+
+            for year in range(current, current + options['ahead'] + 1):
+                if partitions.create_partition(cursor, year):
+                    self.stdout.write(f'Created partition of {year}')
+
+            if options['archive_before'] is not None:
+                if options['archive_before'] > current:
+                    raise CommandError('The current study year is not closed')
+                for partition in partitions.get_partitions(cursor):
+                    year = self.get_year(partition['name'])
+                    if year is None or partition['archived'] or \
+                            year >= options['archive_before']:
+                        continue
+                    partitions.archive_partition(cursor, year,
+                                                 options['tablespace'])
+                    self.stdout.write(f'Archived partition of {year}')
+
+            if options['unarchive'] is not None:
+                partitions.unarchive_partition(cursor, options['unarchive'])
+                self.stdout.write(
+                    f'Unarchived partition of {options["unarchive"]}')
+
+            for partition in partitions.get_partitions(cursor):
+                state = 'archived' if partition['archived'] else 'active'
+                self.stdout.write(
+                    f"{partition['name']:<20} {state:<9} "
+                    f"~{max(partition['rows'], 0):>10} rows  "
+                    f"{partition['bounds']}")
+
+    def get_year(self, name):
+        """Return study year of the partition or None for the default"""
+        prefix = partitions.partition_name('')
+        if not name.startswith(prefix):
+            return None
+        try:
+            return int(name[len(prefix):])
+        except ValueError:
+            return None
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from core.models import MarkSummary
+
+
+class Command(BaseCommand):
+    """Rebuild mark summaries from all marks"""
+    help = 'Recompute per student and subject mark summaries from scratch'
+
+    def handle(self, *args, **options):
+        MarkSummary.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {MarkSummary.objects.count()} mark summaries'))
@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_school'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='studentclass',
+            name='name',
+            field=models.CharField(db_index=True, max_length=12),
+        ),
+        migrations.AlterField(
+            model_name='subject',
+            name='name',
+            field=models.CharField(db_index=True, max_length=255),
+        ),
+        migrations.AddIndex(
+            model_name='mark',
+            index=models.Index(fields=['student', 'subject', 'date'], name='core_mark_student_6aeaef_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mark',
+            index=models.Index(fields=['subject', 'date'], name='core_mark_subject_f70eb4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='mark',
+            index=models.Index(fields=['date', 'id'], name='core_mark_date_d0dfbd_idx'),
+        ),
+    ]
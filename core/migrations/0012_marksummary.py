@@ -0,0 +1,33 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_mark_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarkSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pre_count', models.PositiveIntegerField(default=0)),
+                ('abs_count', models.PositiveIntegerField(default=0)),
+                ('two_count', models.PositiveIntegerField(default=0)),
+                ('thr_count', models.PositiveIntegerField(default=0)),
+                ('fou_count', models.PositiveIntegerField(default=0)),
+                ('fiv_count', models.PositiveIntegerField(default=0)),
+                ('average', models.FloatField(null=True)),
+                ('last_date', models.DateField(null=True)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mark_summaries', to='core.Student')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Subject')),
+            ],
+            options={
+                'unique_together': {('student', 'subject')},
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:20
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_sync_tracking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64)),
+                ('params', models.TextField(default='{}')),
+                ('status', models.CharField(choices=[('PEN', 'Ожидает'), ('RUN', 'Выполняется'), ('DON', 'Готово'), ('FAI', 'Ошибка')], default='PEN', max_length=3)),
+                ('progress', models.PositiveSmallIntegerField(default=0)),
+                ('message', models.CharField(blank=True, max_length=255)),
+                ('result', models.TextField(blank=True)),
+                ('input_file', models.FileField(blank=True, upload_to='jobs/input/')),
+                ('result_file', models.FileField(blank=True, upload_to='jobs/result/')),
+                ('error', models.TextField(blank=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='job',
+            index=models.Index(fields=['status', 'created_at'], name='core_job_status_38dcf0_idx'),
+        ),
+    ]
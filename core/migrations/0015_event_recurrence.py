@@ -0,0 +1,32 @@
+# Generated by Django 2.2.28 on 2026-10-18 11:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='recurrence',
+            field=models.CharField(choices=[('NON', 'Не повторяется'), ('DAI', 'Ежедневно'), ('WEE', 'Еженедельно'), ('MON', 'Ежемесячно')], default='NON', max_length=3),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_interval',
+            field=models.PositiveSmallIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='recurrence_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='event',
+            index=models.Index(fields=['teacher', 'date'], name='core_event_teacher_d04515_idx'),
+        ),
+    ]
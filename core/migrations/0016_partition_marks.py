@@ -0,0 +1,96 @@
+import datetime
+
+from django.conf import settings
+from django.db import migrations
+
+
+# Snapshot of core.partitions at the time of this migration, so that later
+# changes to that module or to models do not change what it does
+TABLE = 'core_mark'
+DEFAULT_PARTITION = 'core_mark_default'
+
+
+def year_of(date):
+    """Return study year the date belongs to"""
+    month = getattr(settings, 'STUDY_YEAR_START_MONTH', 9)
+
+    return date.year if date.month >= month else date.year - 1
+
+
+def date_range(year):
+    """Return first day of the study year and of the next one"""
+    month = getattr(settings, 'STUDY_YEAR_START_MONTH', 9)
+
+    return datetime.date(year, month, 1), datetime.date(year + 1, month, 1)
+
+
+def partition_marks(apps, schema_editor):
+    """Partition marks by study year on PostgreSQL"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT relkind FROM pg_class '
+                       'WHERE oid = %s::regclass', [TABLE])
+        if cursor.fetchone()[0] == 'p':
+            return
+
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [TABLE])
+        sequence = cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT indexdef FROM pg_indexes
+            WHERE schemaname = current_schema() AND tablename = %s
+            AND indexname NOT IN (
+                SELECT conname FROM pg_constraint
+                WHERE conrelid = %s::regclass AND contype IN ('p', 'u'))
+        ''', [TABLE, TABLE])
+        indexes = [row[0] for row in cursor.fetchall()]
+        cursor.execute('''
+            SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+            WHERE conrelid = %s::regclass AND contype = 'f'
+        ''', [TABLE])
+        foreign_keys = cursor.fetchall()
+
+        old = f'{TABLE}_unpartitioned'
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY NONE')
+        cursor.execute(f'ALTER TABLE {TABLE} RENAME TO {old}')
+        cursor.execute(
+            f'CREATE TABLE {TABLE} (LIKE {old} INCLUDING DEFAULTS '
+            f'INCLUDING CONSTRAINTS) PARTITION BY RANGE (date)')
+        cursor.execute(f'CREATE TABLE {DEFAULT_PARTITION} '
+                       f'PARTITION OF {TABLE} DEFAULT')
+
+        cursor.execute(f'SELECT min(date), max(date), current_date '
+                       f'FROM {old}')
+        first, last, today = cursor.fetchone()
+        first_year = year_of(first or today)
+        last_year = max(year_of(last or today), year_of(today) + 1)
+        for year in range(first_year, last_year + 1):
+            start, end = date_range(year)
+            cursor.execute(
+                f'CREATE TABLE {TABLE}_y{year} PARTITION OF {TABLE} '
+                f'FOR VALUES FROM (%s) TO (%s)', [start, end])
+
+        cursor.execute(f'INSERT INTO {TABLE} SELECT * FROM {old}')
+        cursor.execute(f'DROP TABLE {old}')
+
+        # The partition key has to be part of the primary key
+        cursor.execute(f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey '
+                       f'PRIMARY KEY (id, date)')
+        for definition in indexes:
+            cursor.execute(definition)
+        for name, definition in foreign_keys:
+            cursor.execute(
+                f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}')
+        cursor.execute(f'ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_event_recurrence'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_marks, migrations.RunPython.noop),
+    ]
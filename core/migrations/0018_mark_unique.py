@@ -0,0 +1,64 @@
+# Generated by Django 2.2.28 on 2026-10-18 12:08
+
+from django.db import migrations, models
+from django.db.models import Avg, Case, Count, FloatField, Max, Q, When
+
+
+VALUES = ('PRE', 'ABS', 'TWO', 'THR', 'FOU', 'FIV')
+GRADES = {'TWO': 2, 'THR': 3, 'FOU': 4, 'FIV': 5}
+
+
+def remove_duplicate_marks(apps, schema_editor):
+    """Keep the latest mark of each student, subject and date, and
+    recompute the summaries that counted the others"""
+    Mark = apps.get_model('core', 'Mark')
+    MarkSummary = apps.get_model('core', 'MarkSummary')
+    duplicates = Mark.objects.order_by() \
+        .values('student_id', 'subject_id', 'date') \
+        .annotate(count=Count('id'), keep=Max('id')) \
+        .filter(count__gt=1)
+
+    pairs = set()
+    for row in list(duplicates):
+        Mark.objects.filter(
+            student_id=row['student_id'],
+            subject_id=row['subject_id'],
+            date=row['date'],
+        ).exclude(id=row['keep']).delete()
+        pairs.add((row['student_id'], row['subject_id']))
+
+    aggregates = {
+        f'{value.lower()}_count': Count('id', filter=Q(value=value))
+        for value in VALUES
+    }
+    aggregates['average'] = Avg(Case(
+        *[When(value=value, then=grade) for value, grade in GRADES.items()],
+        output_field=FloatField(),
+    ))
+    aggregates['last_date'] = Max('date')
+    for student_id, subject_id in pairs:
+        MarkSummary.objects.filter(student_id=student_id,
+                                   subject_id=subject_id).update(
+            **Mark.objects.filter(student_id=student_id,
+                                  subject_id=subject_id)
+            .aggregate(**aggregates))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_job_heartbeat'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_marks,
+                             migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='mark',
+            name='core_mark_student_6aeaef_idx',
+        ),
+        migrations.AddConstraint(
+            model_name='mark',
+            constraint=models.UniqueConstraint(fields=('student', 'subject', 'date'), name='core_mark_student_subject_date'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_mark_unique'),
+        ('job', '0001_initial'),
+    ]
+
+    # The table stays, job.Job owns it now
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.DeleteModel(
+                name='Job',
+            ),
+        ]),
+    ]
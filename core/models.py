@@ -1,10 +1,14 @@
-from django.db import models
+import datetime
+
+from django.db import connections, models, transaction
+from django.db.models import Avg, Case, Count, FloatField, Max, Q, When
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
     PermissionsMixin,
 )
 from django.conf import settings
+from django.utils import timezone
 from django.utils.translation import gettext as _
 
 
@@ -50,13 +54,33 @@ class User(AbstractBaseUser, PermissionsMixin):
 
 class Event(models.Model):
     """Event object to be used in app"""
+    ONCE = 'NON'
+    DAILY = 'DAI'
+    WEEKLY = 'WEE'
+    MONTHLY = 'MON'
+    RECURRENCES = (
+        (ONCE, _('Не повторяется')),
+        (DAILY, _('Ежедневно')),
+        (WEEKLY, _('Еженедельно')),
+        (MONTHLY, _('Ежемесячно')),
+    )
     title = models.CharField(max_length=255)
     description = models.TextField()
     date = models.DateTimeField()
+    recurrence = models.CharField(max_length=3, choices=RECURRENCES,
+                                  default=ONCE)
+    recurrence_interval = models.PositiveSmallIntegerField(default=1)
+    recurrence_until = models.DateTimeField(null=True, blank=True)
     teacher = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['teacher', 'date']),
+        ]
 
     def __str__(self):
         return self.title
@@ -73,6 +97,7 @@ class Lesson(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.subject_name
@@ -94,6 +119,7 @@ class Day(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return self.day_of_week
@@ -103,19 +129,106 @@ class StudyYear(models.Model):
     """Study year to be used in class and subject"""
     year = models.PositiveIntegerField()
 
+    @staticmethod
+    def date_range(year):
+        """Return first day of the study year and of the next one"""
+        month = getattr(settings, 'STUDY_YEAR_START_MONTH', 9)
+
+        return datetime.date(year, month, 1), datetime.date(year + 1, month, 1)
+
+    @staticmethod
+    def year_of(date):
+        """Return study year the date belongs to"""
+        month = getattr(settings, 'STUDY_YEAR_START_MONTH', 9)
+
+        return date.year if date.month >= month else date.year - 1
+
     def __str__(self):
         return str(self.year)
 
 
 class Subject(models.Model):
     """Subject to be used for students"""
-    name = models.CharField(max_length=255)
+    name = models.CharField(max_length=255, db_index=True)
     study_year = models.ForeignKey('StudyYear', on_delete=models.CASCADE)
 
     def __str__(self):
         return f'{self.name} - {self.study_year}'
 
 
+class MarkQuerySet(models.QuerySet):
+
+    def for_journal(self, student_class, subject):
+        """Filter marks of a class in a subject, both given by name"""
+        return self.filter(student__student_class__name=student_class,
+                           subject__name=subject)
+
+    def in_study_year(self, year):
+        """Filter marks of the study year by date, so that PostgreSQL
+        reads only the partition of that year"""
+        start, end = StudyYear.date_range(year)
+
+        return self.filter(date__gte=start, date__lt=end)
+
+    def upsert(self, values, batch_size=1000):
+        """Set values of marks keyed by (student id, subject id, date),
+        creating missing ones, return the marks"""
+        now = timezone.now()
+        connection = connections[self.db]
+        if connection.vendor != 'postgresql':
+            return self._update_or_create(values, now)
+
+        table = self.model._meta.db_table
+        marks = []
+        rows = list(values.items())
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                cursor.execute(f"""
+                    INSERT INTO {table}
+                        (student_id, subject_id, date, value, updated_at)
+                    VALUES {', '.join(['(%s, %s, %s, %s, %s)'] * len(batch))}
+                    ON CONFLICT (student_id, subject_id, date) DO UPDATE
+                    SET value = EXCLUDED.value,
+                        updated_at = EXCLUDED.updated_at
+                    RETURNING id, student_id, subject_id, date, value
+                """, [param for (student_id, subject_id, date), value in batch
+                      for param in (student_id, subject_id, date, value, now)])
+                marks.extend(
+                    self.model(id=mark_id, student_id=student_id,
+                               subject_id=subject_id, date=date, value=value,
+                               updated_at=now)
+                    for mark_id, student_id, subject_id, date, value
+                    in cursor.fetchall())
+
+        return marks
+
+    def _update_or_create(self, values, now):
+        """Upsert marks with separate queries, for databases writing one
+        transaction at a time"""
+        student_ids, subject_ids, dates = map(set, zip(*values))
+        marks = {}
+        with transaction.atomic(using=self.db):
+            for mark in self.filter(student_id__in=student_ids,
+                                    subject_id__in=subject_ids,
+                                    date__in=dates):
+                key = (mark.student_id, mark.subject_id, mark.date)
+                if key in values:
+                    mark.value = values[key]
+                    mark.updated_at = now
+                    marks[key] = mark
+            self.bulk_update(marks.values(), ['value', 'updated_at'])
+            new_marks = [
+                self.model(student_id=student_id, subject_id=subject_id,
+                           date=date, value=value, updated_at=now)
+                for (student_id, subject_id, date), value in values.items()
+                if (student_id, subject_id, date) not in marks
+            ]
+            self.bulk_create(new_marks)
+
+        return list(marks.values()) + new_marks
+
+
 class Mark(models.Model):
     """Mark to be used in journal for students"""
     MARK_VALUES = (
@@ -126,19 +239,139 @@ class Mark(models.Model):
         ('FOU', _('4')),
         ('FIV', _('5')),
     )
+    GRADES = {'TWO': 2, 'THR': 3, 'FOU': 4, 'FIV': 5}
     value = models.CharField(max_length=3, choices=MARK_VALUES, default='PRE')
     date = models.DateField()
     subject = models.ForeignKey('Subject', on_delete=models.CASCADE)
     student = models.ForeignKey('Student', on_delete=models.CASCADE,
                                 related_name='marks')
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
+
+    objects = MarkQuerySet.as_manager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'subject', 'date'],
+                                    name='core_mark_student_subject_date'),
+        ]
+        indexes = [
+            models.Index(fields=['subject', 'date']),
+            models.Index(fields=['date', 'id']),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember loaded values to find out what changed on save"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+
+        return instance
 
     def __str__(self):
         return f'{self.value} - {self.date} - {self.subject} - {self.student}'
 
 
+class PendingRefresh:
+    """Summaries to refresh once the transaction commits"""
+
+    def __init__(self, manager):
+        self.manager = manager
+        self.pairs = set()
+
+    def __call__(self):
+        self.manager.refresh(self.pairs)
+
+
+class MarkSummaryManager(models.Manager):
+
+    def schedule_refresh(self, pairs):
+        """Refresh summaries of (student id, subject id) pairs once the
+        transaction commits, pairs scheduled in one transaction are
+        refreshed together and dropped with it on rollback"""
+        connection = connections[self.db]
+        for savepoints, callback in connection.run_on_commit:
+            if isinstance(callback, PendingRefresh):
+                callback.pairs.update(pairs)
+                return
+
+        pending = PendingRefresh(self)
+        pending.pairs.update(pairs)
+        transaction.on_commit(pending, using=self.db)
+
+    def refresh(self, pairs):
+        """Recompute summaries for given (student id, subject id) pairs"""
+        pairs = set(pairs)
+        if not pairs:
+            return
+
+        student_ids, subject_ids = map(set, zip(*pairs))
+        marks = Mark.objects.filter(student_id__in=student_ids,
+                                    subject_id__in=subject_ids)
+        with transaction.atomic():
+            # Refreshes of a student wait for each other, so that they do
+            # not insert the same summary twice
+            list(Student.objects.select_for_update()
+                 .filter(id__in=student_ids).order_by('id')
+                 .values_list('id', flat=True))
+            self.filter(student_id__in=student_ids,
+                        subject_id__in=subject_ids).delete()
+            self.bulk_create(self._aggregate(marks))
+
+    def rebuild(self):
+        """Recompute summaries of all marks from scratch"""
+        with transaction.atomic():
+            self.all().delete()
+            summaries = self._aggregate(Mark.objects.all())
+            batch_size = connections[self.db].ops.bulk_batch_size(
+                [field for field in self.model._meta.concrete_fields],
+                summaries)
+            self.bulk_create(summaries, batch_size=min(1000, batch_size))
+
+    def _aggregate(self, marks):
+        """Build summaries from marks grouped by student and subject"""
+        aggregates = {
+            f'{code.lower()}_count': Count('id', filter=Q(value=code))
+            for code, label in Mark.MARK_VALUES
+        }
+        aggregates['average'] = Avg(Case(
+            *[When(value=code, then=grade)
+              for code, grade in Mark.GRADES.items()],
+            output_field=FloatField(),
+        ))
+        aggregates['last_date'] = Max('date')
+        rows = marks.order_by() \
+            .values('student_id', 'subject_id') \
+            .annotate(**aggregates)
+
+        return [self.model(**row) for row in rows]
+
+
+class MarkSummary(models.Model):
+    """Aggregated marks of a student in a subject"""
+    student = models.ForeignKey('Student', on_delete=models.CASCADE,
+                                related_name='mark_summaries')
+    subject = models.ForeignKey('Subject', on_delete=models.CASCADE)
+    pre_count = models.PositiveIntegerField(default=0)
+    abs_count = models.PositiveIntegerField(default=0)
+    two_count = models.PositiveIntegerField(default=0)
+    thr_count = models.PositiveIntegerField(default=0)
+    fou_count = models.PositiveIntegerField(default=0)
+    fiv_count = models.PositiveIntegerField(default=0)
+    average = models.FloatField(null=True)
+    last_date = models.DateField(null=True)
+
+    objects = MarkSummaryManager()
+
+    class Meta:
+        unique_together = ('student', 'subject')
+
+    def __str__(self):
+        return f'{self.student} - {self.subject}'
+
+
 class StudentClass(models.Model):
     """Class to be used for the students"""
-    name = models.CharField(max_length=12)
+    name = models.CharField(max_length=12, db_index=True)
     study_year = models.ForeignKey('StudyYear', on_delete=models.CASCADE)
 
     def __str__(self):
@@ -154,6 +387,7 @@ class Student(models.Model):
     address = models.CharField(max_length=255)
     phone = models.CharField(max_length=32)
     student_class = models.ForeignKey('StudentClass', on_delete=models.CASCADE)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
 
     def __str__(self):
         return f'{self.surname} {self.name}'
@@ -176,3 +410,13 @@ class School(models.Model):
 
     def __str__(self):
         return self.name
+
+
+class Tombstone(models.Model):
+    """Record of a deleted object for clients syncing changes"""
+    model = models.CharField(max_length=32)
+    object_id = models.PositiveIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.model} {self.object_id}'
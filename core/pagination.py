@@ -0,0 +1,237 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from collections import OrderedDict, deque
+from itertools import dropwhile, islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """Paginate by comparing the unique ordering key of the last seen row"""
+    ordering = ('id',)
+    cursor_query_param = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = getattr(settings, 'MAX_PAGE_SIZE', None)
+    invalid_cursor_message = _('Invalid cursor')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        """Return a single page of the ordered queryset"""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.request = request
+        self.reverse, position = self.decode_cursor(request)
+
+        ordering = self.ordering
+        if self.reverse:
+            ordering = tuple(self._reverse_field(f) for f in ordering)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            try:
+                queryset = queryset.filter(self._after(ordering, position))
+            except (DjangoValidationError, TypeError, ValueError):
+                raise self.invalid_cursor()
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if self.reverse:
+            self.page.reverse()
+
+        if self.reverse:
+            self.has_previous, self.has_next = has_more, position is not None
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+
+        return self.page
+
+    def get_paginated_response(self, data):
+        """Wrap page data with links to neighbouring pages"""
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_page_size(self, request):
+        """Return requested page size capped by max_page_size"""
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if page_size <= 0:
+            return self.page_size
+        if self.max_page_size:
+            return min(page_size, self.max_page_size)
+
+        return page_size
+
+    def get_next_link(self):
+        """Return link to the page after the current one"""
+        if not self.has_next or not self.page:
+            return None
+
+        return self.encode_cursor(False, self.page[-1])
+
+    def get_previous_link(self):
+        """Return link to the page before the current one"""
+        if not self.has_previous:
+            return None
+        if not self.page:
+            url = self.request.build_absolute_uri()
+            return remove_query_param(url, self.cursor_query_param)
+
+        return self.encode_cursor(True, self.page[0])
+
+    def decode_cursor(self, request):
+        """Return direction and position given in the request cursor"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return False, None
+
+        try:
+            cursor = json.loads(urlsafe_b64decode(encoded.encode('ascii')))
+            reverse, position = bool(cursor['r']), cursor['p']
+        except (TypeError, ValueError, KeyError):
+            raise self.invalid_cursor()
+        if not isinstance(position, list) or \
+                len(position) != len(self.ordering) or \
+                not all(isinstance(value, str) for value in position):
+            raise self.invalid_cursor()
+
+        return reverse, position
+
+    def invalid_cursor(self):
+        """Return error reported for a malformed cursor"""
+        return ValidationError(
+            {self.cursor_query_param: [self.invalid_cursor_message]})
+
+    def make_cursor(self, reverse, position):
+        """Return cursor of the ordering key values in the direction"""
+        cursor = json.dumps({
+            'r': int(reverse),
+            'p': [str(value) for value in position],
+        })
+
+        return urlsafe_b64encode(cursor.encode('ascii')).decode('ascii')
+
+    def encode_cursor(self, reverse, instance):
+        """Return url pointing at the given row in the given direction"""
+        position = [self._get_value(instance, f) for f in self.ordering]
+        url = self.request.build_absolute_uri()
+
+        return replace_query_param(url, self.cursor_query_param,
+                                   self.make_cursor(reverse, position))
+
+    def _after(self, ordering, position):
+        """Build filter selecting rows following position in ordering,
+        bounding the first field too lets the database seek the index"""
+        condition = Q()
+        equal = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+
+        first = ordering[0]
+        bound = 'lte' if first.startswith('-') else 'gte'
+
+        return Q(**{f'{first.lstrip("-")}__{bound}': position[0]}) & condition
+
+    def _get_value(self, instance, field):
+        """Return ordering field value of a model instance or a dict row"""
+        name = field.lstrip('-')
+        if isinstance(instance, dict):
+            return instance[name]
+
+        return getattr(instance, name)
+
+    def _reverse_field(self, field):
+        """Return field ordering in the opposite direction"""
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+
+class MarkPagination(KeysetPagination):
+    """Paginate marks by date"""
+    ordering = ('date', 'id')
+
+
+class JournalPagination(KeysetPagination):
+    """Paginate journal marks by student and date"""
+    ordering = ('student_id', 'date', 'id')
+
+
+class LessonPagination(KeysetPagination):
+    """Paginate lessons by their number in a day"""
+    ordering = ('number', 'id')
+
+
+class JobPagination(KeysetPagination):
+    """Paginate jobs from the newest"""
+    ordering = ('-id',)
+
+
+class OccurrencePagination(KeysetPagination):
+    """Paginate occurrences of events, expanded in memory in date order,
+    by date and event id"""
+    ordering = ('date', 'id')
+
+    def paginate_queryset(self, occurrences, request, view=None):
+        """Return a single page of the ordered occurrences"""
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.request = request
+        self.reverse, position = self.decode_cursor(request)
+        if position is not None:
+            position = self.parse_position(position)
+
+        if self.reverse:
+            before = (occurrence for occurrence in occurrences
+                      if self.get_key(occurrence) < position)
+            results = list(deque(before, maxlen=self.page_size + 1))
+            self.page = results[-self.page_size:]
+        else:
+            if position is not None:
+                occurrences = dropwhile(
+                    lambda occurrence: self.get_key(occurrence) <= position,
+                    occurrences)
+            results = list(islice(occurrences, self.page_size + 1))
+            self.page = results[:self.page_size]
+        has_more = len(results) > self.page_size
+
+        if self.reverse:
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous, self.has_next = position is not None, has_more
+
+        return self.page
+
+    def parse_position(self, position):
+        """Return date and id of the cursor position"""
+        try:
+            date = parse_datetime(position[0])
+            number = int(position[1])
+        except ValueError:
+            raise self.invalid_cursor()
+        if date is None or date.tzinfo is None:
+            raise self.invalid_cursor()
+
+        return date, number
+
+    def get_key(self, occurrence):
+        """Return ordering key of the occurrence"""
+        return occurrence.date, occurrence.pk
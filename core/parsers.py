@@ -0,0 +1,17 @@
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+
+
+class MessagePackParser(BaseParser):
+    """Parse MessagePack request data"""
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        """Return data unpacked from the request body"""
+        import msgpack
+
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as error:
+            reason = str(error) or type(error).__name__
+            raise ParseError(f'MessagePack parse error - {reason}')
@@ -0,0 +1,143 @@
+from django.db import connection
+
+from core.models import StudyYear
+
+
+TABLE = 'core_mark'
+DEFAULT_PARTITION = 'core_mark_default'
+READ_ONLY_TRIGGER = 'core_mark_read_only'
+# Transaction setting letting deletes of students and subjects remove
+# their marks of archived study years
+CASCADE_SETTING = 'core.mark_archive_cascade'
+
+
+class PartitioningError(Exception):
+    """Raised when marks cannot be partitioned in the database"""
+
+
+def check_support(db_connection=connection):
+    """Raise error unless the database supports partitioning marks"""
+    if db_connection.vendor != 'postgresql':
+        raise PartitioningError('Mark partitioning requires PostgreSQL')
+
+
+def partition_name(year):
+    """Return name of the partition holding marks of the study year"""
+    return f'{TABLE}_y{year}'
+
+
+def is_partitioned(cursor):
+    """Tell whether the mark table is already partitioned"""
+    cursor.execute('SELECT relkind FROM pg_class WHERE oid = %s::regclass',
+                   [TABLE])
+
+    return cursor.fetchone()[0] == 'p'
+
+
+def get_partitions(cursor):
+    """Return name, bounds, archive flag and row estimate of partitions"""
+    cursor.execute('''
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid),
+               EXISTS (SELECT 1 FROM pg_trigger t
+                       WHERE t.tgrelid = c.oid AND t.tgname = %s),
+               c.reltuples::bigint
+        FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        ORDER BY c.relname
+    ''', [READ_ONLY_TRIGGER, TABLE])
+
+    return [
+        {'name': name, 'bounds': bounds, 'archived': archived, 'rows': rows}
+        for name, bounds, archived, rows in cursor.fetchall()
+    ]
+
+
+def _exists(cursor, name):
+    """Tell whether the table exists"""
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [name])
+
+    return cursor.fetchone()[0]
+
+
+def create_partition(cursor, year):
+    """Create partition of the study year, moving its marks out of the
+    default partition, return False if it already exists"""
+    name = partition_name(year)
+    if _exists(cursor, name):
+        return False
+
+    start, end = StudyYear.date_range(year)
+    cursor.execute(
+        f'SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} '
+        f'WHERE date >= %s AND date < %s)', [start, end])
+    stray = cursor.fetchone()[0]
+    if stray:
+        cursor.execute(
+            f'ALTER TABLE {TABLE} DETACH PARTITION {DEFAULT_PARTITION}')
+    cursor.execute(
+        f'CREATE TABLE {name} PARTITION OF {TABLE} '
+        f'FOR VALUES FROM (%s) TO (%s)', [start, end])
+    if stray:
+        cursor.execute(
+            f'INSERT INTO {TABLE} SELECT * FROM {DEFAULT_PARTITION} '
+            f'WHERE date >= %s AND date < %s', [start, end])
+        cursor.execute(
+            f'DELETE FROM {DEFAULT_PARTITION} '
+            f'WHERE date >= %s AND date < %s', [start, end])
+        cursor.execute(
+            f'ALTER TABLE {TABLE} ATTACH PARTITION {DEFAULT_PARTITION} '
+            f'DEFAULT')
+
+    return True
+
+
+def archive_partition(cursor, year, tablespace=None):
+    """Make partition of the closed study year read-only, optionally
+    moving it to a cheaper tablespace, it stays attached to the table"""
+    name = partition_name(year)
+    if not _exists(cursor, name):
+        raise PartitioningError(f'No partition of study year {year}')
+
+    cursor.execute(f'''
+        CREATE OR REPLACE FUNCTION {READ_ONLY_TRIGGER}() RETURNS trigger
+        AS $$
+        BEGIN
+            IF TG_OP = 'DELETE' AND
+                    current_setting('{CASCADE_SETTING}', true) = 'on' THEN
+                RETURN OLD;
+            END IF;
+            RAISE EXCEPTION 'Marks of archived study years are read-only'
+                USING ERRCODE = 'read_only_sql_transaction';
+        END;
+        $$ LANGUAGE plpgsql
+    ''')
+    cursor.execute(f'DROP TRIGGER IF EXISTS {READ_ONLY_TRIGGER} '
+                   f'ON {name}')
+    cursor.execute(
+        f'CREATE TRIGGER {READ_ONLY_TRIGGER} '
+        f'BEFORE INSERT OR UPDATE OR DELETE ON {name} '
+        f'FOR EACH ROW EXECUTE PROCEDURE {READ_ONLY_TRIGGER}()')
+    if tablespace:
+        cursor.execute(f'ALTER TABLE {name} SET TABLESPACE {tablespace}')
+        cursor.execute('SELECT indexname FROM pg_indexes WHERE '
+                       'schemaname = current_schema() AND tablename = %s',
+                       [name])
+        for index, in cursor.fetchall():
+            cursor.execute(
+                f'ALTER INDEX {index} SET TABLESPACE {tablespace}')
+
+
+def allow_cascade(db_connection, allow):
+    """Let deletes cascading from students and subjects remove marks of
+    archived study years until the transaction ends"""
+    if db_connection.vendor != 'postgresql':
+        return
+    with db_connection.cursor() as cursor:
+        cursor.execute('SELECT set_config(%s, %s, true)',
+                       [CASCADE_SETTING, 'on' if allow else 'off'])
+
+
+def unarchive_partition(cursor, year):
+    """Allow changes of marks of the study year again"""
+    cursor.execute(f'DROP TRIGGER IF EXISTS {READ_ONLY_TRIGGER} '
+                   f'ON {partition_name(year)}')
@@ -0,0 +1,205 @@
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+TIME_BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class QueryBudgetExceeded(Exception):
+    """Raised when an endpoint runs more queries than its budget allows"""
+
+
+def get_config():
+    """Return profiling configuration with defaults applied"""
+    config = {
+        'HEADERS': False,
+        'BUDGETS': {},
+        'DEFAULT_BUDGET': None,
+        'RAISE_ON_BUDGET': False,
+    }
+    config.update(getattr(settings, 'PROFILING', {}))
+
+    return config
+
+
+class Histogram:
+    """Counts of observed values falling into upper bounded buckets"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0
+        self.count = 0
+
+    def observe(self, value):
+        """Add value to its bucket"""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def as_dict(self):
+        """Return bucket counts keyed by upper bound"""
+        buckets = {str(bound): count
+                   for bound, count in zip(self.bounds, self.counts)}
+        buckets['+Inf'] = self.counts[-1]
+
+        return {'count': self.count, 'sum': self.total, 'buckets': buckets}
+
+
+class ProfileStats:
+    """Per endpoint histograms of request measurements"""
+    metrics = {
+        'queries': QUERY_BUCKETS,
+        'db_ms': TIME_BUCKETS,
+        'render_ms': TIME_BUCKETS,
+        'wall_ms': TIME_BUCKETS,
+    }
+
+    def __init__(self):
+        self._endpoints = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, measurements):
+        """Add request measurements of the endpoint"""
+        with self._lock:
+            histograms = self._endpoints.get(endpoint)
+            if histograms is None:
+                histograms = {name: Histogram(bounds)
+                              for name, bounds in self.metrics.items()}
+                self._endpoints[endpoint] = histograms
+            for name, value in measurements.items():
+                histograms[name].observe(value)
+
+    def snapshot(self):
+        """Return histograms of all endpoints"""
+        with self._lock:
+            return {
+                endpoint: {name: histogram.as_dict()
+                           for name, histogram in histograms.items()}
+                for endpoint, histograms in self._endpoints.items()
+            }
+
+    def reset(self):
+        """Forget all measurements"""
+        with self._lock:
+            self._endpoints.clear()
+
+
+stats = ProfileStats()
+
+
+class QueryRecorder:
+    """Database execute wrapper counting queries and their duration"""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            with self._lock:
+                self.duration += duration
+                self.count += 1
+
+
+@contextmanager
+def record_queries(request):
+    """Count queries of this thread's connections into the profile of the
+    request, threads serving part of a request enter it themselves"""
+    recorder = getattr(request, 'profile_recorder', None)
+    with ExitStack() as stack:
+        if recorder is not None:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+        yield
+
+
+def get_endpoint(request, view_func):
+    """Return name of the DRF view and action handling the request"""
+    view_class = getattr(view_func, 'cls', None)
+    if view_class is None:
+        return getattr(view_func, '__name__', request.path)
+
+    method = request.method.lower()
+    actions = getattr(view_func, 'actions', None) or {}
+
+    return f'{view_class.__name__}.{actions.get(method, method)}'
+
+
+class ProfilingMiddleware:
+    """Measure queries, database, response rendering and wall time of
+    requests"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        request.profile_recorder = recorder
+        request.profile_endpoint = None
+        request.profile_render_time = 0.0
+
+        start = time.perf_counter()
+        with record_queries(request):
+            response = self.get_response(request)
+        wall = time.perf_counter() - start
+
+        if request.profile_endpoint is None:
+            return response
+
+        measurements = {
+            'queries': recorder.count,
+            'db_ms': recorder.duration * 1000,
+            'render_ms': request.profile_render_time * 1000,
+            'wall_ms': wall * 1000,
+        }
+        stats.record(request.profile_endpoint, measurements)
+
+        config = get_config()
+        if config['HEADERS']:
+            response['X-Query-Count'] = str(recorder.count)
+            response['Server-Timing'] = ', '.join(
+                f'{name[:-3]};dur={measurements[name]:.1f}'
+                for name in ('db_ms', 'render_ms', 'wall_ms')
+            )
+        self.check_budget(request.profile_endpoint, recorder.count, config)
+
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.profile_endpoint = get_endpoint(request, view_func)
+
+    def process_template_response(self, request, response):
+        started = time.perf_counter()
+
+        def measure(rendered):
+            request.profile_render_time = time.perf_counter() - started
+
+        response.add_post_render_callback(measure)
+
+        return response
+
+    def check_budget(self, endpoint, count, config):
+        """Report endpoint running more queries than allowed"""
+        budget = config['BUDGETS'].get(endpoint, config['DEFAULT_BUDGET'])
+        if budget is None or count <= budget:
+            return
+
+        msg = f'{endpoint} ran {count} queries, budget is {budget}'
+        if config['RAISE_ON_BUDGET']:
+            raise QueryBudgetExceeded(msg)
+        logger.warning(msg)
@@ -0,0 +1,20 @@
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils import encoders
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Render response data as MessagePack"""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        """Return data packed the same way JSONRenderer encodes it"""
+        import msgpack
+
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=encoders.JSONEncoder().default,
+                             use_bin_type=True)
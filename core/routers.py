@@ -0,0 +1,109 @@
+import hashlib
+import random
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ImproperlyConfigured
+
+
+PIN_COOKIE = 'use_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = threading.local()
+
+
+def get_replicas():
+    """Return aliases of databases replicating the primary"""
+    return getattr(settings, 'DATABASE_REPLICAS', [])
+
+
+def get_primary_models():
+    """Return labels of models always read from the primary"""
+    return getattr(settings, 'REPLICA_PRIMARY_MODELS',
+                   ('authtoken.token', 'job.job'))
+
+
+class PrimaryReplicaRouter:
+    """Route reads of replica enabled requests to replicas, except reads
+    of models that must see writes at once"""
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if replicas and getattr(_state, 'use_replica', False) and \
+                model._meta.label_lower not in get_primary_models():
+            return random.choice(replicas)
+
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db not in get_replicas()
+
+
+def get_pin_cache():
+    """Return cache remembering clients pinned to the primary"""
+    return caches[getattr(settings, 'REPLICA_PIN_CACHE_ALIAS', 'default')]
+
+
+def _pin_key(request):
+    """Return cache key pinning the client to the primary"""
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    digest = hashlib.sha256(authorization.encode()).hexdigest()
+
+    return f'replica:pin:{digest}'
+
+
+class ReplicaRoutingMiddleware:
+    """Read from replicas on safe requests unless the client just wrote"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if get_replicas() and \
+                isinstance(get_pin_cache(), (LocMemCache, DummyCache)):
+            # A pin stored by one process must be seen by all of them
+            raise ImproperlyConfigured(
+                'REPLICA_PIN_CACHE_ALIAS must name a cache shared by all '
+                'processes when DATABASE_REPLICAS are configured')
+
+    def __call__(self, request):
+        safe = request.method in SAFE_METHODS
+        paths = tuple(getattr(settings, 'REPLICA_READ_PATHS', ()))
+        use_replica = safe and request.path.startswith(paths) \
+            and not self.is_pinned(request)
+
+        _state.use_replica = use_replica
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.use_replica = False
+
+        if not safe and response.status_code < 400:
+            self.pin(request, response)
+
+        return response
+
+    def is_pinned(self, request):
+        """Check client wrote recently and must read its own writes"""
+        if PIN_COOKIE in request.COOKIES:
+            return True
+        key = _pin_key(request)
+
+        return key is not None and get_pin_cache().get(key) is not None
+
+    def pin(self, request, response):
+        """Send client reads to the primary until replicas catch up"""
+        seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 10)
+        response.set_cookie(PIN_COOKIE, '1', max_age=seconds, httponly=True)
+        key = _pin_key(request)
+        if key is not None:
+            get_pin_cache().set(key, True, timeout=seconds)
@@ -0,0 +1,94 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Q
+
+from core.models import TeacherSubject
+
+
+VERSION_KEY = 'teaching-scope:version'
+
+
+def _get_config():
+    """Return teaching scope cache configuration with defaults applied"""
+    config = {'CACHE_ALIAS': 'default', 'TIMEOUT': 60 * 60}
+    config.update(getattr(settings, 'TEACHING_SCOPE_CACHE', {}))
+
+    return config
+
+
+def _get_cache():
+    """Return cache holding teaching scopes"""
+    return caches[_get_config()['CACHE_ALIAS']]
+
+
+def _new_version():
+    """Return version not used by any previously cached scope"""
+    return time.time_ns()
+
+
+def _cache_key(cache, user_id):
+    """Return cache key of the user scope under the current version"""
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _new_version(), timeout=None)
+        version = cache.get(VERSION_KEY)
+
+    return f'teaching-scope:{version}:{user_id}'
+
+
+def get_teaching_scope(user_id):
+    """Return name and class ids of each subject the user teaches,
+    keyed by teacher subject id"""
+    cache = _get_cache()
+    key = _cache_key(cache, user_id)
+    scope = cache.get(key)
+    if scope is None:
+        scope = {}
+        rows = TeacherSubject.objects.filter(user=user_id) \
+            .order_by('id').values_list('id', 'name', 'student_classes')
+        for subject_id, name, class_id in rows:
+            entry = scope.setdefault(subject_id, {'name': name, 'classes': []})
+            if class_id is not None:
+                entry['classes'].append(class_id)
+        cache.set(key, scope, timeout=_get_config()['TIMEOUT'])
+
+    return scope
+
+
+def scope_filter(scope, prefix=''):
+    """Return filter of marks in subjects and classes of the scope,
+    prefix is the lookup path from the filtered model to the mark"""
+    condition = Q(**{f'{prefix}pk__in': []})
+    for entry in scope.values():
+        condition |= Q(**{
+            f'{prefix}subject__name': entry['name'],
+            f'{prefix}student__student_class_id__in': entry['classes'],
+        })
+
+    return condition
+
+
+def filter_by_scope(queryset, user, prefix=''):
+    """Return rows of marks in subjects and classes the user teaches,
+    staff see all of them"""
+    if user.is_staff:
+        return queryset
+
+    return queryset.filter(scope_filter(get_teaching_scope(user.pk), prefix))
+
+
+def forget_teaching_scopes(user_ids):
+    """Drop cached scopes of the users"""
+    cache = _get_cache()
+    cache.delete_many([_cache_key(cache, user_id) for user_id in user_ids])
+
+
+def invalidate_teaching_scopes():
+    """Make cached scopes of all users stale"""
+    cache = _get_cache()
+    try:
+        cache.incr(VERSION_KEY)
+    except ValueError:
+        cache.set(VERSION_KEY, _new_version(), timeout=None)
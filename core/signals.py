@@ -0,0 +1,120 @@
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models.signals import m2m_changed, post_delete, post_save, \
+    pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+from core import partitions
+from core.authentication import forget_tokens, token_cache
+from core.models import Event, Lesson, Day, Mark, Student, MarkSummary, \
+    Tombstone, TeacherSubject, StudentClass, Subject
+from core.scope import forget_teaching_scopes, invalidate_teaching_scopes
+
+
+@receiver(post_save, sender=Mark)
+def refresh_summary_on_save(sender, instance, **kwargs):
+    """Refresh summaries of the mark and of its previous owner"""
+    pairs = {(instance.student_id, instance.subject_id)}
+    loaded = getattr(instance, '_loaded_values', {})
+    if 'student_id' in loaded and 'subject_id' in loaded:
+        pairs.add((loaded['student_id'], loaded['subject_id']))
+    MarkSummary.objects.schedule_refresh(pairs)
+    instance._loaded_values = {
+        'student_id': instance.student_id,
+        'subject_id': instance.subject_id,
+    }
+
+
+@receiver(post_delete, sender=Mark)
+def refresh_summary_on_delete(sender, instance, **kwargs):
+    """Refresh summary the deleted mark was counted in"""
+    MarkSummary.objects.schedule_refresh(
+        [(instance.student_id, instance.subject_id)])
+
+
+def allow_archived_marks_cascade(sender, using, **kwargs):
+    """Let marks of archived study years go with their student or subject"""
+    partitions.allow_cascade(connections[using], True)
+
+
+def stop_archived_marks_cascade(sender, using, **kwargs):
+    """Make archived marks read-only again once the delete is done"""
+    partitions.allow_cascade(connections[using], False)
+
+
+for model in (Student, Subject):
+    pre_delete.connect(allow_archived_marks_cascade, sender=model)
+    post_delete.connect(stop_archived_marks_cascade, sender=model)
+
+
+@receiver(post_delete, sender=Token)
+def forget_deleted_token(sender, instance, **kwargs):
+    """Stop authenticating with the deleted token"""
+    forget_tokens([instance.key], [instance.user_id])
+
+
+@receiver(post_save, sender=get_user_model())
+def forget_user_tokens(sender, instance, **kwargs):
+    """Drop cached copies of the changed user"""
+    token_cache.delete_user(instance.pk)
+    forget_tokens(Token.objects.filter(user=instance)
+                  .values_list('key', flat=True), [instance.pk])
+
+
+def record_tombstone(sender, instance, **kwargs):
+    """Remember deleted object for clients syncing changes"""
+    Tombstone.objects.create(model=sender._meta.model_name,
+                             object_id=instance.pk)
+
+
+for model in (Mark, Event, Lesson, Day, Student):
+    post_delete.connect(record_tombstone, sender=model)
+
+
+@receiver(m2m_changed, sender=Day.lessons.through)
+def touch_day_on_lessons_change(sender, instance, action, reverse, pk_set,
+                                **kwargs):
+    """Mark days as updated when their lessons change"""
+    if action in ('post_add', 'post_remove'):
+        days = Day.objects.filter(pk__in=pk_set) if reverse \
+            else Day.objects.filter(pk=instance.pk)
+    elif action == 'post_clear' and not reverse:
+        days = Day.objects.filter(pk=instance.pk)
+    elif action == 'pre_clear' and reverse:
+        # Days of the lesson cannot be found once the relation is cleared
+        days = Day.objects.filter(lessons=instance)
+    else:
+        return
+
+    days.update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=get_user_model().teaching_subjects.through)
+def forget_scope_on_subjects_change(sender, instance, action, reverse,
+                                    **kwargs):
+    """Drop cached teaching scopes when teachers get or lose subjects"""
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        invalidate_teaching_scopes()
+    else:
+        forget_teaching_scopes([instance.pk])
+
+
+@receiver(m2m_changed, sender=TeacherSubject.student_classes.through)
+def invalidate_scopes_on_classes_change(sender, action, **kwargs):
+    """Make teaching scopes stale when subjects get or lose classes"""
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_teaching_scopes()
+
+
+def invalidate_scopes(sender, **kwargs):
+    """Make teaching scopes stale when a subject or class changes"""
+    invalidate_teaching_scopes()
+
+
+post_save.connect(invalidate_scopes, sender=TeacherSubject)
+post_delete.connect(invalidate_scopes, sender=TeacherSubject)
+post_delete.connect(invalidate_scopes, sender=StudentClass)
@@ -0,0 +1,19 @@
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class BudgetTestRunner(DiscoverRunner):
+    """Test runner failing requests that exceed their query budget"""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._budgets = override_settings(PROFILING={
+            **getattr(settings, 'PROFILING', {}),
+            'RAISE_ON_BUDGET': True,
+        })
+        self._budgets.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._budgets.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,581 @@
+import asyncio
+import datetime
+import gzip
+import importlib.util
+import json
+import shutil
+import tempfile
+import zlib
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.db import DatabaseError, connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase
+from django.test.utils import override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core import compression, partitions, profiling, routers, scope
+from core.asgi import ASGIHandler, build_environ
+from core.authentication import (
+    CachedTokenAuthentication,
+    shared_cache_key,
+    token_cache,
+    user_version_key,
+)
+from core.models import User, StudyYear, Subject, Mark, StudentClass, Student
+from core.renderers import MessagePackRenderer
+from job.models import Job
+
+
+MARK_URL = '/api/journal/marks/'
+ME_URL = '/api/user/me/'
+EVENT_URL = '/api/event/events/'
+STUDY_YEAR_URL = '/api/journal/study_years/'
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partitioning needs PostgreSQL')
+class ArchivedPartitionTests(TestCase):
+    """Marks of archived study years are read-only except for cascades"""
+
+    def setUp(self):
+        study_year = StudyYear.objects.create(year=2019)
+        self.subject = Subject.objects.create(name='Math',
+                                              study_year=study_year)
+        self.student = Student.objects.create(
+            name='Name', surname='Surname', lastname='Test',
+            birth_date=datetime.date(2010, 1, 1), address='Address',
+            phone='000', student_class=StudentClass.objects.create(
+                name='5A', study_year=study_year))
+        self.mark = self.create_mark(self.subject, 1)
+        with connection.cursor() as cursor:
+            partitions.create_partition(cursor, 2019)
+            partitions.archive_partition(cursor, 2019)
+
+    def create_mark(self, subject, day):
+        """Create mark of the student in the archived study year"""
+        return Mark.objects.create(student=self.student, subject=subject,
+                                   value='FIV',
+                                   date=datetime.date(2019, 11, day))
+
+    def assert_read_only(self, mark):
+        """Assert the mark can be neither changed nor deleted"""
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            Mark.objects.filter(pk=mark.pk).update(value='FOR')
+        with self.assertRaises(DatabaseError), transaction.atomic():
+            Mark.objects.filter(pk=mark.pk).delete()
+
+    def test_changes_rejected(self):
+        """Test archived marks cannot be changed or deleted"""
+        self.assert_read_only(self.mark)
+
+    def test_student_delete_cascades(self):
+        """Test deleting a student deletes their archived marks"""
+        self.student.delete()
+
+        self.assertFalse(Mark.objects.filter(pk=self.mark.pk).exists())
+
+    def test_subject_delete_cascades(self):
+        """Test deleting a subject deletes its archived marks"""
+        self.subject.delete()
+
+        self.assertFalse(Mark.objects.filter(pk=self.mark.pk).exists())
+
+    def test_read_only_after_cascade(self):
+        """Test marks are read-only again once the cascade is done"""
+        with connection.cursor() as cursor:
+            partitions.unarchive_partition(cursor, 2019)
+        kept = self.create_mark(Subject.objects.create(
+            name='Art', study_year=self.subject.study_year), 2)
+        with connection.cursor() as cursor:
+            partitions.archive_partition(cursor, 2019)
+
+        self.subject.delete()
+
+        self.assert_read_only(kept)
+
+
+class TokenCacheTests(TestCase):
+    """Cached tokens and users follow changes of tokens and users"""
+
+    def setUp(self):
+        token_cache.clear()
+        self.user = User.objects.create_user('teacher@example.com',
+                                             'password123', name='Teacher')
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token.key}')
+
+    def tearDown(self):
+        token_cache.clear()
+
+    def authenticate(self):
+        """Return user the token authenticates"""
+        user, token = CachedTokenAuthentication().authenticate_credentials(
+            self.token.key)
+
+        return user
+
+    def test_cached(self):
+        """Test a cached token is authenticated without queries"""
+        self.authenticate()
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate().pk, self.user.pk)
+
+    def test_token_delete(self):
+        """Test a deleted token is rejected at once"""
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+        self.token.delete()
+
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
+
+    def test_user_deactivation(self):
+        """Test tokens of a deactivated user are rejected at once"""
+        self.assertEqual(self.client.get(ME_URL).status_code, 200)
+
+        self.user.is_active = False
+        self.user.save()
+
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
+
+    def test_password_change(self):
+        """Test the cached copy of the user is replaced on changes"""
+        self.authenticate()
+
+        self.user.set_password('changed123')
+        self.user.save()
+
+        self.assertTrue(self.authenticate().check_password('changed123'))
+
+    @override_settings(TOKEN_AUTH_CACHE={'CACHE_ALIAS': 'default'})
+    def test_shared_version(self):
+        """Test copies cached by other processes are dropped once the
+        shared user version changes"""
+        self.authenticate()
+        # What saving the user does in another process
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        caches['default'].delete(shared_cache_key(self.token.key))
+        caches['default'].set(user_version_key(self.user.pk), 'changed')
+
+        self.assertEqual(self.client.get(ME_URL).status_code, 401)
+
+
+class TeachingScopeCacheTests(TestCase):
+    """Cached teaching scopes are dropped for good when made stale"""
+
+    def setUp(self):
+        self.cache = caches['default']
+        self.cache.delete(scope.VERSION_KEY)
+
+    def test_version_not_reused(self):
+        """Test a version evicted from the cache is not given again"""
+        first = scope._cache_key(self.cache, 1)
+        scope.invalidate_teaching_scopes()
+        second = scope._cache_key(self.cache, 1)
+        self.cache.delete(scope.VERSION_KEY)
+        third = scope._cache_key(self.cache, 1)
+        scope.invalidate_teaching_scopes()
+
+        keys = [first, second, third, scope._cache_key(self.cache, 1)]
+        self.assertEqual(len(set(keys)), 4)
+
+    def test_version_reset_on_eviction(self):
+        """Test invalidation without a version starts a new one"""
+        key = scope._cache_key(self.cache, 1)
+        self.cache.delete(scope.VERSION_KEY)
+        scope.invalidate_teaching_scopes()
+
+        self.assertNotEqual(scope._cache_key(self.cache, 1), key)
+
+
+class ReplicaRoutingTests(TestCase):
+    """Safe requests read from replicas unless they must see writes"""
+
+    def setUp(self):
+        pins = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, pins)
+        replicas = override_settings(
+            DATABASE_REPLICAS=['replica'],
+            REPLICA_READ_PATHS=('/api/journal/',),
+            REPLICA_PIN_CACHE_ALIAS='pins',
+            CACHES={**settings.CACHES, 'pins': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': pins,
+            }},
+        )
+        replicas.enable()
+        self.addCleanup(replicas.disable)
+        self.router = routers.PrimaryReplicaRouter()
+        self.factory = RequestFactory()
+        self.status = 200
+
+    def get_response(self, request):
+        """Note databases models are read from during the request"""
+        self.routes = {model: self.router.db_for_read(model)
+                       for model in (Mark, Token, Job)}
+
+        return HttpResponse(status=self.status)
+
+    def request(self, method, path, **extra):
+        """Run the request through the middleware, return response"""
+        middleware = routers.ReplicaRoutingMiddleware(self.get_response)
+
+        return middleware(getattr(self.factory, method)(path, **extra))
+
+    def test_replica_reads(self):
+        """Test safe requests of replica paths read marks from replicas,
+        tokens and jobs from the primary"""
+        self.request('get', MARK_URL)
+
+        self.assertEqual(self.routes, {Mark: 'replica', Token: 'default',
+                                       Job: 'default'})
+        self.assertEqual(self.router.db_for_read(Mark), 'default')
+        self.assertEqual(self.router.db_for_write(Mark), 'default')
+
+    def test_primary_reads(self):
+        """Test writes and other paths read from the primary"""
+        for method, path in (('post', MARK_URL), ('get', ME_URL)):
+            self.request(method, path)
+
+            self.assertEqual(set(self.routes.values()), {'default'})
+
+    def test_pinned_after_write(self):
+        """Test clients read from the primary after a write"""
+        token = {'HTTP_AUTHORIZATION': 'Token abc'}
+        response = self.request('post', MARK_URL, **token)
+        self.assertIn(routers.PIN_COOKIE, response.cookies)
+
+        self.request('get', MARK_URL, **token)
+        self.assertEqual(self.routes[Mark], 'default')
+        self.request('get', MARK_URL, HTTP_AUTHORIZATION='Token other')
+        self.assertEqual(self.routes[Mark], 'replica')
+        self.factory.cookies[routers.PIN_COOKIE] = '1'
+        self.request('get', MARK_URL)
+        self.assertEqual(self.routes[Mark], 'default')
+
+    def test_failed_write_not_pinned(self):
+        """Test rejected writes do not pin the client"""
+        token = {'HTTP_AUTHORIZATION': 'Token abc'}
+        self.status = 400
+        response = self.request('post', MARK_URL, **token)
+        self.assertNotIn(routers.PIN_COOKIE, response.cookies)
+
+        self.status = 200
+        self.request('get', MARK_URL, **token)
+        self.assertEqual(self.routes[Mark], 'replica')
+
+    def test_process_local_pin_cache(self):
+        """Test pins must be stored in a cache shared by processes"""
+        with override_settings(REPLICA_PIN_CACHE_ALIAS='default'):
+            with self.assertRaises(ImproperlyConfigured):
+                self.request('get', MARK_URL)
+
+    def test_migrations(self):
+        """Test replicas are not migrated"""
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+
+
+class ProfilingTests(TestCase):
+    """Requests are measured and held to their query budgets"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(
+            'teacher@example.com', 'password123'))
+        profiling.stats.reset()
+        caches['default'].clear()
+
+    def test_budgets_enforced_in_tests(self):
+        """Test the test runner turns budget overruns into errors"""
+        self.assertTrue(profiling.get_config()['RAISE_ON_BUDGET'])
+
+    def test_budget_exceeded(self):
+        """Test a request over its budget fails"""
+        config = profiling.get_config()
+        with override_settings(PROFILING={
+                **config, 'BUDGETS': {'StudyYearViewSet.list': 0}}):
+            with self.assertRaises(profiling.QueryBudgetExceeded):
+                self.client.get(STUDY_YEAR_URL, {'page_size': 5})
+
+    def test_measurements(self):
+        """Test measurements are sent in headers and aggregated"""
+        config = profiling.get_config()
+        with override_settings(PROFILING={**config, 'HEADERS': True}):
+            response = self.client.get(STUDY_YEAR_URL, {'page_size': 5})
+
+        self.assertEqual(response['X-Query-Count'], '1')
+        self.assertEqual(
+            [part.split(';')[0]
+             for part in response['Server-Timing'].split(', ')],
+            ['db', 'render', 'wall'])
+        endpoint = profiling.stats.snapshot()['StudyYearViewSet.list']
+        self.assertEqual(endpoint['queries']['count'], 1)
+        self.assertEqual(endpoint['queries']['buckets']['1'], 1)
+
+
+class ASGITests(TestCase):
+    """Requests served over ASGI run in thread pools"""
+
+    def setUp(self):
+        self.handler = ASGIHandler()
+
+    def tearDown(self):
+        self.handler.executor.shutdown()
+        self.handler.read_executor.shutdown()
+
+    def communicate(self, scope, messages):
+        """Run the handler with the messages, return what it sent"""
+        received = iter(messages)
+        sent = []
+
+        async def receive():
+            return next(received)
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(self.handler(scope, receive, send))
+
+        return sent
+
+    def get_scope(self, path, method='GET'):
+        """Return HTTP scope of an anonymous request"""
+        return {'type': 'http', 'method': method, 'path': path,
+                'query_string': b'page_size=5',
+                'headers': [(b'host', b'testserver')]}
+
+    def test_environ(self):
+        """Test the scope and body are translated to WSGI environ"""
+        environ = build_environ({
+            'type': 'http', 'method': 'POST', 'path': '/app/api/',
+            'root_path': '/app', 'query_string': b'a=1',
+            'headers': [(b'content-type', b'application/json'),
+                        (b'content-length', b'100'),
+                        (b'x-test', b'a'), (b'x-test', b'b')],
+        }, b'{}')
+
+        self.assertEqual(environ['SCRIPT_NAME'], '/app')
+        self.assertEqual(environ['PATH_INFO'], '/api/')
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'application/json')
+        self.assertEqual(environ['CONTENT_LENGTH'], '2')
+        self.assertEqual(environ['HTTP_X_TEST'], 'a,b')
+        self.assertEqual(environ['wsgi.input'].read(), b'{}')
+
+    def test_response(self):
+        """Test the response is sent through the event loop"""
+        sent = self.communicate(self.get_scope(MARK_URL), [
+            {'type': 'http.request', 'body': b'', 'more_body': True},
+            {'type': 'http.request', 'body': b''},
+        ])
+
+        self.assertEqual(sent[0]['type'], 'http.response.start')
+        self.assertEqual(sent[0]['status'], 401)
+        self.assertIn((b'content-type', b'application/json'),
+                      sent[0]['headers'])
+        body = b''.join(message['body'] for message in sent[1:])
+        self.assertIn('detail', json.loads(body))
+        self.assertFalse(sent[-1].get('more_body'))
+
+    def test_disconnect(self):
+        """Test nothing is run for clients gone before sending the body"""
+        sent = self.communicate(self.get_scope(MARK_URL), [
+            {'type': 'http.disconnect'},
+        ])
+
+        self.assertEqual(sent, [])
+
+    @override_settings(ASGI={'READ_PATHS': [r'^/api/journal/marks/$']})
+    def test_read_paths(self):
+        """Test reads of READ_PATHS run in the read pool"""
+        self.handler = ASGIHandler()
+        scope = self.get_scope(MARK_URL)
+
+        self.assertIs(self.handler.get_executor(scope),
+                      self.handler.read_executor)
+        self.assertIs(self.handler.get_executor({**scope, 'method': 'POST'}),
+                      self.handler.executor)
+        self.assertIs(self.handler.get_executor(self.get_scope(ME_URL)),
+                      self.handler.executor)
+
+    def test_lifespan(self):
+        """Test startup is acknowledged and shutdown stops the pools"""
+        sent = self.communicate({'type': 'lifespan'}, [
+            {'type': 'lifespan.startup'},
+            {'type': 'lifespan.shutdown'},
+        ])
+
+        self.assertEqual([message['type'] for message in sent],
+                         ['lifespan.startup.complete',
+                          'lifespan.shutdown.complete'])
+        with self.assertRaises(RuntimeError):
+            self.handler.executor.submit(print)
+
+
+class CompressionTests(TestCase):
+    """Responses are compressed in the encoding the client prefers"""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.body = json.dumps([{'id': number, 'value': 'FIV'}
+                                for number in range(200)]).encode()
+
+    def respond(self, accept, response=None):
+        """Return response of the middleware to the request"""
+        if response is None:
+            response = HttpResponse(self.body,
+                                    content_type='application/json')
+            response['ETag'] = '"abc"'
+        middleware = compression.CompressionMiddleware(lambda request:
+                                                       response)
+
+        return middleware(self.factory.get(
+            MARK_URL, HTTP_ACCEPT_ENCODING=accept))
+
+    def test_choose_encoding(self):
+        """Test qualities and the server preference pick the encoding"""
+        encodings = ['br', 'gzip']
+        for accept, expected in (('gzip, br', 'br'),
+                                 ('gzip;q=1, br;q=0.5', 'gzip'),
+                                 ('*', 'br'),
+                                 ('br;q=0, *;q=0.1', 'gzip'),
+                                 ('br;q=x, gzip', 'gzip'),
+                                 ('identity', None),
+                                 ('', None)):
+            self.assertEqual(
+                compression.choose_encoding(accept, encodings), expected,
+                accept)
+
+    def test_without_brotli(self):
+        """Test brotli is offered only when installed"""
+        config = compression.get_config()
+        with mock.patch.object(compression, 'brotli', None):
+            self.assertEqual(compression.available_encodings(config),
+                             ['gzip'])
+
+    def test_compressible(self):
+        """Test text and JSON like types are compressed, others not"""
+        for content_type, expected in (
+                ('application/json; charset=utf-8', True),
+                ('text/csv', True),
+                ('application/vnd.api+json', True),
+                ('application/msgpack', True),
+                ('image/png', False)):
+            self.assertEqual(compression.is_compressible(content_type),
+                             expected, content_type)
+
+    def test_gzip(self):
+        """Test gzip body, headers and weakened ETag"""
+        response = self.respond('gzip')
+
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+        self.assertEqual(response['Content-Length'],
+                         str(len(response.content)))
+        self.assertEqual(response['ETag'], 'W/"abc"')
+        self.assertIn('Accept-Encoding', response['Vary'])
+
+    @skipUnless(importlib.util.find_spec('brotli'), 'Needs brotli')
+    def test_brotli(self):
+        """Test brotli is preferred when accepted"""
+        import brotli
+        response = self.respond('gzip, deflate, br')
+
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertEqual(brotli.decompress(response.content), self.body)
+
+    def test_weak_etag_kept(self):
+        """Test weak ETags are not weakened again"""
+        response = HttpResponse(self.body, content_type='application/json')
+        response['ETag'] = 'W/"abc"'
+
+        self.assertEqual(self.respond('gzip', response)['ETag'], 'W/"abc"')
+
+    def test_not_compressed(self):
+        """Test small, incompressible and unaccepted bodies are sent as
+        they are"""
+        small = HttpResponse(b'{}', content_type='application/json')
+        noise = HttpResponse(bytes(range(256)) * 2 + zlib.compress(self.body),
+                             content_type='application/json')
+        image = HttpResponse(self.body, content_type='image/png')
+        for accept, response in (('gzip', small), ('gzip', noise),
+                                 ('gzip', image), ('identity', None)):
+            response = self.respond(accept, response)
+
+            self.assertFalse(response.has_header('Content-Encoding'))
+            self.assertNotIn('W/', response.get('ETag', ''))
+
+    def test_streaming(self):
+        """Test streaming responses are compressed as they stream"""
+        chunks = [self.body[:1000], b'', self.body[1000:]]
+        response = StreamingHttpResponse(iter(chunks),
+                                         content_type='text/csv')
+        response['Content-Length'] = str(len(self.body))
+
+        response = self.respond('gzip', response)
+        self.assertEqual(
+            gzip.decompress(b''.join(response.streaming_content)), self.body)
+        self.assertFalse(response.has_header('Content-Length'))
+
+
+@skipUnless(importlib.util.find_spec('msgpack'), 'Needs msgpack')
+class MessagePackTests(TestCase):
+    """Clients may send and receive MessagePack instead of JSON"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(
+            'teacher@example.com', 'password123'))
+        caches['default'].clear()
+
+    def test_render(self):
+        """Test responses pack the data JSON would hold"""
+        import msgpack
+        StudyYear.objects.create(year=2019)
+
+        packed = self.client.get(STUDY_YEAR_URL,
+                                 HTTP_ACCEPT='application/msgpack')
+        caches['default'].clear()
+        text = self.client.get(STUDY_YEAR_URL, HTTP_ACCEPT='application/json')
+
+        self.assertEqual(packed['Content-Type'], 'application/msgpack')
+        self.assertEqual(msgpack.unpackb(packed.content, raw=False),
+                         json.loads(text.content))
+
+    def test_render_types(self):
+        """Test dates and decimals are encoded as JSON encodes them"""
+        import msgpack
+        content = MessagePackRenderer().render(
+            {'date': datetime.date(2019, 11, 1)})
+
+        self.assertEqual(msgpack.unpackb(content, raw=False),
+                         {'date': '2019-11-01'})
+        self.assertEqual(MessagePackRenderer().render(None), b'')
+
+    def test_parse(self):
+        """Test packed request data is parsed"""
+        import msgpack
+        response = self.client.post(
+            EVENT_URL, msgpack.packb({
+                'title': 'Meeting', 'description': 'Description',
+                'date': '2019-11-01T10:00:00Z'}),
+            content_type='application/msgpack',
+            HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(
+            msgpack.unpackb(response.content, raw=False)['title'], 'Meeting')
+
+    def test_parse_error(self):
+        """Test malformed packed data is rejected"""
+        response = self.client.post(EVENT_URL, b'\xc1',
+                                    content_type='application/msgpack')
+
+        self.assertEqual(response.status_code, 400)
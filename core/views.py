@@ -0,0 +1,20 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+from core.db.pool import get_stats as get_pool_stats
+from core.profiling import stats
+
+
+class ProfilingStatsView(APIView):
+    """Report request profiling histograms and connection pool usage"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        """Return figures collected by this process"""
+        return Response({
+            'endpoints': stats.snapshot(),
+            'connection_pools': get_pool_stats(),
+        })
@@ -0,0 +1,75 @@
+from datetime import timezone as dt_timezone
+
+from core.models import Event
+
+
+FREQUENCIES = {
+    Event.DAILY: 'DAILY',
+    Event.WEEKLY: 'WEEKLY',
+    Event.MONTHLY: 'MONTHLY',
+}
+
+
+def _datetime(value):
+    """Format datetime as iCalendar UTC time"""
+    return value.astimezone(dt_timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+
+
+def _text(value):
+    """Escape iCalendar text value"""
+    return value.replace('\\', '\\\\').replace(';', '\\;') \
+        .replace(',', '\\,').replace('\r\n', '\\n').replace('\n', '\\n')
+
+
+def _fold(line, limit=75):
+    """Split content line into continuation lines of at most limit octets
+    in UTF-8, keeping characters whole"""
+    if len(line.encode()) <= limit:
+        return line + '\r\n'
+
+    parts = []
+    part, size = [], 0
+    for char in line:
+        width = len(char.encode())
+        if size + width > limit:
+            parts.append(''.join(part))
+            # The leading space of continuation lines counts too
+            part, size = [' '], 1
+        part.append(char)
+        size += width
+    parts.append(''.join(part))
+
+    return '\r\n'.join(parts) + '\r\n'
+
+
+def event_lines(event, domain):
+    """Return content lines of the event"""
+    lines = [
+        'BEGIN:VEVENT',
+        f'UID:event-{event.pk}@{domain}',
+        f'DTSTAMP:{_datetime(event.updated_at)}',
+        f'DTSTART:{_datetime(event.date)}',
+        f'SUMMARY:{_text(event.title)}',
+        f'DESCRIPTION:{_text(event.description)}',
+    ]
+    if event.recurrence in FREQUENCIES:
+        rule = f'FREQ={FREQUENCIES[event.recurrence]};' \
+            f'INTERVAL={max(event.recurrence_interval, 1)}'
+        if event.recurrence_until is not None:
+            rule += f';UNTIL={_datetime(event.recurrence_until)}'
+        lines.append(f'RRULE:{rule}')
+    lines.append('END:VEVENT')
+
+    return lines
+
+
+def iter_calendar(events, domain, name='Events'):
+    """Yield folded lines of a calendar holding the events"""
+    for line in ('BEGIN:VCALENDAR', 'VERSION:2.0',
+                 f'PRODID:-//{domain}//Events//EN',
+                 f'X-WR-CALNAME:{_text(name)}'):
+        yield _fold(line)
+    for event in events:
+        for line in event_lines(event, domain):
+            yield _fold(line)
+    yield _fold('END:VCALENDAR')
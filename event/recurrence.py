@@ -0,0 +1,67 @@
+import calendar
+import copy
+import heapq
+from datetime import timedelta
+
+from core.models import Event
+
+
+STEPS = {
+    Event.DAILY: timedelta(days=1),
+    Event.WEEKLY: timedelta(weeks=1),
+}
+
+
+def _add_months(value, months):
+    """Shift datetime by months keeping the day within the month"""
+    month = value.month - 1 + months
+    year = value.year + month // 12
+    month = month % 12 + 1
+    day = min(value.day, calendar.monthrange(year, month)[1])
+
+    return value.replace(year=year, month=month, day=day)
+
+
+def occurrence_dates(event, start, end):
+    """Yield start dates of the event falling into [start, end)"""
+    last = end
+    if event.recurrence_until is not None:
+        last = min(end, event.recurrence_until + timedelta(microseconds=1))
+    interval = max(event.recurrence_interval, 1)
+
+    if event.recurrence == Event.MONTHLY:
+        months = (start.year - event.date.year) * 12 + \
+            start.month - event.date.month
+        number = max(months // interval - 1, 0)
+        while True:
+            date = _add_months(event.date, number * interval)
+            if date >= last:
+                return
+            if date >= start:
+                yield date
+            number += 1
+    elif event.recurrence in STEPS:
+        step = STEPS[event.recurrence] * interval
+        number = max(-(-(start - event.date) // step), 0)
+        date = event.date + step * number
+        while date < last:
+            yield date
+            date += step
+    elif start <= event.date < end:
+        yield event.date
+
+
+def occurrences(event, start, end):
+    """Yield copies of the event moved to each occurrence in the window"""
+    for date in occurrence_dates(event, start, end):
+        occurrence = copy.copy(event)
+        occurrence.date = date
+        yield occurrence
+
+
+def expand(events, start, end):
+    """Yield occurrences of the events in the window ordered by date"""
+    return heapq.merge(
+        *(occurrences(event, start, end) for event in events),
+        key=lambda occurrence: (occurrence.date, occurrence.pk),
+    )
@@ -8,5 +8,7 @@ class EventSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Event
-        fields = ('id', 'title', 'description', 'date')
+        fields = ('id', 'title', 'description', 'date', 'recurrence',
+                  'recurrence_interval', 'recurrence_until')
         read_only_fields = ('id', )
+        extra_kwargs = {'recurrence_interval': {'min_value': 1}}
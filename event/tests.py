@@ -0,0 +1,233 @@
+from datetime import datetime
+
+from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import User, Event
+from event import ical, recurrence
+
+
+EVENT_URL = '/api/event/events/'
+FEED_URL = '/api/event/feed/'
+
+
+def aware(*args):
+    """Return aware datetime in the current time zone"""
+    return timezone.make_aware(datetime(*args))
+
+
+class RecurrenceTests(TestCase):
+    """Recurring events are expanded into their occurrences"""
+
+    def get_dates(self, start, end, **fields):
+        """Return occurrence dates of an event in the window"""
+        event = Event(title='Event', description='Description', **fields)
+
+        return list(recurrence.occurrence_dates(event, start, end))
+
+    def test_once(self):
+        """Test a single event occurs once inside the window only"""
+        date = aware(2019, 11, 5, 10)
+
+        self.assertEqual(self.get_dates(
+            aware(2019, 11, 1), aware(2019, 12, 1), date=date), [date])
+        self.assertEqual(self.get_dates(
+            aware(2019, 12, 1), aware(2020, 1, 1), date=date), [])
+
+    def test_daily(self):
+        """Test daily events occur every interval days from the start"""
+        dates = self.get_dates(
+            aware(2019, 11, 4), aware(2019, 11, 10),
+            date=aware(2019, 11, 1, 10), recurrence=Event.DAILY,
+            recurrence_interval=2)
+
+        self.assertEqual(dates, [aware(2019, 11, day, 10)
+                                 for day in (5, 7, 9)])
+
+    def test_weekly(self):
+        """Test weekly events keep their weekday and time"""
+        dates = self.get_dates(
+            aware(2019, 11, 1), aware(2019, 12, 1),
+            date=aware(2019, 10, 7, 9), recurrence=Event.WEEKLY)
+
+        self.assertEqual(dates, [aware(2019, 11, day, 9)
+                                 for day in (4, 11, 18, 25)])
+
+    def test_monthly_last_day(self):
+        """Test monthly events on the 31st fall on the last day of
+        shorter months and return to the 31st"""
+        dates = self.get_dates(
+            aware(2020, 1, 1), aware(2020, 6, 1),
+            date=aware(2020, 1, 31, 12), recurrence=Event.MONTHLY)
+
+        self.assertEqual(dates, [
+            aware(2020, 1, 31, 12), aware(2020, 2, 29, 12),
+            aware(2020, 3, 31, 12), aware(2020, 4, 30, 12),
+            aware(2020, 5, 31, 12),
+        ])
+
+    def test_monthly_interval(self):
+        """Test monthly events with an interval skip months"""
+        dates = self.get_dates(
+            aware(2020, 6, 1), aware(2021, 1, 1),
+            date=aware(2020, 1, 15), recurrence=Event.MONTHLY,
+            recurrence_interval=3)
+
+        self.assertEqual(dates, [aware(2020, 7, 15), aware(2020, 10, 15)])
+
+    def test_until(self):
+        """Test occurrences end with recurrence_until, inclusive"""
+        dates = self.get_dates(
+            aware(2019, 11, 1), aware(2019, 12, 1),
+            date=aware(2019, 11, 1, 10), recurrence=Event.DAILY,
+            recurrence_until=aware(2019, 11, 3, 10))
+
+        self.assertEqual(dates, [aware(2019, 11, day, 10)
+                                 for day in (1, 2, 3)])
+
+
+class EventRangeTests(TestCase):
+    """Occurrences in a range are listed like events"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('teacher@example.com',
+                                             'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.daily = Event.objects.create(
+            title='Daily', description='Description', teacher=self.user,
+            date=aware(2019, 11, 1, 8), recurrence=Event.DAILY,
+            recurrence_until=aware(2019, 11, 5, 8))
+        self.once = Event.objects.create(
+            title='Once', description='Description', teacher=self.user,
+            date=aware(2019, 11, 3, 12))
+        Event.objects.create(
+            title='Other', description='Description',
+            teacher=User.objects.create_user('other@example.com',
+                                             'password123'),
+            date=aware(2019, 11, 3, 12))
+
+    def get_page(self, url=EVENT_URL, **params):
+        """Return response data of the event list"""
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+
+        return response.data
+
+    def test_envelope(self):
+        """Test occurrences come in the paginated envelope"""
+        data = self.get_page(start='2019-11-01', end='2019-11-10')
+
+        self.assertEqual(list(data), ['next', 'previous', 'results'])
+        self.assertEqual([row['title'] for row in data['results']],
+                         ['Daily', 'Daily', 'Daily', 'Once', 'Daily',
+                          'Daily'])
+        self.assertEqual(data['results'][3]['date'],
+                         '2019-11-03T12:00:00Z')
+        self.assertIsNone(data['next'])
+        self.assertIsNone(data['previous'])
+
+    def test_pages(self):
+        """Test occurrences are paged forward and back by cursor"""
+        params = {'start': '2019-11-01', 'end': '2019-11-10',
+                  'page_size': 4}
+        first = self.get_page(**params)
+        second = self.get_page(first['next'])
+        back = self.get_page(second['previous'])
+
+        self.assertEqual(len(first['results']), 4)
+        self.assertEqual([row['date'] for row in second['results']],
+                         ['2019-11-04T08:00:00Z', '2019-11-05T08:00:00Z'])
+        self.assertIsNone(second['next'])
+        self.assertEqual(back['results'], first['results'])
+        self.assertIsNone(back['previous'])
+
+    def test_invalid_cursor(self):
+        """Test malformed cursors are rejected"""
+        response = self.client.get(EVENT_URL, {
+            'start': '2019-11-01', 'end': '2019-11-10', 'cursor': 'x'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_range(self):
+        """Test incomplete and reversed ranges are rejected"""
+        for params in ({'start': '2019-11-01'},
+                       {'start': '2019-11-10', 'end': '2019-11-01'},
+                       {'start': '2019-11-01', 'end': '2021-11-01'}):
+            response = self.client.get(EVENT_URL, params)
+
+            self.assertEqual(response.status_code, 400)
+
+
+class FeedTests(TestCase):
+    """Teachers' events are served as a cacheable iCalendar feed"""
+
+    def setUp(self):
+        self.user = User.objects.create_user('teacher@example.com',
+                                             'password123')
+        client = APIClient()
+        client.force_authenticate(self.user)
+        self.url = client.get(FEED_URL).data['url']
+        self.event = Event.objects.create(
+            title='Родительское собрание', description='Описание ' * 20,
+            teacher=self.user, date=aware(2019, 11, 1, 18),
+            recurrence=Event.WEEKLY, recurrence_until=aware(2019, 12, 1))
+        self.client = APIClient()
+
+    def get_feed(self, **headers):
+        """Return response of the feed"""
+        response = self.client.get(self.url, **headers)
+        if response.status_code == 200:
+            response.text = b''.join(response.streaming_content)
+
+        return response
+
+    def test_feed(self):
+        """Test events are written as iCalendar"""
+        text = self.get_feed().text.decode()
+
+        self.assertIn('SUMMARY:Родительское собрание\r\n', text)
+        self.assertIn('RRULE:FREQ=WEEKLY;INTERVAL=1;UNTIL=20191201T000000Z',
+                      text)
+
+    def test_not_modified(self):
+        """Test unchanged feed is answered with 304"""
+        etag = self.get_feed()['ETag']
+
+        response = self.get_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_changed(self):
+        """Test changed and deleted events change the ETag"""
+        etag = self.get_feed()['ETag']
+        self.event.title = 'Собрание'
+        self.event.save()
+
+        response = self.get_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.event.delete()
+
+        response = self.get_feed(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(b'VEVENT', response.text)
+
+    def test_bad_token(self):
+        """Test feed of a tampered token is not found"""
+        self.url = self.url.replace('.ics', 'x.ics')
+
+        self.assertEqual(self.get_feed().status_code, 404)
+
+    def test_fold(self):
+        """Test long lines are folded at 75 octets between characters"""
+        line = 'DESCRIPTION:' + 'Описание ' * 20
+        folded = ical._fold(line)
+
+        lines = folded.encode().split(b'\r\n')
+        self.assertEqual(lines[-1], b'')
+        for part in lines[:-1]:
+            self.assertLessEqual(len(part), 75)
+            part.decode()
+        self.assertEqual(folded.replace('\r\n ', ''), line + '\r\n')
+        self.assertEqual(ical._fold('SUMMARY:Short'), 'SUMMARY:Short\r\n')
@@ -10,5 +10,7 @@ router.register('events', views.EventViewSet)
 app_name = 'event'
 
 urlpatterns = [
+    path('feed/', views.EventFeedView.as_view(), name='feed'),
+    path('feed/<str:token>.ics', views.ical_feed, name='ical'),
     path('', include(router.urls))
 ]
@@ -1,9 +1,48 @@
+import hashlib
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Count, Max, Q
+from django.http import Http404, StreamingHttpResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import condition, require_GET
 from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+from core.models import Event, Tombstone
+from core.pagination import OccurrencePagination
+from event import ical, recurrence, serializers
+
+
+FEED_SALT = 'event.feed'
 
-from core.models import Event
-from event import serializers
+
+def get_datetime_param(request, name):
+    """Return date or datetime query parameter as aware datetime"""
+    value = request.query_params.get(name)
+    if not value:
+        return None
+    try:
+        result = parse_datetime(value)
+        if result is None:
+            day = parse_date(value)
+            result = day and datetime.combine(day, time.min)
+    except ValueError:
+        result = None
+    if result is None:
+        raise ValidationError(
+            {name: 'Use YYYY-MM-DD or ISO 8601 date and time'})
+    if timezone.is_naive(result):
+        result = timezone.make_aware(result)
+
+    return result
 
 
 class EventViewSet(viewsets.GenericViewSet,
@@ -13,7 +52,7 @@ class EventViewSet(viewsets.GenericViewSet,
                    mixins.UpdateModelMixin,
                    mixins.DestroyModelMixin):
     """Manage events in the database"""
-    authentication_classes = (TokenAuthentication, )
+    authentication_classes = (CachedTokenAuthentication, )
     permission_classes = (IsAuthenticated, )
     queryset = Event.objects.all()
     serializer_class = serializers.EventSerializer
@@ -22,6 +61,106 @@ class EventViewSet(viewsets.GenericViewSet,
         """Return events for the current authenticated user only"""
         return self.queryset.filter(teacher=self.request.user).order_by('id')
 
+    def get_window(self):
+        """Return start and end of the requested date range or None"""
+        start = get_datetime_param(self.request, 'start')
+        end = get_datetime_param(self.request, 'end')
+        if start is None and end is None:
+            return None
+        if start is None or end is None:
+            raise ValidationError('Give both start and end of the range')
+        if end <= start:
+            raise ValidationError({'end': 'End must be after start'})
+        max_days = getattr(settings, 'EVENT_MAX_RANGE_DAYS', 366)
+        if end - start > timedelta(days=max_days):
+            raise ValidationError(
+                {'end': f'Range must not exceed {max_days} days'})
+
+        return start, end
+
+    def list(self, request, *args, **kwargs):
+        """Return events, or occurrences of events in the start-end range
+        with recurring events expanded, paginated alike"""
+        window = self.get_window()
+        if window is None:
+            return super().list(request, *args, **kwargs)
+
+        start, end = window
+        events = self.get_queryset().filter(
+            Q(recurrence=Event.ONCE, date__gte=start, date__lt=end) |
+            (~Q(recurrence=Event.ONCE) & Q(date__lt=end) &
+             (Q(recurrence_until__isnull=True) |
+              Q(recurrence_until__gte=start)))
+        )
+        occurrences = recurrence.expand(events, start, end)
+
+        paginator = OccurrencePagination()
+        page = paginator.paginate_queryset(occurrences, request, view=self)
+        if page is None:
+            return Response(self.get_serializer(occurrences, many=True).data)
+
+        return paginator.get_paginated_response(
+            self.get_serializer(page, many=True).data)
+
     def perform_create(self, serializer):
         """Create a new event"""
         return serializer.save(teacher=self.request.user)
+
+
+class EventFeedView(APIView):
+    """Return the private iCal feed url of the teacher"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        """Return signed url calendar apps can poll without a token"""
+        token = signing.Signer(salt=FEED_SALT).sign(str(request.user.pk))
+        url = reverse('event:ical', args=(token,))
+
+        return Response({'url': request.build_absolute_uri(url)})
+
+
+def _feed_state(request, token):
+    """Return teacher id, event count and last change time of the feed"""
+    if not hasattr(request, 'event_feed'):
+        try:
+            teacher = int(signing.Signer(salt=FEED_SALT).unsign(token))
+        except (signing.BadSignature, ValueError):
+            raise Http404
+        state = Event.objects.filter(teacher=teacher) \
+            .aggregate(count=Count('id'), updated=Max('updated_at'))
+        deleted = Tombstone.objects.filter(model='event') \
+            .aggregate(deleted=Max('deleted_at'))['deleted']
+        changes = [value for value in (state['updated'], deleted) if value]
+        request.event_feed = (teacher, state['count'],
+                              max(changes) if changes else None)
+
+    return request.event_feed
+
+
+def _feed_etag(request, token):
+    """Return ETag changing with any event of the feed"""
+    teacher, count, modified = _feed_state(request, token)
+    stamp = modified.isoformat() if modified else ''
+
+    return hashlib.md5(f'{teacher}:{count}:{stamp}'.encode()).hexdigest()
+
+
+def _feed_last_modified(request, token):
+    """Return time of the latest change of the feed events"""
+    return _feed_state(request, token)[2]
+
+
+@require_GET
+@condition(etag_func=_feed_etag, last_modified_func=_feed_last_modified)
+def ical_feed(request, token):
+    """Return events of the teacher as iCalendar"""
+    teacher, count, modified = _feed_state(request, token)
+    events = Event.objects.filter(teacher=teacher).order_by('date', 'id')
+    response = StreamingHttpResponse(
+        ical.iter_calendar(events.iterator(), request.get_host()),
+        content_type='text/calendar; charset=utf-8',
+    )
+    response['Cache-Control'] = 'private, no-cache'
+
+    return response
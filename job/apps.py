@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class JobConfig(AppConfig):
+    name = 'job'
+
+    def ready(self):
+        from job import registry
+        registry.autodiscover()
@@ -0,0 +1,42 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections, transaction
+
+
+class BaseBroker:
+    """Hand enqueued jobs over to workers"""
+
+    def __init__(self, **options):
+        self.options = options
+
+    def enqueue(self, job):
+        """Schedule the pending job to run"""
+        raise NotImplementedError
+
+
+class DatabaseBroker(BaseBroker):
+    """Leave pending jobs in the database for run_jobs workers"""
+
+    def enqueue(self, job):
+        """Nothing to do, workers poll the job table"""
+
+
+class ThreadBroker(BaseBroker):
+    """Run jobs in a thread pool of the web process"""
+
+    def __init__(self, workers=2, **options):
+        super().__init__(**options)
+        self.executor = ThreadPoolExecutor(max_workers=workers,
+                                           thread_name_prefix='job')
+
+    def enqueue(self, job):
+        """Submit the job once the transaction creating it commits"""
+        transaction.on_commit(lambda: self.executor.submit(self.run, job.pk))
+
+    def run(self, job_id):
+        """Run the job releasing connections of the worker thread"""
+        from job import worker
+        try:
+            worker.run_job_id(job_id)
+        finally:
+            connections.close_all()
@@ -0,0 +1,33 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from job import queue, worker
+
+
+class Command(BaseCommand):
+    """Run pending background jobs"""
+    help = 'Poll the job table and run pending jobs one by one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when no pending jobs are left')
+        parser.add_argument('--poll-interval', type=float,
+                            default=queue.get_config()['POLL_INTERVAL'],
+                            help='Seconds to wait when the queue is empty')
+
+    def handle(self, *args, **options):
+        while True:
+            close_old_connections()
+            job = worker.claim_next()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f'Running {job.name} #{job.pk}')
+            job = worker.run(job)
+            self.stdout.write(f'Finished {job.name} #{job.pk}: '
+                              f'{job.get_status_display()}')
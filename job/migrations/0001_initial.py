@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def move_content_type(apps, schema_editor):
+    """Keep permissions of jobs created while core owned the model"""
+    ContentType = apps.get_model('contenttypes', 'ContentType')
+    ContentType.objects.filter(app_label='core', model='job') \
+        .update(app_label='job')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('core', '0018_mark_unique'),
+    ]
+
+    # core_job was created by core, only the model state moves here
+    operations = [
+        migrations.SeparateDatabaseAndState(state_operations=[
+            migrations.CreateModel(
+                name='Job',
+                fields=[
+                    ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                    ('name', models.CharField(max_length=64)),
+                    ('params', models.TextField(default='{}')),
+                    ('status', models.CharField(choices=[('PEN', 'Ожидает'), ('RUN', 'Выполняется'), ('DON', 'Готово'), ('FAI', 'Ошибка')], default='PEN', max_length=3)),
+                    ('progress', models.PositiveSmallIntegerField(default=0)),
+                    ('message', models.CharField(blank=True, max_length=255)),
+                    ('result', models.TextField(blank=True)),
+                    ('input_file', models.FileField(blank=True, upload_to='jobs/input/')),
+                    ('result_file', models.FileField(blank=True, upload_to='jobs/result/')),
+                    ('error', models.TextField(blank=True)),
+                    ('created_at', models.DateTimeField(auto_now_add=True)),
+                    ('started_at', models.DateTimeField(blank=True, null=True)),
+                    ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                    ('finished_at', models.DateTimeField(blank=True, null=True)),
+                    ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+                ],
+                options={
+                    'db_table': 'core_job',
+                },
+            ),
+            migrations.AddIndex(
+                model_name='job',
+                index=models.Index(fields=['status', 'created_at'], name='core_job_status_38dcf0_idx'),
+            ),
+        ]),
+        migrations.RunPython(move_content_type,
+                             migrations.RunPython.noop),
+    ]
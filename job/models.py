@@ -0,0 +1,63 @@
+import json
+
+from django.conf import settings
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+
+class Job(models.Model):
+    """Background job run by a worker outside of the request"""
+    PENDING = 'PEN'
+    RUNNING = 'RUN'
+    DONE = 'DON'
+    FAILED = 'FAI'
+    STATUSES = (
+        (PENDING, _('Ожидает')),
+        (RUNNING, _('Выполняется')),
+        (DONE, _('Готово')),
+        (FAILED, _('Ошибка')),
+    )
+    name = models.CharField(max_length=64)
+    params = models.TextField(default='{}')
+    status = models.CharField(max_length=3, choices=STATUSES,
+                              default=PENDING)
+    progress = models.PositiveSmallIntegerField(default=0)
+    message = models.CharField(max_length=255, blank=True)
+    result = models.TextField(blank=True)
+    input_file = models.FileField(upload_to='jobs/input/', blank=True)
+    result_file = models.FileField(upload_to='jobs/result/', blank=True)
+    error = models.TextField(blank=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # Created by core before the job app had models
+        db_table = 'core_job'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def get_params(self):
+        """Return decoded job parameters"""
+        return json.loads(self.params)
+
+    def get_result(self):
+        """Return decoded job result"""
+        return json.loads(self.result) if self.result else None
+
+    def set_progress(self, progress, message=''):
+        """Store progress in percent reported by the running job"""
+        self.progress = max(0, min(100, int(progress)))
+        self.message = message[:255]
+        self.save(update_fields=['progress', 'message'])
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} - {self.status}'
@@ -0,0 +1,90 @@
+import json
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from job import registry
+from job.models import Job
+
+
+_lock = threading.Lock()
+_broker = None
+
+
+def get_config():
+    """Return job queue configuration with defaults applied"""
+    config = {
+        'BROKER': 'job.brokers.DatabaseBroker',
+        'OPTIONS': {},
+        'POLL_INTERVAL': 1,
+        'HEARTBEAT_INTERVAL': 10,
+        'STALE_AFTER': 60,
+    }
+    config.update(getattr(settings, 'JOB_QUEUE', {}))
+
+    return config
+
+
+def get_broker():
+    """Return broker configured in the JOB_QUEUE setting"""
+    global _broker
+    with _lock:
+        if _broker is None:
+            config = get_config()
+            _broker = import_string(config['BROKER'])(**config['OPTIONS'])
+
+    return _broker
+
+
+def encode_params(params):
+    """Return job parameters as stored in the job table"""
+    return json.dumps(params or {}, cls=DjangoJSONEncoder, sort_keys=True)
+
+
+def find(name, params, statuses):
+    """Return the newest job of the name and parameters in one of the
+    statuses, None if there is none"""
+    return Job.objects.filter(
+        name=name,
+        params=encode_params(params),
+        status__in=statuses,
+    ).order_by('-id').first()
+
+
+def fail_stale():
+    """Fail running jobs whose worker stopped sending heartbeats"""
+    cutoff = timezone.now() - timedelta(seconds=get_config()['STALE_AFTER'])
+
+    return Job.objects.filter(
+        Q(heartbeat_at__lt=cutoff) |
+        Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status=Job.RUNNING,
+    ).update(status=Job.FAILED, finished_at=timezone.now(),
+             error='Worker stopped responding')
+
+
+def enqueue(name, params=None, user=None, input_file=None, unique=False):
+    """Create a pending job and pass it to the broker, with unique return
+    pending or running job having the same name and parameters instead"""
+    if registry.get_task(name) is None:
+        raise LookupError(f'Job {name} is not registered')
+
+    if unique:
+        fail_stale()
+        job = find(name, params, (Job.PENDING, Job.RUNNING))
+        if job is not None:
+            return job
+    params = encode_params(params)
+
+    job = Job(name=name, params=params, user=user)
+    if input_file is not None:
+        job.input_file.save(input_file.name, input_file, save=False)
+    job.save()
+    get_broker().enqueue(job)
+
+    return job
@@ -0,0 +1,40 @@
+from django.utils.module_loading import autodiscover_modules
+
+
+_tasks = {}
+
+
+class Task:
+    """Function run by a worker for jobs of the given name"""
+
+    def __init__(self, name, func, staff_only):
+        self.name = name
+        self.func = func
+        self.staff_only = staff_only
+
+    def __call__(self, job, **params):
+        return self.func(job, **params)
+
+
+def register(name, staff_only=True):
+    """Register decorated function as the task of jobs with the name"""
+    def decorator(func):
+        _tasks[name] = Task(name, func, staff_only)
+        return func
+
+    return decorator
+
+
+def get_task(name):
+    """Return task registered under the name or None"""
+    return _tasks.get(name)
+
+
+def get_task_names():
+    """Return names of all registered tasks"""
+    return sorted(_tasks)
+
+
+def autodiscover():
+    """Import jobs modules of installed apps registering their tasks"""
+    autodiscover_modules('jobs')
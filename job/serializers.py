@@ -0,0 +1,45 @@
+from django.urls import reverse
+from rest_framework import serializers
+
+from job import registry
+from job.models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Serializer for job status, progress and result"""
+    result = serializers.SerializerMethodField()
+    download = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ('id', 'name', 'status', 'progress', 'message', 'result',
+                  'download', 'error', 'created_at', 'started_at',
+                  'finished_at')
+        read_only_fields = fields
+
+    def get_result(self, obj):
+        """Return decoded job result"""
+        return obj.get_result()
+
+    def get_download(self, obj):
+        """Return url of the result file if the job produced one"""
+        if not obj.result_file:
+            return None
+        url = reverse('job:job-download', args=(obj.pk,))
+        request = self.context.get('request')
+
+        return request.build_absolute_uri(url) if request else url
+
+
+class JobCreateSerializer(serializers.Serializer):
+    """Serializer for a job to enqueue"""
+    name = serializers.CharField(max_length=64)
+    params = serializers.DictField(required=False)
+
+    def validate_name(self, value):
+        """Check the job is registered"""
+        if registry.get_task(value) is None:
+            choices = ', '.join(registry.get_task_names())
+            raise serializers.ValidationError(f'Choose one of: {choices}')
+
+        return value
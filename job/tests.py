@@ -0,0 +1,235 @@
+import datetime
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.core.cache import caches
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import User, StudyYear, Subject, Mark, StudentClass, Student
+from job import queue, registry, worker
+from job.models import Job
+
+
+JOB_URL = '/api/job/jobs/'
+ANALYTICS_URL = '/api/journal/analytics/'
+EXPORT_URL = '/api/journal/journals/export/'
+
+
+def echo(job, **params):
+    """Return parameters of the job"""
+    return params
+
+
+def fail(job, **params):
+    """Raise error"""
+    raise ValueError('Broken')
+
+
+def failed_meanwhile(job, **params):
+    """Get failed by fail_stale while running"""
+    Job.objects.filter(pk=job.pk).update(status=Job.FAILED,
+                                         error='Worker stopped responding')
+    return params
+
+
+class TasksMixin:
+    """Register the tasks of these tests for the duration of a test"""
+
+    def setUp(self):
+        patcher = mock.patch.dict(registry._tasks)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for func in (echo, fail, failed_meanwhile):
+            registry.register(f'test.{func.__name__}')(func)
+
+
+class QueueTests(TasksMixin, TestCase):
+    """Jobs are enqueued once and claimed by one worker"""
+
+    def test_enqueue(self):
+        """Test enqueued job is pending with encoded parameters"""
+        job = queue.enqueue('test.echo', {'b': 2, 'a': 1})
+
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.params, '{"a": 1, "b": 2}')
+
+    def test_not_registered(self):
+        """Test jobs without a task are rejected"""
+        with self.assertRaises(LookupError):
+            queue.enqueue('test.missing')
+
+    def test_unique(self):
+        """Test unique jobs are enqueued again only once finished"""
+        job = queue.enqueue('test.echo', {'a': 1}, unique=True)
+
+        self.assertEqual(queue.enqueue('test.echo', {'a': 1}, unique=True),
+                         job)
+        self.assertNotEqual(
+            queue.enqueue('test.echo', {'a': 2}, unique=True), job)
+        worker.run_job_id(job.pk)
+        self.assertNotEqual(
+            queue.enqueue('test.echo', {'a': 1}, unique=True), job)
+
+    def test_claim(self):
+        """Test jobs are claimed oldest first and only once"""
+        first = queue.enqueue('test.echo')
+        second = queue.enqueue('test.echo')
+
+        claimed = worker.claim_next()
+        self.assertEqual(claimed, first)
+        self.assertEqual(claimed.status, Job.RUNNING)
+        self.assertIsNotNone(claimed.heartbeat_at)
+        self.assertFalse(worker.claim(first.pk))
+        self.assertEqual(worker.claim_next(), second)
+        self.assertIsNone(worker.claim_next())
+
+    def test_run(self):
+        """Test finished jobs store their result"""
+        job = worker.run_job_id(queue.enqueue('test.echo', {'a': 1}).pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(job.progress, 100)
+        self.assertEqual(job.get_result(), {'a': 1})
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(worker.run_job_id(job.pk))
+
+    def test_run_failed(self):
+        """Test errors of jobs are stored"""
+        with self.assertLogs('job.worker', 'ERROR'):
+            job = worker.run_job_id(queue.enqueue('test.fail').pk)
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.error, 'ValueError: Broken')
+
+    def test_failed_meanwhile(self):
+        """Test a job failed as stale stays failed when it finishes"""
+        with self.assertLogs('job.worker', 'WARNING'):
+            job = worker.run_job_id(
+                queue.enqueue('test.failed_meanwhile').pk)
+
+        self.assertEqual(job.status, Job.FAILED)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.error, 'Worker stopped responding')
+        self.assertIsNone(job.get_result())
+
+    def test_stale(self):
+        """Test running jobs without heartbeats are failed and unique
+        jobs are enqueued again"""
+        job = queue.enqueue('test.echo', unique=True)
+        worker.claim(job.pk)
+        old = timezone.now() - timedelta(
+            seconds=queue.get_config()['STALE_AFTER'] + 1)
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=old)
+
+        self.assertNotEqual(queue.enqueue('test.echo', unique=True), job)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_fresh_not_stale(self):
+        """Test running jobs with recent heartbeats are kept"""
+        job = queue.enqueue('test.echo')
+        worker.claim(job.pk)
+
+        self.assertEqual(queue.fail_stale(), 0)
+
+
+class HeartbeatTests(TasksMixin, TransactionTestCase):
+    """Running jobs are touched from a background thread"""
+
+    def test_heartbeat(self):
+        """Test heartbeat time of the running job moves on"""
+        job = queue.enqueue('test.echo')
+        worker.claim(job.pk)
+        job.refresh_from_db()
+        started = job.heartbeat_at
+
+        with worker.Heartbeat(job.pk, 0.01):
+            deadline = time.monotonic() + 5
+            while job.heartbeat_at == started and \
+                    time.monotonic() < deadline:
+                time.sleep(0.02)
+                job.refresh_from_db()
+
+        self.assertGreater(job.heartbeat_at, started)
+
+
+class ResultFlowTests(TestCase):
+    """Long requests answer 202 and the job result later"""
+
+    def setUp(self):
+        caches['default'].clear()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media)
+        media_override = override_settings(MEDIA_ROOT=media)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+
+        user = User.objects.create_user('admin@example.com', 'password123')
+        user.is_staff = True
+        user.save()
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        study_year = StudyYear.objects.create(year=2019)
+        subject = Subject.objects.create(name='Math', study_year=study_year)
+        student = Student.objects.create(
+            name='Name', surname='Surname', lastname='Test',
+            birth_date=datetime.date(2010, 1, 1), address='Address',
+            phone='000', student_class=StudentClass.objects.create(
+                name='5A', study_year=study_year))
+        for day, value in ((1, 'FIV'), (2, 'THR'), (3, 'ABS')):
+            Mark.objects.create(student=student, subject=subject,
+                                value=value, date=datetime.date(2019, 11, day))
+
+    def run_jobs(self):
+        """Run pending jobs as a worker would"""
+        while True:
+            job = worker.claim_next()
+            if job is None:
+                return
+            worker.run(job)
+
+    def test_analytics(self):
+        """Test analytics are computed by a job and then served"""
+        params = {'student_class': '5A', 'subject': 'Math'}
+        response = self.client.get(ANALYTICS_URL, params)
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response['Location'].endswith(
+            f'{JOB_URL}{response.data["id"]}/'))
+        again = self.client.get(ANALYTICS_URL, params)
+        self.assertEqual(again.status_code, 202)
+        self.assertEqual(again.data['id'], response.data['id'])
+
+        self.run_jobs()
+        job = self.client.get(response['Location']).data
+        self.assertEqual(job['status'], Job.DONE)
+
+        response = self.client.get(ANALYTICS_URL, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data, job['result'])
+
+    def test_export(self):
+        """Test background export writes a downloadable file"""
+        response = self.client.get(EXPORT_URL, {
+            'student_class': '5A', 'subject': 'Math', 'background': 1})
+        self.assertEqual(response.status_code, 202)
+
+        self.run_jobs()
+        job = self.client.get(response['Location']).data
+        self.assertEqual(job['status'], Job.DONE)
+        self.assertEqual(job['result'], {'marks': 3})
+
+        download = self.client.get(job['download'])
+        self.assertEqual(download.status_code, 200)
+        lines = b''.join(download.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 4)
+        self.assertTrue(lines[1].startswith('5A,Math,'))
@@ -0,0 +1,76 @@
+import os
+
+from django.http import FileResponse
+from django.urls import reverse
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from core.authentication import CachedTokenAuthentication
+from core.pagination import JobPagination
+from job import queue, registry, serializers
+from job.models import Job
+
+
+def accepted_response(job, request):
+    """Return 202 response pointing the client at the job status"""
+    data = serializers.JobSerializer(job, context={'request': request}).data
+    url = request.build_absolute_uri(reverse('job:job-detail',
+                                             args=(job.pk,)))
+
+    return Response(data, status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': url})
+
+
+class JobViewSet(viewsets.GenericViewSet,
+                 mixins.ListModelMixin,
+                 mixins.RetrieveModelMixin):
+    """Enqueue background jobs and poll their status"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+    queryset = Job.objects.all()
+    serializer_class = serializers.JobSerializer
+    pagination_class = JobPagination
+
+    def get_queryset(self):
+        """Retrieve jobs of the user, all jobs for staff"""
+        queryset = self.queryset
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(user=self.request.user)
+        job_status = self.request.query_params.get('status')
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+
+        return queryset
+
+    def get_serializer_class(self):
+        """Return appropriate serializer class"""
+        if self.action == 'create':
+            return serializers.JobCreateSerializer
+
+        return self.serializer_class
+
+    def create(self, request):
+        """Enqueue a registered job"""
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        name = serializer.validated_data['name']
+        if registry.get_task(name).staff_only and not request.user.is_staff:
+            raise PermissionDenied()
+
+        job = queue.enqueue(name, serializer.validated_data.get('params'),
+                            user=request.user)
+
+        return accepted_response(job, request)
+
+    @action(detail=True)
+    def download(self, request, pk=None):
+        """Return the result file of the job"""
+        job = self.get_object()
+        if not job.result_file:
+            raise NotFound('Job has no result file')
+
+        return FileResponse(job.result_file.open('rb'), as_attachment=True,
+                            filename=os.path.basename(job.result_file.name))
@@ -0,0 +1,116 @@
+import json
+import logging
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, connections
+from django.utils import timezone
+
+from job import registry
+from job.models import Job
+from job.queue import fail_stale, get_config
+
+
+logger = logging.getLogger(__name__)
+
+
+class Heartbeat:
+    """Touch the running job from a background thread, so that jobs of
+    crashed workers can be told apart from long running ones"""
+
+    def __init__(self, job_id, interval):
+        self.job_id = job_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._beat, daemon=True,
+                                        name=f'job-heartbeat-{job_id}')
+
+    def __enter__(self):
+        self._thread.start()
+
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _beat(self):
+        """Update heartbeat time until the job finishes"""
+        try:
+            while not self._stop.wait(self.interval):
+                try:
+                    Job.objects.filter(pk=self.job_id, status=Job.RUNNING) \
+                        .update(heartbeat_at=timezone.now())
+                except DatabaseError:
+                    logger.warning('Heartbeat of job #%s failed', self.job_id,
+                                   exc_info=True)
+        finally:
+            connections.close_all()
+
+
+def claim(job_id):
+    """Mark the pending job running, return False if it was taken"""
+    now = timezone.now()
+
+    return Job.objects.filter(pk=job_id, status=Job.PENDING) \
+        .update(status=Job.RUNNING, started_at=now, heartbeat_at=now) == 1
+
+
+def claim_next():
+    """Claim the oldest pending job, return None if there is none"""
+    fail_stale()
+    pending = Job.objects.filter(status=Job.PENDING) \
+        .order_by('created_at', 'id').values_list('id', flat=True)
+    while True:
+        job_id = pending.first()
+        if job_id is None:
+            return None
+        if claim(job_id):
+            return Job.objects.get(pk=job_id)
+
+
+def run(job):
+    """Run the claimed job storing its result or error"""
+    task = registry.get_task(job.name)
+    try:
+        if task is None:
+            raise LookupError(f'Job {job.name} is not registered')
+        with Heartbeat(job.pk, get_config()['HEARTBEAT_INTERVAL']):
+            result = task(job, **job.get_params())
+    except Exception as error:
+        logger.exception('Job %s #%s failed', job.name, job.pk)
+        job.status = Job.FAILED
+        job.error = f'{type(error).__name__}: {error}'
+    else:
+        job.status = Job.DONE
+        job.progress = 100
+        if result is not None:
+            job.result = json.dumps(result, cls=DjangoJSONEncoder)
+    job.finished_at = job.heartbeat_at = timezone.now()
+    # fail_stale may have failed the job meanwhile, keep its verdict
+    finished = Job.objects.filter(pk=job.pk, status=Job.RUNNING).update(
+        status=job.status,
+        progress=job.progress,
+        result=job.result,
+        input_file=job.input_file.name or '',
+        result_file=job.result_file.name or '',
+        error=job.error,
+        finished_at=job.finished_at,
+        heartbeat_at=job.heartbeat_at,
+    )
+    if not finished:
+        logger.warning('Job %s #%s finished after it was no longer running',
+                       job.name, job.pk)
+        if job.result_file:
+            job.result_file.delete(save=False)
+        job.refresh_from_db()
+
+    return job
+
+
+def run_job_id(job_id):
+    """Claim and run the job unless another worker took it"""
+    if claim(job_id):
+        return run(Job.objects.get(pk=job_id))
+
+    return None
@@ -0,0 +1,266 @@
+from array import array
+from datetime import date
+
+from django.conf import settings
+
+from core.models import Mark, Student, StudentClass, Subject
+from journal.filters import filter_marks, get_id_list_param
+
+
+CODES = {'PRE': 0, 'ABS': 1, 'TWO': 2, 'THR': 3, 'FOU': 4, 'FIV': 5}
+ABSENT = CODES['ABS']
+GRADES = ('TWO', 'THR', 'FOU', 'FIV')
+FIELDS = ('student_id', 'student__student_class_id', 'subject_id',
+          'date', 'value')
+
+
+def get_config():
+    """Return analytics configuration with defaults applied"""
+    config = {
+        'PERCENTILES': (25, 50, 75, 90),
+        'ROLLING_WINDOW': 4,
+        'MIN_GRADES': 3,
+        'AT_RISK_AVERAGE': 3.0,
+        'AT_RISK_ATTENDANCE': 0.8,
+        'AT_RISK_SLOPE': -0.1,
+        'CHUNK_SIZE': 2000,
+    }
+    config.update(getattr(settings, 'JOURNAL_ANALYTICS', {}))
+
+    return config
+
+
+def _numpy():
+    """Return numpy module, raise error if it is not installed"""
+    try:
+        import numpy
+    except ImportError:
+        raise RuntimeError('Journal analytics requires numpy')
+
+    return numpy
+
+
+def check_support():
+    """Raise error if analytics dependencies are not installed"""
+    _numpy()
+
+
+def select_marks(params):
+    """Return marks of the class, subject, study years and mark filters
+    given in query parameters"""
+    queryset = filter_marks(Mark.objects.all(), params)
+    student_class = params.get('student_class')
+    subject = params.get('subject')
+    study_years = get_id_list_param(params, 'study_year')
+    if student_class:
+        queryset = queryset.filter(student__student_class__name=student_class)
+    if subject:
+        queryset = queryset.filter(subject__name=subject)
+    if study_years:
+        queryset = queryset.filter(
+            student__student_class__study_year_id__in=study_years)
+
+    return queryset
+
+
+def load_columns(queryset, chunk_size):
+    """Read marks into compact columns of students, classes, subjects,
+    day numbers and value codes"""
+    students, classes, subjects, days = (array('q') for _ in range(4))
+    codes = array('b')
+    rows = queryset.order_by().values_list(*FIELDS).iterator(chunk_size)
+    for student_id, class_id, subject_id, day, value in rows:
+        students.append(student_id)
+        classes.append(class_id)
+        subjects.append(subject_id)
+        days.append(day.toordinal())
+        codes.append(CODES[value])
+
+    return students, classes, subjects, days, codes
+
+
+class Groups:
+    """Mark counts and grade sums of marks grouped by a key column"""
+
+    def __init__(self, np, keys, present, graded, grades, weeks=None):
+        self.np = np
+        self.ids, index = np.unique(keys, return_inverse=True)
+        size = self.ids.size
+        self.total = np.bincount(index, minlength=size)
+        self.attended = np.bincount(index, weights=present, minlength=size)
+        self.graded = np.bincount(index, weights=graded, minlength=size)
+        self.grade_sum = np.bincount(index, weights=grades, minlength=size)
+        if weeks is not None:
+            self.slope = self._slope(index, size, weeks * graded, grades)
+
+    def ratio(self, numerator, denominator):
+        """Divide arrays leaving nan where denominator is zero"""
+        np = self.np
+        result = np.full(numerator.shape, np.nan)
+        np.divide(numerator, denominator, out=result,
+                  where=denominator > 0)
+
+        return result
+
+    @property
+    def attendance(self):
+        """Share of marks where the student was not absent"""
+        return self.ratio(self.attended, self.total)
+
+    @property
+    def average(self):
+        """Average grade of graded marks"""
+        return self.ratio(self.grade_sum, self.graded)
+
+    def _slope(self, index, size, x, y):
+        """Least squares slope of grades by week within each group"""
+        np = self.np
+        n = self.graded
+        sx = np.bincount(index, weights=x, minlength=size)
+        sy = np.bincount(index, weights=y, minlength=size)
+        sxy = np.bincount(index, weights=x * y, minlength=size)
+        sxx = np.bincount(index, weights=x * x, minlength=size)
+
+        return self.ratio(n * sxy - sx * sy, n * sxx - sx * sx)
+
+
+def _number(value, digits=3):
+    """Return rounded float or None for nan"""
+    value = float(value)
+    if value != value:
+        return None
+
+    return round(value, digits)
+
+
+def _rolling_sum(np, values, window):
+    """Sum values over a sliding window ending at each position"""
+    sums = np.cumsum(values)
+    sums[window:] = sums[window:] - sums[:-window]
+
+    return sums
+
+
+def _grades(np, grades, percentiles):
+    """Return distribution, average and percentiles of grades"""
+    counts = np.bincount(grades, minlength=len(CODES))
+    result = {
+        'distribution': {code: int(counts[CODES[code]]) for code in GRADES},
+        'average': None,
+        'percentiles': {str(p): None for p in percentiles},
+    }
+    if grades.size:
+        result['average'] = _number(grades.mean())
+        values = np.percentile(grades, percentiles)
+        result['percentiles'] = {
+            str(p): _number(value) for p, value in zip(percentiles, values)
+        }
+
+    return result
+
+
+def _breakdown(groups, names):
+    """Return attendance and average grade of each group"""
+    return [
+        {
+            'id': int(group_id),
+            'name': names.get(int(group_id)),
+            'marks': int(total),
+            'attendance_rate': _number(attendance),
+            'average': _number(average),
+        }
+        for group_id, total, attendance, average in zip(
+            groups.ids, groups.total, groups.attendance, groups.average)
+    ]
+
+
+def _trend(np, groups, window):
+    """Return weekly attendance and averages with rolling averages"""
+    rolling = groups.ratio(_rolling_sum(np, groups.grade_sum, window),
+                           _rolling_sum(np, groups.graded, window))
+
+    return [
+        {
+            'week': date.fromordinal(int(week) * 7 + 1).isoformat(),
+            'marks': int(total),
+            'attendance_rate': _number(attendance),
+            'average': _number(average),
+            'rolling_average': _number(rolling_average),
+        }
+        for week, total, attendance, average, rolling_average in zip(
+            groups.ids, groups.total, groups.attendance, groups.average,
+            rolling)
+    ]
+
+
+def _at_risk(np, groups, config):
+    """Return students with low grades, attendance or declining grades"""
+    enough = groups.graded >= config['MIN_GRADES']
+    with np.errstate(invalid='ignore'):
+        flags = {
+            'average': enough & (groups.average < config['AT_RISK_AVERAGE']),
+            'attendance':
+                groups.attendance < config['AT_RISK_ATTENDANCE'],
+            'declining': enough & (groups.slope < config['AT_RISK_SLOPE']),
+        }
+    flagged = np.flatnonzero(np.logical_or.reduce(list(flags.values())))
+
+    ids = [int(groups.ids[i]) for i in flagged]
+    students = {
+        row['id']: row
+        for row in Student.objects.filter(id__in=ids)
+        .values('id', 'surname', 'name', 'lastname')
+    }
+
+    return [
+        {
+            'student': students.get(int(groups.ids[i])),
+            'average': _number(groups.average[i]),
+            'attendance_rate': _number(groups.attendance[i]),
+            'trend': _number(groups.slope[i]),
+            'reasons': [reason for reason, mask in flags.items() if mask[i]],
+        }
+        for i in flagged
+    ]
+
+
+def analyze(queryset):
+    """Compute attendance and grade statistics of the marks"""
+    np = _numpy()
+    config = get_config()
+    columns = load_columns(queryset, config['CHUNK_SIZE'])
+    students, classes, subjects, days, codes = (
+        np.frombuffer(column, dtype=column.typecode)
+        if column else np.zeros(0, dtype=column.typecode)
+        for column in columns
+    )
+
+    present = codes != ABSENT
+    graded = codes >= CODES['TWO']
+    grades = np.where(graded, codes, 0)
+    weeks = (days - 1) // 7
+
+    class_names = dict(StudentClass.objects
+                       .filter(id__in=np.unique(classes).tolist())
+                       .values_list('id', 'name'))
+    subject_names = dict(Subject.objects
+                         .filter(id__in=np.unique(subjects).tolist())
+                         .values_list('id', 'name'))
+
+    return {
+        'marks': int(codes.size),
+        'attendance': {
+            'present': int(present.sum()),
+            'absent': int(codes.size - present.sum()),
+            'rate': _number(present.mean()) if codes.size else None,
+        },
+        'grades': _grades(np, codes[graded], config['PERCENTILES']),
+        'classes': _breakdown(
+            Groups(np, classes, present, graded, grades), class_names),
+        'subjects': _breakdown(
+            Groups(np, subjects, present, graded, grades), subject_names),
+        'trend': _trend(np, Groups(np, weeks, present, graded, grades),
+                        config['ROLLING_WINDOW']),
+        'at_risk': _at_risk(np, Groups(np, students, present, graded,
+                                       grades, weeks=days / 7), config),
+    }
@@ -0,0 +1,118 @@
+import hashlib
+import json
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.response import Response
+
+
+HITS_KEY = 'journal:cache:hits'
+MISSES_KEY = 'journal:cache:misses'
+
+
+def get_cache():
+    """Return cache backend used for journal responses"""
+    return caches[getattr(settings, 'JOURNAL_CACHE_ALIAS', 'default')]
+
+
+def _version_key(model):
+    """Return cache key holding current version of the model data"""
+    return f'journal:version:{model._meta.label_lower}'
+
+
+def _new_version():
+    """Return version not used by any previously cached response"""
+    return time.time_ns()
+
+
+def get_versions(models):
+    """Return current data versions of the models"""
+    cache = get_cache()
+    keys = [_version_key(model) for model in models]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, _new_version(), timeout=None)
+            versions[key] = cache.get(key)
+
+    return [versions[key] for key in keys]
+
+
+def invalidate(*models):
+    """Make responses cached for the models stale"""
+    cache = get_cache()
+    for model in models:
+        key = _version_key(model)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), timeout=None)
+
+
+def _count(key):
+    """Increment monitoring counter"""
+    cache = get_cache()
+    if not cache.add(key, 1, timeout=None):
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+
+def get_stats():
+    """Return numbers of cache hits and misses"""
+    counters = get_cache().get_many([HITS_KEY, MISSES_KEY])
+
+    return {
+        'hits': counters.get(HITS_KEY, 0),
+        'misses': counters.get(MISSES_KEY, 0),
+    }
+
+
+class CachedResponseMixin:
+    """Cache list and retrieve responses until cached models change"""
+    cache_models = ()
+    cache_per_user = False
+    cache_timeout = 60 * 60
+
+    def list(self, request, *args, **kwargs):
+        """Return cached list response if available"""
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        """Return cached detail response if available"""
+        return self.cached_response(super().retrieve,
+                                    request, *args, **kwargs)
+
+    def cached_response(self, view, request, *args, **kwargs):
+        """Return response data from the cache or cache view response"""
+        cache = get_cache()
+        key = self.get_cache_key(request, kwargs)
+        data = cache.get(key)
+        if data is not None:
+            _count(HITS_KEY)
+            return Response(data)
+
+        _count(MISSES_KEY)
+        response = view(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, timeout=self.cache_timeout)
+
+        return response
+
+    def get_cache_key(self, request, kwargs):
+        """Return cache key of the request"""
+        parts = {
+            'view': type(self).__name__,
+            'action': self.action,
+            'kwargs': kwargs,
+            'query': sorted(request.query_params.lists()),
+            'versions': get_versions(self.cache_models),
+        }
+        if self.cache_per_user:
+            parts['user'] = request.user.pk
+        digest = hashlib.md5(
+            json.dumps(parts, sort_keys=True, default=str).encode())
+
+        return f'journal:response:{digest.hexdigest()}'
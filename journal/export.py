@@ -0,0 +1,65 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from core.models import Mark
+
+
+COLUMNS = ('student_class', 'subject', 'student_id', 'surname', 'name',
+           'lastname', 'date', 'value')
+VALUES_FIELDS = ('student__student_class__name', 'subject__name',
+                 'student_id', 'student__surname', 'student__name',
+                 'student__lastname', 'date', 'value')
+
+
+def export_queryset(student_class=None, subject=None,
+                    date_from=None, date_to=None):
+    """Return rows of marks to export ordered by class, subject, student"""
+    marks = Mark.objects.all()
+    if student_class:
+        marks = marks.filter(student__student_class__name=student_class)
+    if subject:
+        marks = marks.filter(subject__name=subject)
+    if date_from:
+        marks = marks.filter(date__gte=date_from)
+    if date_to:
+        marks = marks.filter(date__lte=date_to)
+
+    return marks.order_by('student__student_class__name', 'subject__name',
+                          'student_id', 'date', 'id') \
+        .values_list(*VALUES_FIELDS)
+
+
+class _Echo:
+    """File-like object handing written lines back to the caller"""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    """Yield CSV lines of the header and the rows"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_jsonl(rows):
+    """Yield a JSON object line per row"""
+    for row in rows:
+        yield json.dumps(dict(zip(COLUMNS, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'jsonl': (iter_jsonl, 'application/x-ndjson'),
+}
+
+
+def iter_export(queryset, output='csv', chunk_size=2000):
+    """Yield export lines fetching rows with a server-side cursor"""
+    render, content_type = FORMATS[output]
+
+    return render(queryset.iterator(chunk_size=chunk_size))
@@ -0,0 +1,87 @@
+import datetime
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+
+from core.models import Mark, StudyYear
+
+
+def get_date_param(params, name):
+    """Return date query parameter, raise error if it is malformed"""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        date = parse_date(value)
+    except ValueError:
+        date = None
+    if date is None:
+        raise ValidationError({name: 'Date has wrong format, use YYYY-MM-DD'})
+
+    return date
+
+
+def get_list_param(params, name):
+    """Return values of a repeated or comma separated query parameter"""
+    return [
+        value
+        for param in params.getlist(name)
+        for value in param.split(',') if value
+    ]
+
+
+def get_id_list_param(params, name):
+    """Return ids given in the query parameter as integers"""
+    values = get_list_param(params, name)
+    try:
+        return [int(value) for value in values]
+    except ValueError:
+        raise ValidationError({name: 'Expected comma separated ids'})
+
+
+def get_year_param(params, name):
+    """Return study year given in the query parameter as integer"""
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        year = int(value)
+    except ValueError:
+        year = None
+    # The study year ends in the next calendar year
+    if year is None or not datetime.MINYEAR <= year < datetime.MAXYEAR:
+        raise ValidationError({name: 'Expected a year, e.g. 2019'})
+
+    return year
+
+
+def filter_marks(queryset, params, current_year=False):
+    """Filter marks by study year, dates, students and values in the query,
+    only year and date bounds limit the marks partitions read, with
+    current_year marks of the current study year are read without them"""
+    year = get_year_param(params, 'year')
+    date_from = get_date_param(params, 'date_from')
+    date_to = get_date_param(params, 'date_to')
+    if current_year and not (year or date_from or date_to):
+        year = StudyYear.year_of(timezone.localdate())
+    students = get_id_list_param(params, 'student')
+    values = get_list_param(params, 'value')
+
+    codes = {code for code, name in Mark.MARK_VALUES}
+    if not codes.issuperset(values):
+        choices = ', '.join(sorted(codes))
+        raise ValidationError({'value': f'Choose from: {choices}'})
+
+    if year:
+        queryset = queryset.in_study_year(year)
+    if date_from:
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to:
+        queryset = queryset.filter(date__lte=date_to)
+    if students:
+        queryset = queryset.filter(student_id__in=students)
+    if values:
+        queryset = queryset.filter(value__in=values)
+
+    return queryset
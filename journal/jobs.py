@@ -0,0 +1,73 @@
+import tempfile
+
+from django.core.files import File
+from django.http import QueryDict
+
+from core.scope import filter_by_scope
+from job.registry import register
+from journal import analytics, export, roster
+from journal.filters import filter_marks
+
+
+def _query_dict(query):
+    """Return query parameters stored in job parameters as QueryDict"""
+    params = QueryDict(mutable=True)
+    for name, values in query.items():
+        params.setlist(name, values)
+
+    return params
+
+
+@register('journal.import_students')
+def import_students(job, create_classes=False):
+    """Create students of the roster file uploaded with the job"""
+    def progress(report):
+        rows = report['created'] + len(report['errors'])
+        job.set_progress(100 * rows / (total + 1),
+                         f'{report["created"]} students created, '
+                         f'{len(report["errors"])} rows rejected')
+
+    try:
+        with job.input_file.open('rb') as upload:
+            total = sum(1 for row in roster.read_rows(
+                upload, job.input_file.name))
+            upload.seek(0)
+            return roster.import_students(
+                roster.read_rows(upload, job.input_file.name),
+                create_classes=create_classes,
+                progress=progress,
+            )
+    finally:
+        job.input_file.delete(save=False)
+
+
+@register('journal.export')
+def export_marks(job, query, progress_every=10000):
+    """Write marks selected by the query the job user may read to the
+    job result file"""
+    params = _query_dict(query)
+    output = params.get('output', 'csv')
+    queryset = filter_marks(filter_by_scope(export.export_queryset(
+        student_class=params.get('student_class'),
+        subject=params.get('subject'),
+    ), job.user), params)
+    total = queryset.count()
+
+    rows = 0
+    with tempfile.TemporaryFile() as stream:
+        for rows, line in enumerate(export.iter_export(queryset, output)):
+            stream.write(line.encode())
+            if rows and rows % progress_every == 0:
+                job.set_progress(100 * rows / (total + 1),
+                                 f'{rows} of {total} marks written')
+        job.result_file.save(f'journal-{job.pk}.{output}', File(stream),
+                             save=False)
+
+    return {'marks': total}
+
+
+@register('journal.analytics')
+def compute_analytics(job, query, cache_key=None):
+    """Compute statistics of marks selected by the query, the cache key
+    identifies the data version the view serves the result for"""
+    return analytics.analyze(analytics.select_marks(_query_dict(query)))
@@ -0,0 +1,104 @@
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from rest_framework.renderers import JSONRenderer
+
+from core import compression
+from core.models import Mark
+from core.renderers import MessagePackRenderer
+from journal import serializers
+
+
+def cpu_ms(func, iterations):
+    """Return result of the function and its average CPU time"""
+    start = time.process_time()
+    for iteration in range(iterations):
+        result = func()
+
+    return result, (time.process_time() - start) * 1000 / iterations
+
+
+class Command(BaseCommand):
+    """Compare journal payload sizes and encoding costs"""
+    help = 'Measure bytes and CPU time of journal response encodings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student-class', help='Class name')
+        parser.add_argument('--subject', help='Subject name')
+        parser.add_argument('--date-from', help='First date, YYYY-MM-DD')
+        parser.add_argument('--date-to', help='Last date, YYYY-MM-DD')
+        parser.add_argument('--iterations', type=int, default=10)
+        parser.add_argument('--output', help='Write results to JSON file')
+
+    def handle(self, *args, **options):
+        data = self.get_journal(options)
+        self.stdout.write(f'{len(data)} marks')
+
+        renderers = {'json': JSONRenderer()}
+        try:
+            import msgpack  # noqa: F401
+            renderers['msgpack'] = MessagePackRenderer()
+        except ImportError:
+            self.stdout.write('msgpack is not installed, skipping it')
+
+        config = compression.get_config()
+        encodings = ['identity'] + compression.available_encodings(config)
+        iterations = options['iterations']
+
+        results = {}
+        for name, renderer in renderers.items():
+            content, render_ms = cpu_ms(lambda: renderer.render(data),
+                                        iterations)
+            for encoding in encodings:
+                body, compress_ms = content, 0.0
+                if encoding != 'identity':
+                    compress = compression.CODECS[encoding][0]
+                    body, compress_ms = cpu_ms(
+                        lambda: compress(content, config), iterations)
+                results[f'{name} {encoding}'] = {
+                    'bytes': len(body),
+                    'render_ms': render_ms,
+                    'compress_ms': compress_ms,
+                }
+
+        baseline = results['json identity']['bytes'] or 1
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<18} {result['bytes']:>10} B "
+                f"{100 * result['bytes'] / baseline:6.1f} %  "
+                f"render {result['render_ms']:8.2f} ms  "
+                f"compress {result['compress_ms']:8.2f} ms")
+
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump({'marks': len(data), 'results': results}, stream,
+                          indent=2)
+
+    def get_journal(self, options):
+        """Return journal list data of a class and subject for a term"""
+        student_class = options['student_class']
+        subject = options['subject']
+        if not (student_class and subject):
+            largest = Mark.objects \
+                .values('student__student_class__name', 'subject__name') \
+                .annotate(marks=Count('id')).order_by('-marks').first()
+            if largest is None:
+                raise CommandError('No marks found, '
+                                   'run generate_school first')
+            student_class = largest['student__student_class__name']
+            subject = largest['subject__name']
+        self.stdout.write(f'Journal of {student_class}, {subject}')
+
+        marks = Mark.objects.for_journal(student_class, subject) \
+            .order_by('student_id', 'date', 'id')
+        if options['date_from']:
+            marks = marks.filter(date__gte=options['date_from'])
+        if options['date_to']:
+            marks = marks.filter(date__lte=options['date_to'])
+
+        return serializers.MarkListSerializer(
+            marks.values(*serializers.MarkListSerializer.values_fields),
+            many=True,
+        ).data
@@ -0,0 +1,118 @@
+import csv
+import io
+import json
+import time
+import tracemalloc
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import StudentClass
+from journal import roster
+
+
+COLUMNS = ('surname', 'name', 'lastname', 'birth_date', 'address', 'phone',
+           'student_class', 'study_year')
+
+
+class Command(BaseCommand):
+    """Measure the roster import on a generated CSV file"""
+    help = 'Import a generated roster and roll it back, reporting speed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--students', type=int, default=50000)
+        parser.add_argument('--batch-sizes', type=int, nargs='+',
+                            default=[100, 1000, 5000])
+        parser.add_argument('--invalid-every', type=int, default=100,
+                            help='Make every n-th row invalid, 0 for none')
+        parser.add_argument('--memory', action='store_true',
+                            help='Trace peak memory, slows the import down')
+        parser.add_argument('--output', help='Write results to JSON file')
+
+    def handle(self, *args, **options):
+        classes = self.get_classes()
+        content = self.build_roster(classes, options['students'],
+                                    options['invalid_every'])
+        self.stdout.write(f'Roster of {options["students"]} rows, '
+                          f'{len(content) / 1024:.0f} KiB, '
+                          f'{len(classes)} classes')
+
+        results = {}
+        for batch_size in options['batch_sizes']:
+            result = self.measure(content, batch_size, options['memory'])
+            results[batch_size] = result
+            line = (f"batch {batch_size:>6}  {result['seconds']:7.2f} s  "
+                    f"{result['rows_per_second']:9.0f} rows/s  "
+                    f"created {result['created']}  "
+                    f"rejected {result['rejected']}")
+            if options['memory']:
+                line += f"  peak {result['peak_memory_kb']:9.1f} KiB"
+            self.stdout.write(line)
+
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump({
+                    'created': timezone.now().isoformat(),
+                    'database': connection.vendor,
+                    'students': options['students'],
+                    'results': results,
+                }, stream, indent=2)
+
+    def get_classes(self):
+        """Return names and study years of classes, generating them with
+        generate_school when there are none"""
+        classes = list(StudentClass.objects.values_list(
+            'name', 'study_year__year'))
+        if not classes:
+            call_command('generate_school', students=0, weeks=0,
+                         teachers=0, stdout=self.stdout)
+            classes = list(StudentClass.objects.values_list(
+                'name', 'study_year__year'))
+        if not classes:
+            raise CommandError('No classes to import students into')
+
+        return classes
+
+    def build_roster(self, classes, students, invalid_every):
+        """Return CSV roster of students spread over the classes"""
+        stream = io.StringIO()
+        writer = csv.writer(stream)
+        writer.writerow(COLUMNS)
+        for number in range(students):
+            name, year = classes[number % len(classes)]
+            birth_date = f'{year - 10}-{1 + number % 12:02}-' \
+                         f'{1 + number % 28:02}'
+            if invalid_every and number % invalid_every == invalid_every - 1:
+                birth_date = 'unknown'
+            writer.writerow((f'Surname {number}', f'Name {number}',
+                             'Imported', birth_date, 'Generated', '000',
+                             name, year))
+
+        return stream.getvalue().encode()
+
+    def measure(self, content, batch_size, memory=False):
+        """Import the roster in a transaction rolled back afterwards"""
+        if memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        with transaction.atomic():
+            report = roster.import_students(
+                roster.read_csv(io.BytesIO(content)), batch_size=batch_size)
+            seconds = time.perf_counter() - start
+            transaction.set_rollback(True)
+
+        rows = report['created'] + len(report['errors'])
+        result = {
+            'seconds': seconds,
+            'rows_per_second': rows / seconds,
+            'created': report['created'],
+            'rejected': len(report['errors']),
+        }
+        if memory:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            result['peak_memory_kb'] = peak / 1024
+
+        return result
@@ -0,0 +1,76 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.renderers import JSONRenderer
+
+from core.benchmark import summarize, timed
+from core.models import Mark, Student
+from journal import serializers
+
+
+class Command(BaseCommand):
+    """Compare model and values() row serializers of list endpoints"""
+    help = 'Measure serialization time of mark and student lists'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--marks', type=int, default=10000,
+                            help='Number of marks and students to serialize')
+        parser.add_argument('--iterations', type=int, default=5)
+        parser.add_argument('--output', help='Write results to JSON file')
+
+    def handle(self, *args, **options):
+        count = options['marks']
+        marks = Mark.objects.order_by('date', 'id')[:count]
+        students = Student.objects.order_by('id')[:count]
+        if len(marks) < count:
+            raise CommandError(f'Only {len(marks)} marks found, '
+                               f'run generate_school first')
+
+        cases = {
+            'marks': (
+                serializers.MarkSerializer,
+                list(marks.select_related('subject',
+                                          'student__student_class')),
+                serializers.MarkListSerializer,
+                list(marks.values(
+                    *serializers.MarkListSerializer.values_fields)),
+            ),
+            'students': (
+                serializers.StudentSerializer,
+                list(students.select_related('student_class')),
+                serializers.StudentListSerializer,
+                list(students.values(
+                    *serializers.StudentListSerializer.values_fields)),
+            ),
+        }
+
+        results = {}
+        for name, (model_serializer, objects,
+                   list_serializer, rows) in cases.items():
+            before = self.measure(model_serializer, objects,
+                                  options['iterations'])
+            after = self.measure(list_serializer, rows,
+                                 options['iterations'])
+            if before.pop('content') != after.pop('content'):
+                raise CommandError(f'Serializers of {name} differ in output')
+            results[name] = {'rows': len(rows), 'model': before,
+                             'values': after}
+            self.stdout.write(
+                f"{name:<9} {len(rows):>7} rows  "
+                f"{model_serializer.__name__} {before['p50_ms']:9.2f} ms  "
+                f"{list_serializer.__name__} {after['p50_ms']:9.2f} ms  "
+                f"{before['p50_ms'] / after['p50_ms']:5.1f}x")
+
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump(results, stream, indent=2)
+
+    def measure(self, serializer_class, objects, iterations):
+        """Return serialization timings and rendered output of objects
+        already fetched from the database"""
+        timings = timed(
+            lambda: serializer_class(objects, many=True).data, iterations)
+        content = JSONRenderer().render(
+            serializer_class(objects, many=True).data)
+
+        return {**summarize(timings), 'content': content}
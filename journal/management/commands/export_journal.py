@@ -0,0 +1,37 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from journal import export
+
+
+class Command(BaseCommand):
+    """Export journal marks as CSV or JSON lines"""
+    help = 'Stream marks of a class, subject and date range to a file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--student-class', help='Class name')
+        parser.add_argument('--subject', help='Subject name')
+        parser.add_argument('--date-from', help='First date, YYYY-MM-DD')
+        parser.add_argument('--date-to', help='Last date, YYYY-MM-DD')
+        parser.add_argument('--format', dest='output', default='csv',
+                            choices=sorted(export.FORMATS))
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--output', dest='path',
+                            help='File to write, standard output by default')
+
+    def handle(self, *args, **options):
+        queryset = export.export_queryset(
+            student_class=options['student_class'],
+            subject=options['subject'],
+            date_from=options['date_from'],
+            date_to=options['date_to'],
+        )
+        lines = export.iter_export(queryset, options['output'],
+                                   options['chunk_size'])
+
+        if options['path']:
+            with open(options['path'], 'w', newline='') as stream:
+                stream.writelines(lines)
+        else:
+            sys.stdout.writelines(lines)
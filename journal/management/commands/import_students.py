@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from journal import roster
+
+
+class Command(BaseCommand):
+    """Import students from a CSV or XLSX roster"""
+    help = ('Create students from a roster with columns surname, name, '
+            'lastname, birth_date, address, phone, student_class, study_year')
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV or XLSX file')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--create-classes', action='store_true',
+                            help='Create missing classes and study years')
+
+    def handle(self, *args, **options):
+        with open(options['path'], 'rb') as stream:
+            try:
+                report = roster.import_students(
+                    roster.read_rows(stream, options['path']),
+                    batch_size=options['batch_size'],
+                    create_classes=options['create_classes'],
+                )
+            except ValueError as error:
+                raise CommandError(error)
+
+        for error in report['errors']:
+            self.stderr.write(f"Line {error['line']}: {error['errors']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {report['created']} students, "
+            f"skipped {len(report['errors'])} rows"))
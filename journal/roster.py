@@ -0,0 +1,138 @@
+import codecs
+import csv
+from datetime import datetime
+from itertools import islice
+
+from django.db import transaction
+from rest_framework import serializers
+
+from core.models import Student, StudentClass, StudyYear
+from journal import cache
+
+
+class StudentRowSerializer(serializers.Serializer):
+    """Serializer validating a roster row"""
+    surname = serializers.CharField(max_length=255)
+    name = serializers.CharField(max_length=255)
+    lastname = serializers.CharField(max_length=255, allow_blank=True)
+    birth_date = serializers.DateField()
+    address = serializers.CharField(max_length=255, allow_blank=True)
+    phone = serializers.CharField(max_length=32, allow_blank=True)
+    student_class = serializers.CharField(max_length=12)
+    study_year = serializers.IntegerField(min_value=1)
+
+
+class ClassLookup:
+    """In-memory table of class ids by class name and study year"""
+
+    def __init__(self, create=False):
+        self.create = create
+        self.years = dict(StudyYear.objects.values_list('year', 'id'))
+        self.classes = {
+            (name, year): class_id
+            for class_id, name, year in StudentClass.objects.values_list(
+                'id', 'name', 'study_year__year')
+        }
+
+    def get(self, name, year):
+        """Return id of the class, create it if allowed"""
+        class_id = self.classes.get((name, year))
+        if class_id is None and self.create:
+            if year not in self.years:
+                self.years[year] = StudyYear.objects.create(year=year).id
+            class_id = StudentClass.objects.create(
+                name=name, study_year_id=self.years[year]).id
+            self.classes[(name, year)] = class_id
+
+        return class_id
+
+
+def read_csv(stream):
+    """Yield rows of a CSV byte stream as dicts"""
+    return csv.DictReader(codecs.iterdecode(stream, 'utf-8-sig'))
+
+
+def read_xlsx(stream):
+    """Yield rows of the first XLSX sheet as dicts"""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError('Reading XLSX files requires openpyxl')
+
+    sheet = load_workbook(stream, read_only=True).active
+    rows = sheet.iter_rows(values_only=True)
+    header = [str(cell).strip() for cell in next(rows, ())]
+    for row in rows:
+        yield {
+            column: _from_cell(value) for column, value in zip(header, row)
+        }
+
+
+def _from_cell(value):
+    """Convert XLSX cell value to what row serializer expects"""
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        return value.date()
+
+    return value
+
+
+def read_rows(stream, filename):
+    """Yield roster rows of a file choosing reader by extension"""
+    if filename.lower().endswith('.xlsx'):
+        return read_xlsx(stream)
+
+    return read_csv(stream)
+
+
+def import_students(rows, batch_size=1000, create_classes=False,
+                    progress=None):
+    """Create students of valid rows in batches, report invalid rows,
+    progress is called with the report after every batch"""
+    classes = ClassLookup(create=create_classes)
+    # Fields are built once and reused for every row
+    validator = StudentRowSerializer()
+    report = {'created': 0, 'errors': []}
+    # Line 1 of the file holds column names
+    numbered = enumerate(rows, start=2)
+
+    while True:
+        batch = list(islice(numbered, batch_size))
+        if not batch:
+            break
+
+        students = []
+        for line, row in batch:
+            try:
+                data = validator.run_validation(row)
+            except serializers.ValidationError as error:
+                report['errors'].append({
+                    'line': line,
+                    'errors': {
+                        field: [str(message) for message in messages]
+                        for field, messages in error.detail.items()
+                    },
+                })
+                continue
+
+            class_name = data.pop('student_class')
+            class_id = classes.get(class_name, data.pop('study_year'))
+            if class_id is None:
+                report['errors'].append({
+                    'line': line,
+                    'errors': {'student_class': [
+                        f'Class {class_name} does not exist']},
+                })
+                continue
+            students.append(Student(student_class_id=class_id, **data))
+
+        with transaction.atomic():
+            Student.objects.bulk_create(students)
+        report['created'] += len(students)
+        if progress is not None:
+            progress(report)
+
+    cache.invalidate(Student, StudentClass)
+
+    return report
@@ -1,13 +1,18 @@
+from collections import OrderedDict
+
+from django.db import transaction
 from rest_framework import serializers
 from core.models import (
     StudyYear,
     Subject,
     Mark,
+    MarkSummary,
     StudentClass,
     Student,
     TeacherSubject,
     School,
 )
+from journal import cache
 
 
 class StudyYearSerializer(serializers.ModelSerializer):
@@ -48,6 +53,39 @@ class StudentSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+def _iso(value):
+    """Format date the way DRF date fields do"""
+    return None if value is None else value.isoformat()
+
+
+def _student_from_row(row, prefix=''):
+    """Represent student of a values() row like StudentSerializer"""
+    return OrderedDict((
+        ('id', row[prefix + 'id']),
+        ('surname', row[prefix + 'surname']),
+        ('name', row[prefix + 'name']),
+        ('lastname', row[prefix + 'lastname']),
+        ('birth_date', _iso(row[prefix + 'birth_date'])),
+        ('address', row[prefix + 'address']),
+        ('phone', row[prefix + 'phone']),
+        ('student_class', OrderedDict((
+            ('id', row[prefix + 'student_class_id']),
+            ('name', row[prefix + 'student_class__name']),
+        ))),
+    ))
+
+
+class StudentListSerializer(serializers.BaseSerializer):
+    """Read-only serializer for student rows fetched with values()"""
+    values_fields = ('id', 'surname', 'name', 'lastname', 'birth_date',
+                     'address', 'phone', 'student_class_id',
+                     'student_class__name')
+
+    def to_representation(self, row):
+        """Return the same data as StudentSerializer"""
+        return _student_from_row(row)
+
+
 class MarkSerializer(serializers.ModelSerializer):
     """Serializer for mark object"""
     subject = SubjectSerializer(read_only=True)
@@ -67,6 +105,93 @@ class MarkSerializer(serializers.ModelSerializer):
         read_only_fields = ('id',)
 
 
+class MarkListSerializer(serializers.BaseSerializer):
+    """Read-only serializer for mark rows fetched with values()"""
+    values_fields = ('id', 'value', 'date', 'subject_id', 'subject__name',
+                     'student_id') + tuple(
+        f'student__{field}' for field in StudentListSerializer.values_fields
+    )
+
+    def to_representation(self, row):
+        """Return the same data as MarkSerializer"""
+        return OrderedDict((
+            ('id', row['id']),
+            ('value', row['value']),
+            ('date', _iso(row['date'])),
+            ('subject', OrderedDict((
+                ('id', row['subject_id']),
+                ('name', row['subject__name']),
+            ))),
+            ('student', _student_from_row(row, 'student__')),
+        ))
+
+
+class CompactMarkSerializer(serializers.ModelSerializer):
+    """Serializer for mark object referencing relations by id"""
+
+    class Meta:
+        model = Mark
+        fields = ('id', 'value', 'date', 'student_id', 'subject_id')
+        read_only_fields = fields
+
+
+class BulkMarkSerializer(serializers.ListSerializer):
+    """Serializer for creating or updating many marks at once"""
+
+    def validate(self, attrs):
+        """Check that referenced students and subjects exist"""
+        for model, field in ((Student, 'student_id'), (Subject, 'subject_id')):
+            ids = {entry[field] for entry in attrs}
+            found = model.objects.filter(id__in=ids) \
+                .values_list('id', flat=True)
+            missing = sorted(ids.difference(found))
+            if missing:
+                msg = f'Invalid {field} values: {missing}'
+                raise serializers.ValidationError(msg, code='does_not_exist')
+
+        return attrs
+
+    def create(self, validated_data):
+        """Update marks existing for student, subject and date, create rest"""
+        values = {
+            (entry['student_id'], entry['subject_id'], entry['date']):
+                entry['value']
+            for entry in validated_data
+        }
+        with transaction.atomic():
+            marks = Mark.objects.upsert(values)
+            MarkSummary.objects.schedule_refresh(
+                (student_id, subject_id)
+                for student_id, subject_id, date in values
+            )
+        cache.invalidate(Mark)
+
+        return marks
+
+
+class MarkEntrySerializer(serializers.Serializer):
+    """Serializer for a single mark of bulk input"""
+    id = serializers.IntegerField(read_only=True)
+    student_id = serializers.IntegerField()
+    subject_id = serializers.IntegerField()
+    date = serializers.DateField()
+    value = serializers.ChoiceField(choices=Mark.MARK_VALUES)
+
+    class Meta:
+        list_serializer_class = BulkMarkSerializer
+
+
+class MarkSummarySerializer(serializers.ModelSerializer):
+    """Serializer for mark summary object"""
+
+    class Meta:
+        model = MarkSummary
+        fields = ('id', 'student_id', 'subject_id', 'pre_count', 'abs_count',
+                  'two_count', 'thr_count', 'fou_count', 'fiv_count',
+                  'average', 'last_date')
+        read_only_fields = fields
+
+
 class TeacherSubjectSerializer(serializers.ModelSerializer):
     """Serializer for subject object"""
     student_classes = StudentClassSerializer(read_only=True, many=True)
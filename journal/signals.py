@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+
+from core.models import (
+    StudyYear,
+    Subject,
+    StudentClass,
+    Student,
+    School,
+    Mark,
+)
+from journal import cache
+
+
+def invalidate_cached_responses(sender, **kwargs):
+    """Make cached responses built from the changed model stale"""
+    cache.invalidate(sender)
+
+
+for model in (StudyYear, Subject, StudentClass, Student, School, Mark):
+    post_save.connect(invalidate_cached_responses, sender=model)
+    post_delete.connect(invalidate_cached_responses, sender=model)
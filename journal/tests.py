@@ -0,0 +1,786 @@
+import datetime
+import importlib.util
+import io
+from unittest import mock, skipUnless
+
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import QueryDict
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import partitions
+from journal import analytics, cache
+from core.scope import get_teaching_scope
+from core.models import (
+    User,
+    StudyYear,
+    Subject,
+    Mark,
+    MarkSummary,
+    StudentClass,
+    Student,
+    TeacherSubject,
+)
+
+
+JOURNAL_URL = '/api/journal/journals/'
+MARK_URL = '/api/journal/marks/'
+BULK_URL = '/api/journal/marks/bulk/'
+SUMMARY_URL = '/api/journal/mark_summaries/'
+STUDY_YEAR_URL = '/api/journal/study_years/'
+STUDENT_URL = '/api/journal/students/'
+GRID_URL = '/api/journal/journals/grid/'
+EXPORT_URL = '/api/journal/journals/export/'
+ANALYTICS_URL = '/api/journal/analytics/'
+
+
+def teach(user, subject, *classes):
+    """Make the user teacher of the subject in the classes"""
+    teacher_subject = TeacherSubject.objects.create(name=subject.name)
+    teacher_subject.student_classes.add(*classes)
+    user.teaching_subjects.add(teacher_subject)
+
+
+class JournalQueryCountTests(TestCase):
+    """Journal endpoints run the same queries for any class size"""
+
+    def setUp(self):
+        caches['default'].clear()
+        user = User.objects.create_user('teacher@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        study_year = StudyYear.objects.create(year=2019)
+        self.subject = Subject.objects.create(name='Math',
+                                              study_year=study_year)
+        self.small = self.create_class('5A', study_year, 5)
+        self.large = self.create_class('5B', study_year, 10)
+        teach(user, self.subject, self.small, self.large)
+        # Scope cache misses are counted by TeachingScopeTests
+        get_teaching_scope(user.pk)
+
+    def create_class(self, name, study_year, size):
+        """Create class of students with three marks each"""
+        student_class = StudentClass.objects.create(name=name,
+                                                    study_year=study_year)
+        Student.objects.bulk_create(
+            Student(name=f'Name {number}', surname=f'Surname {number}',
+                    lastname='Test', birth_date=datetime.date(2010, 1, 1),
+                    address='Address', phone='000',
+                    student_class=student_class)
+            for number in range(size)
+        )
+        Mark.objects.bulk_create(
+            Mark(student=student, subject=self.subject, value='FIV',
+                 date=datetime.date(2019, 11, day))
+            for student in Student.objects.filter(student_class=student_class)
+            for day in range(1, 4)
+        )
+
+        return student_class
+
+    def assert_constant(self, expected, url, **params):
+        """Assert both classes take the expected number of queries"""
+        with self.assertNumQueries(expected):
+            self.request(url, self.small, **params)
+        with self.assertNumQueries(expected):
+            self.request(url, self.large, **params)
+
+    def request(self, url, student_class, **params):
+        """Make journal request of the class reading the whole response"""
+        response = self.client.get(url, {
+            'student_class': student_class.name,
+            'subject': self.subject.name,
+            'year': 2019,
+            **params,
+        })
+        if response.streaming:
+            b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200)
+
+        return response
+
+    def test_list_queries(self):
+        """Test journal list runs one query"""
+        self.assert_constant(1, JOURNAL_URL)
+
+    def test_compact_list_queries(self):
+        """Test compact journal list runs one query"""
+        self.assert_constant(1, JOURNAL_URL, compact=1)
+
+    def test_grid_queries(self):
+        """Test journal grid runs one query for students and one for marks"""
+        self.assert_constant(2, GRID_URL)
+
+    def test_export_queries(self):
+        """Test journal export runs one query"""
+        self.assert_constant(1, EXPORT_URL)
+
+    def test_grid_rows(self):
+        """Test journal grid has a row per student of the class"""
+        response = self.request(GRID_URL, self.large)
+
+        self.assertEqual(len(response.data['rows']), 10)
+        self.assertEqual(len(response.data['dates']), 3)
+
+    def test_year_out_of_range(self):
+        """Test study year out of the supported range is rejected"""
+        for year in ('0', '9999', '-5', '2019x'):
+            response = self.client.get(MARK_URL, {'year': year})
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('year', response.data)
+
+
+class CommittedMarksTestCase(TransactionTestCase):
+    """Base of tests needing commits of mark changes"""
+
+    def setUp(self):
+        caches['default'].clear()
+        user = User.objects.create_user('teacher@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        study_year = StudyYear.objects.create(year=2019)
+        self.subject = Subject.objects.create(name='Math',
+                                              study_year=study_year)
+        student_class = StudentClass.objects.create(name='5A',
+                                                    study_year=study_year)
+        teach(user, self.subject, student_class)
+        self.student, self.other = (
+            Student.objects.create(
+                name=name, surname='Surname', lastname='Test',
+                birth_date=datetime.date(2010, 1, 1), address='Address',
+                phone='000', student_class=student_class)
+            for name in ('First', 'Second')
+        )
+
+    def create_mark(self, value, day, student=None):
+        """Create mark of the student in the subject"""
+        return Mark.objects.create(student=student or self.student,
+                                   subject=self.subject, value=value,
+                                   date=datetime.date(2019, 11, day))
+
+    def get_summary(self, student=None):
+        """Return summary of the student in the subject"""
+        return MarkSummary.objects.get(student=student or self.student,
+                                       subject=self.subject)
+
+
+class MarkSummaryTests(CommittedMarksTestCase):
+    """Summaries follow marks once their transaction commits"""
+
+    def test_refresh_on_save(self):
+        """Test summary counts and averages saved marks"""
+        self.create_mark('FIV', 1)
+        self.create_mark('THR', 2)
+        self.create_mark('ABS', 3)
+
+        summary = self.get_summary()
+        self.assertEqual((summary.fiv_count, summary.thr_count,
+                          summary.abs_count), (1, 1, 1))
+        self.assertEqual(summary.average, 4)
+        self.assertEqual(summary.last_date, datetime.date(2019, 11, 3))
+
+    def test_refresh_on_move(self):
+        """Test mark moved to another student leaves the old summary"""
+        mark = self.create_mark('FIV', 1)
+        mark.student = self.other
+        mark.save()
+
+        self.assertFalse(MarkSummary.objects.filter(
+            student=self.student).exists())
+        self.assertEqual(self.get_summary(self.other).fiv_count, 1)
+
+    def test_refresh_on_delete(self):
+        """Test summary drops deleted marks"""
+        self.create_mark('FIV', 1)
+        self.create_mark('TWO', 2).delete()
+
+        summary = self.get_summary()
+        self.assertEqual((summary.fiv_count, summary.two_count), (1, 0))
+
+    def test_rollback_drops_pending(self):
+        """Test refreshes of a rolled back transaction are not run later"""
+        with transaction.atomic():
+            self.create_mark('FIV', 1)
+            transaction.set_rollback(True)
+        MarkSummary.objects.create(student=self.student, subject=self.subject,
+                                   fiv_count=5)
+        with transaction.atomic():
+            self.create_mark('TWO', 2, student=self.other)
+
+        self.assertEqual(self.get_summary().fiv_count, 5)
+
+    def test_rebuild_command(self):
+        """Test rebuild replaces summaries with ones computed from marks"""
+        self.create_mark('FIV', 1)
+        self.create_mark('FOU', 2, student=self.other)
+        MarkSummary.objects.all().update(fiv_count=7)
+
+        call_command('rebuild_mark_summaries', stdout=io.StringIO())
+
+        self.assertEqual(self.get_summary().fiv_count, 1)
+        self.assertEqual(self.get_summary(self.other).fou_count, 1)
+
+    def test_filters(self):
+        """Test summaries filter by id lists and reject other values"""
+        self.create_mark('FIV', 1)
+        self.create_mark('FOU', 2, student=self.other)
+
+        response = self.client.get(SUMMARY_URL, {
+            'student': f'{self.student.pk},{self.other.pk}'})
+        self.assertEqual(len(response.data['results']), 2)
+        response = self.client.get(SUMMARY_URL, {'student': self.other.pk})
+        self.assertEqual([row['student_id']
+                          for row in response.data['results']],
+                         [self.other.pk])
+        for param in ('student', 'subject', 'student_class'):
+            response = self.client.get(SUMMARY_URL, {param: 'abc'})
+            self.assertEqual(response.status_code, 400)
+
+
+class BulkMarkTests(CommittedMarksTestCase):
+    """Bulk mark entry creates and updates marks in one request"""
+
+    def entry(self, day, value, student=None):
+        """Return bulk input of a mark of the student"""
+        return {'student_id': (student or self.student).pk,
+                'subject_id': self.subject.pk,
+                'date': f'2019-11-{day:02}', 'value': value}
+
+    def test_create_and_update(self):
+        """Test existing marks are updated and missing ones created"""
+        mark = self.create_mark('TWO', 1)
+
+        response = self.client.post(BULK_URL, [
+            self.entry(1, 'FIV'),
+            self.entry(2, 'FOU'),
+            self.entry(1, 'THR', self.other),
+        ], format='json')
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.data), 3)
+        self.assertIn(mark.pk, [entry['id'] for entry in response.data])
+        self.assertEqual(Mark.objects.count(), 3)
+        mark.refresh_from_db()
+        self.assertEqual(mark.value, 'FIV')
+
+    def test_summary_refresh(self):
+        """Test summaries count marks written in bulk"""
+        self.create_mark('TWO', 1)
+
+        self.client.post(BULK_URL, [self.entry(1, 'FIV'),
+                                    self.entry(2, 'FOU')], format='json')
+
+        summary = self.get_summary()
+        self.assertEqual((summary.two_count, summary.fou_count,
+                          summary.fiv_count), (0, 1, 1))
+        self.assertEqual(summary.average, 4.5)
+
+    def test_invalid_ids(self):
+        """Test unknown students and subjects are rejected as a whole"""
+        for field in ('student_id', 'subject_id'):
+            entry = self.entry(2, 'FIV')
+            entry[field] = 0
+            response = self.client.post(
+                BULK_URL, [self.entry(1, 'FIV'), entry], format='json')
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(field, str(response.data))
+        self.assertFalse(Mark.objects.exists())
+
+    def test_unique_marks(self):
+        """Test a student has one mark per subject and date"""
+        self.create_mark('FIV', 1)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            self.create_mark('TWO', 1)
+
+
+class ResponseCacheTests(TestCase):
+    """Reference data responses are cached until their models change"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(
+            'teacher@example.com', 'password123'))
+        self.study_year = StudyYear.objects.create(year=2019)
+
+    def tearDown(self):
+        cache.get_cache().clear()
+
+    def get_years(self, **params):
+        """Return years of the study year list"""
+        response = self.client.get(STUDY_YEAR_URL, params)
+        self.assertEqual(response.status_code, 200)
+
+        return [row['year'] for row in response.data['results']]
+
+    def test_hit(self):
+        """Test repeated request is answered from the cache"""
+        self.assertEqual(self.get_years(), [2019])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_years(), [2019])
+        self.assertEqual(cache.get_stats(), {'hits': 1, 'misses': 1})
+
+    def test_keyed_by_query(self):
+        """Test requests of other query parameters are cached apart"""
+        self.get_years()
+
+        with self.assertNumQueries(1):
+            self.get_years(page_size=1)
+
+    def test_invalidated_on_save(self):
+        """Test saving a model makes its cached responses stale"""
+        self.get_years()
+
+        StudyYear.objects.create(year=2020)
+
+        self.assertEqual(sorted(self.get_years()), [2019, 2020])
+
+    def test_invalidated_on_delete(self):
+        """Test deleting a model makes its cached responses stale"""
+        StudyYear.objects.create(year=2020)
+        self.get_years()
+
+        StudyYear.objects.filter(year=2020).delete()
+
+        self.assertEqual(self.get_years(), [2019])
+
+    def test_invalidated_by_related_model(self):
+        """Test students are stale once their classes change"""
+        student_class = StudentClass.objects.create(
+            name='5A', study_year=self.study_year)
+        Student.objects.create(
+            name='Name', surname='Surname', lastname='Test',
+            birth_date=datetime.date(2010, 1, 1), address='Address',
+            phone='000', student_class=student_class)
+        self.client.get(STUDENT_URL)
+
+        student_class.name = '6A'
+        student_class.save()
+
+        response = self.client.get(STUDENT_URL)
+        self.assertEqual(
+            response.data['results'][0]['student_class']['name'], '6A')
+
+    def test_version_not_reused(self):
+        """Test versions lost from the cache do not come back"""
+        versions = cache.get_versions([StudyYear])
+        cache.get_cache().clear()
+
+        cache.invalidate(StudyYear)
+
+        self.assertNotEqual(cache.get_versions([StudyYear]), versions)
+
+
+class MarkFilterTests(TestCase):
+    """Mark list filters are applied in the database and validated"""
+
+    def setUp(self):
+        caches['default'].clear()
+        user = User.objects.create_user('teacher@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        study_year = StudyYear.objects.create(year=2019)
+        self.subject = Subject.objects.create(name='Math',
+                                              study_year=study_year)
+        self.classes = [
+            StudentClass.objects.create(name=name, study_year=study_year)
+            for name in ('5A', '5B')
+        ]
+        teach(user, self.subject, *self.classes)
+        self.students = [
+            Student.objects.create(
+                name=f'Name {number}', surname='Surname', lastname='Test',
+                birth_date=datetime.date(2010, 1, 1), address='Address',
+                phone='000', student_class=self.classes[number % 2])
+            for number in range(3)
+        ]
+        values = ('PRE', 'ABS', 'FIV', 'TWO')
+        for student in self.students:
+            for day, value in enumerate(values, start=1):
+                Mark.objects.create(student=student, subject=self.subject,
+                                    value=value,
+                                    date=datetime.date(2019, 11, day))
+
+    def get_marks(self, params):
+        """Return (student id, day, value) of listed marks"""
+        response = self.client.get(MARK_URL, {'year': 2019, **params})
+        self.assertEqual(response.status_code, 200)
+
+        return sorted(
+            (row['student']['id'], int(row['date'][-2:]), row['value'])
+            for row in response.data['results']
+        )
+
+    def assert_rejected(self, params, field):
+        """Assert the query is answered with an error of the field"""
+        response = self.client.get(MARK_URL, params)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(field, response.data)
+
+    def test_dates(self):
+        """Test marks are limited to the date range, ends included"""
+        marks = self.get_marks({'date_from': '2019-11-02',
+                                'date_to': '2019-11-03'})
+
+        self.assertEqual({day for student, day, value in marks}, {2, 3})
+        self.assertEqual(len(marks), 6)
+
+    def test_student_lists(self):
+        """Test comma separated and repeated student ids combine"""
+        first, second, third = (student.pk for student in self.students)
+        for params in ({'student': f'{first},{third}'},
+                       {'student': [first, third]},
+                       {'student': [f'{first},', str(third)]}):
+            marks = self.get_marks(params)
+
+            self.assertEqual({student for student, day, value in marks},
+                             {first, third})
+
+    def test_class_and_subject(self):
+        """Test marks are limited to the class and subject ids"""
+        marks = self.get_marks({'student_class': self.classes[1].pk,
+                                'subject': self.subject.pk})
+
+        self.assertEqual({student for student, day, value in marks},
+                         {self.students[1].pk})
+
+    def test_values(self):
+        """Test marks are limited to the values"""
+        marks = self.get_marks({'value': 'FIV,TWO'})
+
+        self.assertEqual({value for student, day, value in marks},
+                         {'FIV', 'TWO'})
+        self.assertEqual(len(marks), 6)
+
+    def test_invalid(self):
+        """Test malformed filters answer 400 naming the parameter"""
+        self.assert_rejected({'student': '1,abc'}, 'student')
+        self.assert_rejected({'student_class': 'x'}, 'student_class')
+        self.assert_rejected({'subject': '1.5'}, 'subject')
+        self.assert_rejected({'date_from': '2019-13-01'}, 'date_from')
+        self.assert_rejected({'date_to': 'yesterday'}, 'date_to')
+        self.assert_rejected({'value': 'SIX'}, 'value')
+
+
+class TeachingScopeTests(TestCase):
+    """Teachers read marks of subjects and classes they teach only"""
+
+    def setUp(self):
+        caches['default'].clear()
+        self.user = User.objects.create_user('teacher@example.com',
+                                             'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        study_year = StudyYear.objects.create(year=2019)
+        self.math, self.physics = (
+            Subject.objects.create(name=name, study_year=study_year)
+            for name in ('Math', 'Physics')
+        )
+        self.classes = [
+            StudentClass.objects.create(name=name, study_year=study_year)
+            for name in ('5A', '5B')
+        ]
+        for student_class in self.classes:
+            student = Student.objects.create(
+                name='Name', surname='Surname', lastname='Test',
+                birth_date=datetime.date(2010, 1, 1), address='Address',
+                phone='000', student_class=student_class)
+            for subject in (self.math, self.physics):
+                Mark.objects.create(student=student, subject=subject,
+                                    value='FIV',
+                                    date=datetime.date(2019, 11, 1))
+        teach(self.user, self.math, self.classes[0])
+        self.teacher_subject = self.user.teaching_subjects.get()
+
+    def get_marks(self):
+        """Return (class name, subject name) of listed marks"""
+        response = self.client.get(MARK_URL, {'year': 2019})
+        self.assertEqual(response.status_code, 200)
+
+        return sorted((row['student']['student_class']['name'],
+                       row['subject']['name'])
+                      for row in response.data['results'])
+
+    def test_marks(self):
+        """Test marks of other classes and subjects are hidden"""
+        self.assertEqual(self.get_marks(), [('5A', 'Math')])
+
+    def test_staff(self):
+        """Test staff read marks of all classes and subjects"""
+        self.user.is_staff = True
+
+        self.assertEqual(len(self.get_marks()), 4)
+
+    def test_journal(self):
+        """Test journal of a class the teacher does not teach is empty"""
+        params = {'student_class': '5B', 'subject': 'Math', 'year': 2019}
+
+        response = self.client.get(JOURNAL_URL, params)
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get(GRID_URL, params)
+        self.assertEqual(response.data['dates'], [])
+        response = self.client.get(EXPORT_URL, params)
+        self.assertEqual(len(b''.join(response.streaming_content)
+                             .splitlines()), 1)
+
+    def test_summaries(self):
+        """Test summaries of other classes and subjects are hidden"""
+        call_command('rebuild_mark_summaries', stdout=io.StringIO())
+        response = self.client.get(SUMMARY_URL)
+
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_scope_cached(self):
+        """Test the scope is read once and then served from the cache"""
+        with self.assertNumQueries(2):
+            self.client.get(MARK_URL, {'year': 2019})
+        with self.assertNumQueries(1):
+            self.client.get(MARK_URL, {'year': 2019})
+
+    def test_class_added(self):
+        """Test classes added to a taught subject become readable"""
+        self.get_marks()
+        self.teacher_subject.student_classes.add(self.classes[1])
+
+        self.assertEqual(self.get_marks(), [('5A', 'Math'), ('5B', 'Math')])
+
+    def test_subject_removed(self):
+        """Test subjects taken from the teacher stop being readable"""
+        self.get_marks()
+        self.user.teaching_subjects.remove(self.teacher_subject)
+
+        self.assertEqual(self.get_marks(), [])
+
+    def test_teacher_added(self):
+        """Test subjects given through the reverse relation are readable"""
+        self.get_marks()
+        teacher_subject = TeacherSubject.objects.create(name='Physics')
+        teacher_subject.student_classes.add(self.classes[0])
+        teacher_subject.user_set.add(self.user)
+
+        self.assertEqual(self.get_marks(),
+                         [('5A', 'Math'), ('5A', 'Physics')])
+
+
+class CurrentYearTests(TestCase):
+    """Journal and mark lists read the current study year by default"""
+
+    def setUp(self):
+        user = User.objects.create_user('admin@example.com', 'password123')
+        user.is_staff = True
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        self.today = timezone.localdate()
+        self.year = StudyYear.year_of(self.today)
+        study_year = StudyYear.objects.create(year=self.year)
+        subject = Subject.objects.create(name='Math', study_year=study_year)
+        student = Student.objects.create(
+            name='Name', surname='Surname', lastname='Test',
+            birth_date=datetime.date(2010, 1, 1), address='Address',
+            phone='000', student_class=StudentClass.objects.create(
+                name='5A', study_year=study_year))
+        self.old = Mark.objects.create(
+            student=student, subject=subject, value='TWO',
+            date=StudyYear.date_range(self.year - 1)[0])
+        self.current = Mark.objects.create(student=student, subject=subject,
+                                           value='FIV', date=self.today)
+        self.journal = {'student_class': '5A', 'subject': 'Math'}
+
+    def get_ids(self, url, **params):
+        """Return ids of the listed marks"""
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+
+        return [row['id'] for row in response.data['results']]
+
+    def test_marks(self):
+        """Test marks list reads the current year unless told otherwise"""
+        self.assertEqual(self.get_ids(MARK_URL), [self.current.pk])
+        self.assertEqual(self.get_ids(MARK_URL, year=self.year - 1),
+                         [self.old.pk])
+        self.assertEqual(
+            self.get_ids(MARK_URL, date_from=self.old.date.isoformat()),
+            [self.old.pk, self.current.pk])
+
+    def test_journal(self):
+        """Test journal list and grid read the current year by default"""
+        self.assertEqual(self.get_ids(JOURNAL_URL, **self.journal),
+                         [self.current.pk])
+        response = self.client.get(GRID_URL, self.journal)
+        self.assertEqual(response.data['dates'], [self.today.isoformat()])
+
+    def test_retrieve(self):
+        """Test marks of past years are still read by id"""
+        response = self.client.get(f'{MARK_URL}{self.old.pk}/')
+
+        self.assertEqual(response.status_code, 200)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partitioning needs PostgreSQL')
+class PartitionPruningTests(CurrentYearTests):
+    """Default journal and mark lists read one partition of marks"""
+
+    def setUp(self):
+        super().setUp()
+        with connection.cursor() as cursor:
+            for year in (self.year - 1, self.year):
+                partitions.create_partition(cursor, year)
+
+    def get_plan(self, url, **params):
+        """Return query plan of the marks query of the request"""
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get(url, params).status_code, 200)
+        sql = next(query['sql'] for query in queries
+                   if partitions.TABLE in query['sql'])
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN {sql}')
+            return '\n'.join(row[0] for row in cursor.fetchall())
+
+    def assert_pruned(self, plan):
+        """Assert the plan reads only the partition of the current year"""
+        self.assertIn(partitions.partition_name(self.year), plan)
+        self.assertNotIn(partitions.partition_name(self.year - 1), plan)
+        self.assertNotIn(partitions.DEFAULT_PARTITION, plan)
+
+    def test_marks_pruned(self):
+        """Test marks list reads only the current year partition"""
+        self.assert_pruned(self.get_plan(MARK_URL))
+
+    def test_journal_pruned(self):
+        """Test journal list and grid read only the current partition"""
+        self.assert_pruned(self.get_plan(JOURNAL_URL, **self.journal))
+        self.assert_pruned(self.get_plan(GRID_URL, **self.journal))
+
+
+@skipUnless(importlib.util.find_spec('numpy'), 'Analytics needs numpy')
+class AnalyticsTests(TestCase):
+    """Analytics count attendance and grades of the selected marks"""
+
+    def setUp(self):
+        study_year = StudyYear.objects.create(year=2019)
+        math, physics = (
+            Subject.objects.create(name=name, study_year=study_year)
+            for name in ('Math', 'Physics')
+        )
+        first, second = (
+            StudentClass.objects.create(name=name, study_year=study_year)
+            for name in ('5A', '5B')
+        )
+        marks = (
+            ('Improving', first, math, (('FOU', 4), ('FIV', 5), ('FIV', 11),
+                                        ('PRE', 12))),
+            ('Low', first, math, (('TWO', 4), ('TWO', 5), ('THR', 11))),
+            ('Absent', second, physics, (('PRE', 4), ('THR', 11),
+                                         ('ABS', 18), ('ABS', 19))),
+        )
+        self.students = {}
+        for surname, student_class, subject, values in marks:
+            student = self.students[surname] = Student.objects.create(
+                name='Name', surname=surname, lastname='Test',
+                birth_date=datetime.date(2010, 1, 1), address='Address',
+                phone='000', student_class=student_class)
+            for value, day in values:
+                Mark.objects.create(student=student, subject=subject,
+                                    value=value,
+                                    date=datetime.date(2019, 11, day))
+
+    def test_totals(self):
+        """Test attendance and grade statistics of all marks"""
+        result = analytics.analyze(Mark.objects.all())
+
+        self.assertEqual(result['marks'], 11)
+        self.assertEqual(result['attendance'],
+                         {'present': 9, 'absent': 2, 'rate': 0.818})
+        self.assertEqual(result['grades'], {
+            'distribution': {'TWO': 2, 'THR': 2, 'FOU': 1, 'FIV': 2},
+            'average': 3.429,
+            'percentiles': {'25': 2.5, '50': 3.0, '75': 4.5, '90': 5.0},
+        })
+
+    def test_breakdowns(self):
+        """Test classes and subjects are summarized separately"""
+        result = analytics.analyze(Mark.objects.all())
+
+        self.assertEqual(
+            [(row['name'], row['marks'], row['attendance_rate'],
+              row['average']) for row in result['classes']],
+            [('5A', 7, 1.0, 3.5), ('5B', 4, 0.5, 3.0)])
+        self.assertEqual(
+            [(row['name'], row['marks'], row['attendance_rate'],
+              row['average']) for row in result['subjects']],
+            [('Math', 7, 1.0, 3.5), ('Physics', 4, 0.5, 3.0)])
+
+    def test_trend(self):
+        """Test weekly figures start on Mondays with rolling averages"""
+        result = analytics.analyze(Mark.objects.all())
+
+        self.assertEqual(result['trend'], [
+            {'week': '2019-11-04', 'marks': 5, 'attendance_rate': 1.0,
+             'average': 3.25, 'rolling_average': 3.25},
+            {'week': '2019-11-11', 'marks': 4, 'attendance_rate': 1.0,
+             'average': 3.667, 'rolling_average': 3.429},
+            {'week': '2019-11-18', 'marks': 2, 'attendance_rate': 0.0,
+             'average': None, 'rolling_average': 3.429},
+        ])
+
+    def test_at_risk(self):
+        """Test students with low grades or attendance are flagged"""
+        result = analytics.analyze(Mark.objects.all())
+
+        self.assertEqual(
+            [(row['student']['surname'], row['reasons'])
+             for row in result['at_risk']],
+            [('Low', ['average']), ('Absent', ['attendance'])])
+        low = result['at_risk'][0]
+        self.assertEqual((low['average'], low['attendance_rate'],
+                          low['trend']), (2.333, 1.0, 1.058))
+
+    def test_declining(self):
+        """Test students whose grades fall are flagged"""
+        Mark.objects.filter(student=self.students['Improving'],
+                            date=datetime.date(2019, 11, 11)) \
+            .update(value='TWO')
+
+        result = analytics.analyze(Mark.objects.all())
+
+        self.assertEqual(result['at_risk'][0]['student']['surname'],
+                         'Improving')
+        self.assertEqual(result['at_risk'][0]['reasons'], ['declining'])
+
+    def test_selection(self):
+        """Test query parameters select the analyzed marks"""
+        for query, count in (('student_class=5B', 4), ('subject=Math', 7),
+                             ('date_from=2019-11-11', 6), ('value=ABS', 2)):
+            queryset = analytics.select_marks(QueryDict(query))
+
+            self.assertEqual(analytics.analyze(queryset)['marks'], count)
+
+    def test_empty(self):
+        """Test no marks give empty statistics"""
+        result = analytics.analyze(Mark.objects.none())
+
+        self.assertEqual(result['marks'], 0)
+        self.assertIsNone(result['attendance']['rate'])
+        self.assertIsNone(result['grades']['average'])
+        self.assertEqual(result['at_risk'], [])
+
+    def test_numpy_missing(self):
+        """Test the endpoint answers 503 without numpy"""
+        user = User.objects.create_user('admin@example.com', 'password123')
+        user.is_staff = True
+        client = APIClient()
+        client.force_authenticate(user)
+        with mock.patch.object(analytics, '_numpy',
+                               side_effect=RuntimeError('No numpy')):
+            response = client.get(ANALYTICS_URL)
+
+        self.assertEqual(response.status_code, 503)
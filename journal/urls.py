@@ -8,13 +8,16 @@ router = DefaultRouter()
 router.register('study_years', views.StudyYearViewSet)
 router.register('subjects', views.SubjectViewSet)
 router.register('marks', views.MarkViewSet)
+router.register('mark_summaries', views.MarkSummaryViewSet)
 router.register('student_classes', views.StudentClassViewSet)
 router.register('students', views.StudentViewSet)
 router.register('journals', views.JournalAPIView)
 router.register('school', views.SchoolViewSet)
+router.register('analytics', views.AnalyticsViewSet, basename='analytics')
 
 app_name = 'journal'
 
 urlpatterns = [
+    path('cache_stats/', views.CacheStatsView.as_view(), name='cache-stats'),
     path('', include(router.urls)),
 ]
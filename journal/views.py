@@ -1,70 +1,139 @@
-from itertools import chain
-
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import IsAuthenticated
+from django.http import StreamingHttpResponse
+from rest_framework import viewsets, mixins, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated, IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from core.authentication import CachedTokenAuthentication
 from core.models import (
     StudyYear,
     Subject,
     Mark,
+    MarkSummary,
     StudentClass,
     Student,
     School,
 )
-from journal import serializers
+from core.pagination import MarkPagination, JournalPagination
+from core.scope import filter_by_scope
+from job import queue
+from job.models import Job
+from job.views import accepted_response
+from journal import analytics, export, serializers
+from journal.cache import CachedResponseMixin, get_cache, get_stats
+from journal.filters import filter_marks, get_id_list_param
 
 
 class BaseJournalAttrViewSet(viewsets.GenericViewSet,
                              mixins.ListModelMixin,
                              mixins.RetrieveModelMixin,):
     """Base viewset for journal attributes"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
 
 
-class StudyYearViewSet(BaseJournalAttrViewSet):
+class StudyYearViewSet(CachedResponseMixin, BaseJournalAttrViewSet):
     """Manage study year in the database"""
     queryset = StudyYear.objects.all()
     serializer_class = serializers.StudyYearSerializer
+    cache_models = (StudyYear,)
 
 
-class SubjectViewSet(BaseJournalAttrViewSet):
+class SubjectViewSet(CachedResponseMixin, BaseJournalAttrViewSet):
     """Manage subjects in the database"""
     queryset = Subject.objects.all()
     serializer_class = serializers.SubjectSerializer
+    cache_models = (Subject,)
 
 
 class MarkViewSet(BaseJournalAttrViewSet,
                   mixins.CreateModelMixin,
                   mixins.UpdateModelMixin):
-    """Manage marks in the database"""
+    """Manage marks in subjects and classes the teacher teaches, the list
+    reads the current study year unless year=, date_from= or date_to= is
+    given"""
     queryset = Mark.objects.all()
     serializer_class = serializers.MarkSerializer
+    pagination_class = MarkPagination
 
     def get_queryset(self):
-        """Retrieve all marks by student and subject"""
-        queryset = self.queryset
-        student = self.request.query_params.get('student')
-        subject = self.request.query_params.get('subject')
-        if student:
-            queryset = queryset.filter(student__id=student)
-        if subject:
-            queryset = queryset.filter(subject__id=subject)
+        """Retrieve marks by students, subjects, class, dates and values"""
+        params = self.request.query_params
+        queryset = filter_marks(
+            filter_by_scope(self.queryset, self.request.user), params,
+            current_year=self.action == 'list')
+        subjects = get_id_list_param(params, 'subject')
+        student_class = get_id_list_param(params, 'student_class')
+        if subjects:
+            queryset = queryset.filter(subject_id__in=subjects)
+        if student_class:
+            queryset = queryset.filter(
+                student__student_class_id__in=student_class)
+        if self.action == 'list':
+            queryset = queryset.values(
+                *serializers.MarkListSerializer.values_fields)
 
         return queryset
 
+    def get_serializer_class(self):
+        """Return appropriate serializer class"""
+        if self.action == 'bulk':
+            return serializers.MarkEntrySerializer
+        if self.action == 'list':
+            return serializers.MarkListSerializer
+
+        return self.serializer_class
+
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Create or update marks of many students in one request"""
+        serializer = self.get_serializer(data=request.data, many=True,
+                                         allow_empty=False)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
 
-class StudentClassViewSet(BaseJournalAttrViewSet):
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+
+class MarkSummaryViewSet(BaseJournalAttrViewSet):
+    """Read aggregated marks of students in subjects and classes the
+    teacher teaches"""
+    queryset = MarkSummary.objects.all()
+    serializer_class = serializers.MarkSummarySerializer
+
+    def get_queryset(self):
+        """Retrieve summaries by student, subject and class"""
+        params = self.request.query_params
+        queryset = filter_by_scope(self.queryset, self.request.user)
+        students = get_id_list_param(params, 'student')
+        subjects = get_id_list_param(params, 'subject')
+        student_class = get_id_list_param(params, 'student_class')
+        if students:
+            queryset = queryset.filter(student_id__in=students)
+        if subjects:
+            queryset = queryset.filter(subject_id__in=subjects)
+        if student_class:
+            queryset = queryset.filter(
+                student__student_class_id__in=student_class)
+
+        return queryset
+
+
+class StudentClassViewSet(CachedResponseMixin, BaseJournalAttrViewSet):
     """Manage classes in the database"""
     queryset = StudentClass.objects.all()
     serializer_class = serializers.StudentClassSerializer
+    cache_models = (StudentClass,)
 
 
-class StudentViewSet(BaseJournalAttrViewSet):
+class StudentViewSet(CachedResponseMixin, BaseJournalAttrViewSet):
     """Manage students in the database"""
     queryset = Student.objects.all()
     serializer_class = serializers.StudentSerializer
+    cache_models = (Student, StudentClass)
 
     def get_queryset(self):
         """Retrieve students for authenticated user by class"""
@@ -72,35 +141,191 @@ class StudentViewSet(BaseJournalAttrViewSet):
         queryset = self.queryset
         if student_class:
             queryset = queryset.filter(student_class__name=student_class)
+        if self.action == 'list':
+            queryset = queryset.values(
+                *serializers.StudentListSerializer.values_fields)
 
         return queryset
 
+    def get_serializer_class(self):
+        """Return appropriate serializer class"""
+        if self.action == 'list':
+            return serializers.StudentListSerializer
+
+        return self.serializer_class
+
+    @action(detail=False, methods=['post'], url_path='import',
+            parser_classes=(MultiPartParser,),
+            permission_classes=(IsAdminUser,))
+    def import_roster(self, request):
+        """Create students from an uploaded CSV or XLSX roster"""
+        upload = request.data.get('file')
+        if upload is None:
+            raise ValidationError({'file': 'No roster file uploaded'})
+
+        create_classes = request.data.get('create_classes', '')
+        job = queue.enqueue('journal.import_students', {
+            'create_classes': create_classes.lower() in ('1', 'true'),
+        }, user=request.user, input_file=upload)
+
+        return accepted_response(job, request)
+
 
 class JournalAPIView(viewsets.ModelViewSet):
-    """Combine data from other serializer to form journal"""
-    authentication_classes = (TokenAuthentication,)
+    """Combine data from other serializer to form journal of classes and
+    subjects the teacher teaches, the list and grid read the current study
+    year unless year=, date_from= or date_to= is given"""
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     serializer_class = serializers.MarkSerializer
+    pagination_class = JournalPagination
     queryset = Mark.objects.all()
 
     def get_queryset(self):
-        """Retrieve journal data from multiple serializers"""
+        """Retrieve journal marks of a class in a subject"""
         student_class = self.request.query_params.get('student_class', None)
         subject = self.request.query_params.get('subject', None)
 
-        students_queryset = Student.objects.filter(
-            student_class__name=student_class)
-        mark_querysets = []
+        queryset = filter_by_scope(
+            self.queryset.for_journal(student_class, subject),
+            self.request.user).order_by('student_id', 'date', 'id')
+        queryset = filter_marks(queryset, self.request.query_params,
+                                current_year=self.action == 'list')
+        if self.action == 'list':
+            return queryset.values(
+                *serializers.MarkListSerializer.values_fields)
 
-        for student in students_queryset:
-            mark_querysets.append(student.marks.filter(subject__name=subject))
+        return queryset.select_related('subject', 'student__student_class')
 
-        queryset = list(chain(*mark_querysets))
+    def get_serializer_class(self):
+        """Return fast or compact serializer for list"""
+        if self.action == 'list':
+            compact = self.request.query_params.get('compact', '')
+            if compact.lower() in ('1', 'true'):
+                return serializers.CompactMarkSerializer
+            return serializers.MarkListSerializer
 
-        return queryset
+        return self.serializer_class
+
+    @action(detail=False)
+    def grid(self, request):
+        """Return journal as students by dates grid of mark values"""
+        student_class = request.query_params.get('student_class', None)
+        subject = request.query_params.get('subject', None)
+
+        students = Student.objects \
+            .filter(student_class__name=student_class) \
+            .order_by('surname', 'name', 'id') \
+            .values('id', 'surname', 'name', 'lastname')
+        student_ids = get_id_list_param(request.query_params, 'student')
+        if student_ids:
+            students = students.filter(id__in=student_ids)
+        marks = filter_marks(filter_by_scope(
+            Mark.objects.for_journal(student_class, subject), request.user),
+            request.query_params, current_year=True) \
+            .order_by('date', 'id') \
+            .values_list('student_id', 'date', 'value')
+
+        cells = {}
+        dates = []
+        for student_id, date, value in marks:
+            if not dates or dates[-1] != date:
+                dates.append(date)
+            cells[(student_id, date)] = value
+
+        rows = [
+            {
+                'student': student,
+                'marks': [cells.get((student['id'], date)) for date in dates],
+            }
+            for student in students
+        ]
+
+        return Response({
+            'student_class': student_class,
+            'subject': subject,
+            'dates': [date.isoformat() for date in dates],
+            'rows': rows,
+        })
+
+    @action(detail=False)
+    def export(self, request):
+        """Stream marks of a class, subject and date range, or enqueue
+        a job writing them to a file with background=1"""
+        output = request.query_params.get('output', 'csv')
+        if output not in export.FORMATS:
+            choices = ', '.join(sorted(export.FORMATS))
+            raise ValidationError({'output': f'Choose one of: {choices}'})
+
+        queryset = filter_marks(filter_by_scope(export.export_queryset(
+            student_class=request.query_params.get('student_class'),
+            subject=request.query_params.get('subject'),
+        ), request.user), request.query_params)
+        background = request.query_params.get('background', '')
+        if background.lower() in ('1', 'true'):
+            job = queue.enqueue('journal.export', {
+                'query': dict(request.query_params.lists()),
+            }, user=request.user)
+            return accepted_response(job, request)
+
+        response = StreamingHttpResponse(
+            export.iter_export(queryset, output),
+            content_type=export.FORMATS[output][1],
+        )
+        response['Content-Disposition'] = \
+            f'attachment; filename="journal.{output}"'
+
+        return response
 
 
-class SchoolViewSet(BaseJournalAttrViewSet):
+class SchoolViewSet(CachedResponseMixin, BaseJournalAttrViewSet):
     """Manage school in the database"""
     queryset = School.objects.all()
     serializer_class = serializers.SchoolSerializer
+    cache_models = (School,)
+
+
+class AnalyticsViewSet(CachedResponseMixin, viewsets.ViewSet):
+    """Report attendance and grade statistics of marks"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+    cache_models = (Mark, Student, StudentClass, Subject)
+
+    def list(self, request):
+        """Return statistics computed by a finished job or enqueue the job
+        computing them"""
+        try:
+            analytics.check_support()
+        except RuntimeError as error:
+            return Response({'detail': str(error)},
+                            status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+        key = self.get_cache_key(request, {})
+        data = get_cache().get(key)
+        if data is not None:
+            return Response(data)
+
+        analytics.select_marks(request.query_params)
+        # The key changes with the data, so a finished job of the same key
+        # holds current statistics, workers may not share the view's cache
+        params = {'query': dict(request.query_params.lists()),
+                  'cache_key': key}
+        job = queue.find('journal.analytics', params, (Job.DONE,))
+        if job is not None:
+            data = job.get_result()
+            get_cache().set(key, data, timeout=self.cache_timeout)
+            return Response(data)
+        job = queue.enqueue('journal.analytics', params, user=request.user,
+                            unique=True)
+
+        return accepted_response(job, request)
+
+
+class CacheStatsView(APIView):
+    """Report journal response cache usage"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        """Return cache hit and miss counters"""
+        return Response(get_stats())
@@ -0,0 +1,13 @@
+from rest_framework import serializers
+
+from core.models import Day
+
+
+class SyncDaySerializer(serializers.ModelSerializer):
+    """Serializer for the day object referencing lessons by id"""
+    lessons = serializers.PrimaryKeyRelatedField(many=True, read_only=True)
+
+    class Meta:
+        model = Day
+        fields = ('id', 'day_of_week', 'lessons')
+        read_only_fields = fields
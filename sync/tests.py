@@ -0,0 +1,128 @@
+import datetime
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core.models import (
+    User,
+    StudyYear,
+    Subject,
+    Mark,
+    StudentClass,
+    Student,
+)
+
+
+SYNC_URL = '/api/sync/'
+
+
+@override_settings(SYNC={'PAGE_SIZE': 2, 'LAG_SECONDS': 5})
+class SyncTests(TestCase):
+    """Clients download changes page by page and then incrementally"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(
+            'teacher@example.com', 'password123'))
+        study_year = StudyYear.objects.create(year=2019)
+        subject = Subject.objects.create(name='Math', study_year=study_year)
+        self.classes = [
+            StudentClass.objects.create(name=name, study_year=study_year)
+            for name in ('5A', '5B')
+        ]
+        self.students = [
+            Student.objects.create(
+                name=f'Name {number}', surname='Surname', lastname='Test',
+                birth_date=datetime.date(2010, 1, 1), address='Address',
+                phone='000', student_class=self.classes[number % 2])
+            for number in range(2)
+        ]
+        self.marks = [
+            Mark.objects.create(student=student, subject=subject,
+                                value='FIV', date=datetime.date(2019, 11, day))
+            for student in self.students
+            for day in range(1, 4)
+        ]
+
+    def sync(self, cursor=None, **params):
+        """Return changes and deleted ids of all pages and the cursor of
+        the next sync"""
+        changes, deleted, pages = {}, {}, 0
+        while True:
+            if cursor:
+                params['since'] = cursor
+            response = self.client.get(SYNC_URL, params)
+            self.assertEqual(response.status_code, 200)
+            pages += 1
+            for name, rows in response.data['changes'].items():
+                changes.setdefault(name, []).extend(
+                    row['id'] for row in rows)
+            for name, ids in response.data['deleted'].items():
+                deleted.setdefault(name, []).extend(ids)
+            cursor = response.data['cursor']
+            if not response.data['more']:
+                return changes, deleted, cursor, pages
+
+    def test_full_download(self):
+        """Test pages together hold every object once"""
+        changes, deleted, cursor, pages = self.sync()
+
+        self.assertEqual(sorted(changes['marks']),
+                         sorted(mark.pk for mark in self.marks))
+        self.assertEqual(sorted(changes['students']),
+                         sorted(student.pk for student in self.students))
+        self.assertEqual(pages, 3)
+        self.assertFalse(any(deleted.values()))
+
+    def test_incremental(self):
+        """Test the next sync returns changed and deleted objects"""
+        changes, deleted, cursor, pages = self.sync()
+        # Stamped before the cursor, as rows of transactions committed
+        # after the previous sync began
+        stamped = timezone.now() - datetime.timedelta(seconds=60)
+        Mark.objects.update(updated_at=stamped)
+        Student.objects.update(updated_at=stamped)
+        changed, removed = self.marks[:2]
+        changed.value = 'TWO'
+        changed.save()
+        removed_id = removed.pk
+        removed.delete()
+
+        changes, deleted, cursor, pages = self.sync(cursor)
+
+        self.assertEqual(changes['marks'], [changed.pk])
+        self.assertEqual(changes['students'], [])
+        self.assertEqual(deleted['marks'], [removed_id])
+
+    def test_lag(self):
+        """Test rows stamped shortly before the cursor are sent again"""
+        changes, deleted, cursor, pages = self.sync()
+        Mark.objects.update(updated_at=timezone.now() - datetime.timedelta(
+            seconds=60))
+        late = self.marks[0]
+        Mark.objects.filter(pk=late.pk).update(
+            updated_at=timezone.now() - datetime.timedelta(seconds=2))
+
+        changes, deleted, cursor, pages = self.sync(cursor)
+
+        self.assertEqual(changes['marks'], [late.pk])
+
+    def test_class_filter(self):
+        """Test marks and students are limited to the class"""
+        changes, deleted, cursor, pages = self.sync(
+            student_class=self.classes[1].pk)
+
+        self.assertEqual(changes['students'], [self.students[1].pk])
+        self.assertEqual(sorted(changes['marks']), sorted(
+            mark.pk for mark in self.marks
+            if mark.student_id == self.students[1].pk))
+
+    def test_invalid(self):
+        """Test malformed cursor and class answer 400"""
+        for params in ({'since': 'garbage'}, {'student_class': 'abc'}):
+            response = self.client.get(SYNC_URL, params)
+
+            self.assertEqual(response.status_code, 400)
+            self.assertIn(next(iter(params)), response.data)
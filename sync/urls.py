@@ -0,0 +1,10 @@
+from django.urls import path
+
+from sync import views
+
+
+app_name = 'sync'
+
+urlpatterns = [
+    path('', views.SyncAPIView.as_view(), name='sync'),
+]
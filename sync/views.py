@@ -0,0 +1,187 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from core.authentication import CachedTokenAuthentication
+from core.models import Event, Lesson, Day, Mark, Student, Tombstone
+from event.serializers import EventSerializer
+from journal.serializers import CompactMarkSerializer, StudentListSerializer
+from sync.serializers import SyncDaySerializer
+from timetable.serializers import LessonSerializer
+
+
+def get_config():
+    """Return sync configuration with defaults applied"""
+    config = {
+        'PAGE_SIZE': 1000,
+        'LAG_SECONDS': 5,
+    }
+    config.update(getattr(settings, 'SYNC', {}))
+
+    return config
+
+
+def encode_cursor(cursor):
+    """Return opaque string of the cursor"""
+    return urlsafe_b64encode(json.dumps(cursor).encode()).decode('ascii')
+
+
+def _parse_time(value):
+    """Return aware datetime of the cursor, raise error if malformed"""
+    time = parse_datetime(value)
+    if time is None or timezone.is_naive(time):
+        raise ValueError(f'Invalid time {value}')
+
+    return time
+
+
+def decode_cursor(value):
+    """Return window start, end, positions reached and finished sources
+    of the opaque cursor, None if it is malformed"""
+    try:
+        cursor = json.loads(urlsafe_b64decode(value.encode('ascii')))
+        since = _parse_time(cursor['s']) if cursor['s'] else None
+        until = _parse_time(cursor['u']) if cursor['u'] else None
+        positions = {
+            name: (_parse_time(time), int(object_id))
+            for name, (time, object_id) in cursor['p'].items()
+        }
+        done = set(cursor['d'])
+    except (TypeError, ValueError, KeyError, AttributeError):
+        return None
+
+    return since, until, positions, done
+
+
+class SyncAPIView(APIView):
+    """Return objects changed since the cursor the client got last time"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        """Return a page of changed and deleted objects and the cursor of
+        the next page, clients call again with it while more is true"""
+        since, until, positions, done = self.get_since(request)
+        if until is None:
+            until = timezone.now()
+        config = get_config()
+        page_size = config['PAGE_SIZE']
+
+        sources = self.get_sources(request)
+        names = {
+            queryset.model._meta.model_name: name
+            for name, (queryset, serializer_class) in sources.items()
+        }
+        if since:
+            sources['deleted'] = (
+                Tombstone.objects.filter(model__in=names),
+                None,
+            )
+
+        changes = {name: [] for name in names.values()}
+        deleted = {name: [] for name in names.values()}
+        for name, (queryset, serializer_class) in sources.items():
+            if name in done:
+                continue
+            field = 'deleted_at' if name == 'deleted' else 'updated_at'
+            queryset = queryset.filter(**{f'{field}__lte': until})
+            if since:
+                queryset = queryset.filter(**{f'{field}__gt': since})
+            if name in positions:
+                time, object_id = positions[name]
+                queryset = queryset.filter(
+                    Q(**{f'{field}__gt': time}) |
+                    Q(**{field: time, 'id__gt': object_id}),
+                    **{f'{field}__gte': time})
+            rows = list(queryset.order_by(field, 'id')[:page_size + 1])
+            if len(rows) > page_size:
+                rows = rows[:page_size]
+                last = rows[-1]
+                if isinstance(last, dict):
+                    time, object_id = last[field], last['id']
+                else:
+                    time, object_id = getattr(last, field), last.id
+                positions[name] = (time, object_id)
+            else:
+                done.add(name)
+
+            if name == 'deleted':
+                for tombstone in rows:
+                    deleted[names[tombstone.model]].append(
+                        tombstone.object_id)
+            else:
+                changes[name] = serializer_class(rows, many=True).data
+
+        more = not done.issuperset(sources)
+        if more:
+            cursor = {
+                's': since.isoformat() if since else None,
+                'u': until.isoformat(),
+                'p': {
+                    name: [time.isoformat(), object_id]
+                    for name, (time, object_id) in positions.items()
+                },
+                'd': sorted(done),
+            }
+        else:
+            # Rows saved in transactions still open are stamped with an
+            # earlier time than their commit, the next sync looks back
+            # LAG_SECONDS to pick them up, clients may get a row twice
+            lag = timedelta(seconds=config['LAG_SECONDS'])
+            cursor = {'s': (until - lag).isoformat(), 'u': None, 'p': {},
+                      'd': []}
+
+        return Response({
+            'cursor': encode_cursor(cursor),
+            'more': more,
+            'changes': changes,
+            'deleted': deleted,
+        })
+
+    def get_sources(self, request):
+        """Return querysets and serializers of synced objects by name"""
+        marks = Mark.objects.values(
+            'updated_at', *CompactMarkSerializer.Meta.fields)
+        students = Student.objects.values(
+            'updated_at', *StudentListSerializer.values_fields)
+        student_class = request.query_params.get('student_class')
+        if student_class:
+            try:
+                student_class = int(student_class)
+            except ValueError:
+                raise ValidationError({'student_class': 'Expected class id'})
+            marks = marks.filter(student__student_class_id=student_class)
+            students = students.filter(student_class_id=student_class)
+
+        return {
+            'marks': (marks, CompactMarkSerializer),
+            'students': (students, StudentListSerializer),
+            'events': (Event.objects.filter(teacher=request.user),
+                       EventSerializer),
+            'lessons': (Lesson.objects.filter(teacher=request.user),
+                        LessonSerializer),
+            'days': (Day.objects.filter(teacher=request.user)
+                     .prefetch_related('lessons'), SyncDaySerializer),
+        }
+
+    def get_since(self, request):
+        """Return decoded cursor given by the client, an empty one for a
+        full download"""
+        value = request.query_params.get('since')
+        if not value:
+            return None, None, {}, set()
+        cursor = decode_cursor(value)
+        if cursor is None:
+            raise ValidationError(
+                {'since': 'Expected cursor returned by previous sync'})
+
+        return cursor
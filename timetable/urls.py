@@ -11,5 +11,6 @@ router.register('days', views.DayViewSet)
 app_name = 'timetable'
 
 urlpatterns = [
+    path('week/', views.WeekAPIView.as_view(), name='week'),
     path('', include(router.urls)),
 ]
@@ -1,20 +1,38 @@
-from rest_framework import viewsets, mixins
-from rest_framework.authentication import TokenAuthentication
+import hashlib
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag
+from rest_framework import viewsets, mixins, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from core.authentication import CachedTokenAuthentication
 from core.models import Lesson, Day
+from core.pagination import LessonPagination
 
 from timetable import serializers
 
 
+def ordered_lessons():
+    """Return prefetch of day lessons ordered by their number"""
+    return Prefetch('lessons',
+                    queryset=Lesson.objects.order_by('number', 'id'))
+
+
 class LessonViewSet(viewsets.GenericViewSet,
                     mixins.ListModelMixin,
                     mixins.CreateModelMixin,):
     """Manage lessons in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Lesson.objects.all()
     serializer_class = serializers.LessonSerializer
+    pagination_class = LessonPagination
 
     def get_queryset(self):
         """Return lessons for current authenticated user"""
@@ -28,15 +46,15 @@ class LessonViewSet(viewsets.GenericViewSet,
 
 class DayViewSet(viewsets.ModelViewSet):
     """Manage days in the database"""
-    authentication_classes = (TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (IsAuthenticated,)
     queryset = Day.objects.all()
     serializer_class = serializers.DaySerializer
 
     def get_queryset(self):
         """Return days for current authenticated user"""
-        return self.queryset.filter(
-            teacher=self.request.user).order_by('id')
+        return self.queryset.filter(teacher=self.request.user) \
+            .prefetch_related(ordered_lessons()).order_by('id')
 
     def get_serializer_class(self):
         """Return appropriate serializer class"""
@@ -48,3 +66,51 @@ class DayViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Create a new day"""
         return serializer.save(teacher=self.request.user)
+
+
+class WeekAPIView(APIView):
+    """Return lessons of the whole week grouped by day"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (IsAuthenticated,)
+
+    def get(self, request):
+        """Return Monday to Saturday timetable of the teacher"""
+        teacher = request.user.pk
+        if request.user.is_staff and request.query_params.get('teacher'):
+            try:
+                teacher = int(request.query_params['teacher'])
+            except ValueError:
+                raise ValidationError({'teacher': 'Expected a user id'})
+
+        days = Day.objects.filter(teacher=teacher) \
+            .prefetch_related(ordered_lessons())
+        lessons = {code: [] for code, name in Day.DAYS_OF_THE_WEEK}
+        for day in days:
+            lessons[day.day_of_week].extend(day.lessons.all())
+
+        data = [
+            {
+                'day_of_week': code,
+                'lessons': serializers.LessonSerializer(
+                    sorted(lessons[code], key=lambda lesson: lesson.number),
+                    many=True,
+                ).data,
+            }
+            for code, name in Day.DAYS_OF_THE_WEEK
+        ]
+
+        content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+        etag = quote_etag(hashlib.md5(content.encode()).hexdigest())
+        # Compression middleware hands out the weak form of the tag
+        etags = [
+            tag[2:] if tag.startswith('W/') else tag
+            for tag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        ]
+        if etag in etags:
+            response = Response(status=status.HTTP_304_NOT_MODIFIED)
+        else:
+            response = Response(data)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+
+        return response
@@ -0,0 +1,180 @@
+import datetime
+import threading
+from unittest import mock
+
+from django.core.cache import caches
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from core import profiling
+from core.models import (
+    User,
+    StudyYear,
+    Subject,
+    Mark,
+    StudentClass,
+    Student,
+    TeacherSubject,
+    Event,
+)
+from user import views
+
+
+DASHBOARD_URL = '/api/user/dashboard/'
+ME_URL = '/api/user/me/'
+
+
+class ManageUserTests(TestCase):
+    """Profile of the teacher loads in a fixed number of queries"""
+
+    def setUp(self):
+        self.client = APIClient()
+        study_year = StudyYear.objects.create(year=2019)
+        self.classes = [
+            StudentClass.objects.create(name=name, study_year=study_year)
+            for name in ('5A', '5B', '5C')
+        ]
+
+    def create_teacher(self, email, subjects):
+        """Create teacher of the subjects, each in all classes"""
+        user = User.objects.create_user(email, 'password123')
+        for number in range(subjects):
+            teacher_subject = TeacherSubject.objects.create(
+                name=f'Subject {number}')
+            teacher_subject.student_classes.add(*self.classes)
+            user.teaching_subjects.add(teacher_subject)
+
+        return user
+
+    def get_profile(self, user):
+        """Return profile of the user and the number of queries run"""
+        self.client.force_authenticate(user)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(ME_URL)
+        self.assertEqual(response.status_code, 200)
+
+        return response.data, len(queries)
+
+    def test_queries(self):
+        """Test the profile takes the same queries for any number of
+        subjects and classes"""
+        small, small_queries = self.get_profile(
+            self.create_teacher('small@example.com', 1))
+        large, large_queries = self.get_profile(
+            self.create_teacher('large@example.com', 4))
+
+        self.assertEqual(len(small['teaching_subjects']), 1)
+        self.assertEqual(len(large['teaching_subjects']), 4)
+        self.assertEqual(
+            len(large['teaching_subjects'][0]['student_classes']), 3)
+        self.assertEqual(small_queries, large_queries)
+        self.assertLessEqual(large_queries, 2)
+
+
+class DashboardTests(TransactionTestCase):
+    """Dashboard sections are built in a limited number of threads"""
+
+    def setUp(self):
+        caches['default'].clear()
+        user = User.objects.create_user('teacher@example.com', 'password123')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+        study_year = StudyYear.objects.create(year=2019)
+        student_class = StudentClass.objects.create(name='5A',
+                                                    study_year=study_year)
+        teacher_subject = TeacherSubject.objects.create(name='Math')
+        teacher_subject.student_classes.add(student_class)
+        user.teaching_subjects.add(teacher_subject)
+        Mark.objects.create(
+            student=Student.objects.create(
+                name='Name', surname='Surname', lastname='Test',
+                birth_date=datetime.date(2010, 1, 1), address='Address',
+                phone='000', student_class=student_class),
+            subject=Subject.objects.create(name='Math',
+                                           study_year=study_year),
+            value='FIV', date=datetime.date(2019, 11, 1))
+        Event.objects.create(
+            title='Meeting', description='Description', teacher=user,
+            date=timezone.now() + datetime.timedelta(days=1))
+        self.threads = set()
+
+    def get_dashboard(self, concurrent):
+        """Return dashboard response, noting threads sections ran in"""
+        serialize = views.DashboardView.serialize
+
+        def record_thread(view, query_data):
+            self.threads.add(threading.current_thread().name)
+            return serialize(view, query_data)
+
+        config = profiling.get_config()
+        with mock.patch.object(views.DashboardView, 'serialize',
+                               record_thread), \
+                mock.patch.object(views, 'can_query_concurrently',
+                                  return_value=concurrent), \
+                override_settings(PROFILING={**config, 'HEADERS': True}):
+            response = self.client.get(DASHBOARD_URL)
+        self.assertEqual(response.status_code, 200)
+
+        return response
+
+    def assert_threads_free(self):
+        """Assert every section thread was given back"""
+        limit = views.get_dashboard_config()['MAX_THREADS']
+        taken = 0
+        while views.section_threads.acquire(blocking=False):
+            taken += 1
+        for _ in range(taken):
+            views.section_threads.release()
+        self.assertEqual(taken, limit)
+
+    def test_threaded(self):
+        """Test sections built in threads match the sequential ones and
+        their queries are counted into the request"""
+        sequential = self.get_dashboard(False)
+        caches['default'].clear()
+        self.threads.clear()
+        threaded = self.get_dashboard(True)
+
+        self.assertTrue(all(name.startswith('dashboard')
+                            for name in self.threads))
+        self.assertEqual(threaded.data, sequential.data)
+        self.assertEqual(len(threaded.data['recent_marks']), 1)
+        self.assertEqual(len(threaded.data['events']), 1)
+        self.assertEqual(threaded['X-Query-Count'],
+                         sequential['X-Query-Count'])
+        self.assert_threads_free()
+
+    def test_no_free_threads(self):
+        """Test sections are built sequentially when all threads are
+        taken by other requests"""
+        limit = views.get_dashboard_config()['MAX_THREADS']
+        for _ in range(limit):
+            views.section_threads.acquire()
+        try:
+            response = self.get_dashboard(True)
+        finally:
+            for _ in range(limit):
+                views.section_threads.release()
+
+        self.assertEqual(self.threads, {threading.current_thread().name})
+        self.assertEqual(len(response.data['recent_marks']), 1)
+        self.assert_threads_free()
+
+    def test_threads_limited(self):
+        """Test a request takes only the threads that are free"""
+        limit = views.get_dashboard_config()['MAX_THREADS']
+        for _ in range(limit - 2):
+            views.section_threads.acquire()
+        try:
+            self.get_dashboard(True)
+        finally:
+            for _ in range(limit - 2):
+                views.section_threads.release()
+
+        self.assertTrue(all(name.startswith('dashboard')
+                            for name in self.threads))
+        self.assertLessEqual(len(self.threads), 2)
+        self.assert_threads_free()
@@ -7,4 +7,5 @@ urlpatterns = [
     path('create/', views.CreateUserView.as_view(), name='create'),
     path('token/', views.CreateTokenView.as_view(), name='token'),
     path('me/', views.ManageUserView.as_view(), name='me'),
+    path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
 ]
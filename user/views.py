@@ -1,10 +1,53 @@
-from rest_framework import generics, authentication, permissions
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Prefetch, prefetch_related_objects
+from django.utils import timezone
+from drf_multiple_model.views import ObjectMultipleModelAPIView
+from rest_framework import generics, permissions
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
+from core.authentication import CachedTokenAuthentication
+from core.models import Day, Event, Mark, StudentClass, TeacherSubject
+from core.profiling import record_queries
+from core.scope import get_teaching_scope, scope_filter
+from event.serializers import EventSerializer
+from journal.serializers import MarkListSerializer, TeacherSubjectSerializer
+from timetable.serializers import DaySerializer
+from timetable.views import ordered_lessons
+
 from user.serializers import UserSerializer, AuthTokenSerializer
 
 
+def get_dashboard_config():
+    """Return dashboard configuration with defaults applied"""
+    config = {
+        'EVENTS': 10,
+        'MARKS': 20,
+        'CONCURRENCY': 4,
+        'MAX_THREADS': 4,
+    }
+    config.update(getattr(settings, 'DASHBOARD', {}))
+
+    return config
+
+
+# Section threads of all requests together, each thread takes a database
+# connection of its own besides the one of its request
+section_threads = threading.BoundedSemaphore(
+    get_dashboard_config()['MAX_THREADS'])
+
+
+def can_query_concurrently():
+    """Tell whether other threads may read what this request sees,
+    it is not so inside a transaction or with SQLite"""
+    return connection.vendor != 'sqlite' and not connection.in_atomic_block
+
+
 class CreateUserView(generics.CreateAPIView):
     """Create a new user in the system"""
     serializer_class = UserSerializer
@@ -19,9 +62,116 @@ class CreateTokenView(ObtainAuthToken):
 class ManageUserView(generics.RetrieveUpdateAPIView):
     """Manage the authenticated user"""
     serializer_class = UserSerializer
-    authentication_classes = (authentication.TokenAuthentication,)
+    authentication_classes = (CachedTokenAuthentication,)
     permission_classes = (permissions.IsAuthenticated,)
 
     def get_object(self):
-        """Retrieve and return authenticated user"""
-        return self.request.user
+        """Retrieve authenticated user with subjects and their classes"""
+        user = self.request.user
+        prefetch_related_objects([user], Prefetch(
+            'teaching_subjects',
+            queryset=TeacherSubject.objects.order_by('name', 'id')
+            .prefetch_related(Prefetch(
+                'student_classes',
+                queryset=StudentClass.objects.order_by('name', 'id'),
+            )),
+        ))
+
+        return user
+
+
+class DashboardView(ObjectMultipleModelAPIView):
+    """Return everything the app shows on launch in one response"""
+    authentication_classes = (CachedTokenAuthentication,)
+    permission_classes = (permissions.IsAuthenticated,)
+    pagination_class = None
+
+    def get_querylist(self):
+        """Return sections of today's lessons, upcoming events, teaching
+        subjects with their classes and recent marks in these classes"""
+        user = self.request.user
+        config = get_dashboard_config()
+        now = timezone.now()
+        weekday = timezone.localdate().weekday()
+        day_codes = [code for code, name in Day.DAYS_OF_THE_WEEK]
+        today = day_codes[weekday] if weekday < len(day_codes) else None
+
+        return (
+            {
+                'label': 'today',
+                'queryset': Day.objects
+                .filter(teacher=user, day_of_week=today)
+                .prefetch_related(ordered_lessons()).order_by('id'),
+                'serializer_class': DaySerializer,
+            },
+            {
+                'label': 'events',
+                'queryset': Event.objects
+                .filter(teacher=user, date__gte=now)
+                .order_by('date', 'id')[:config['EVENTS']],
+                'serializer_class': EventSerializer,
+            },
+            {
+                'label': 'teaching_subjects',
+                'queryset': user.teaching_subjects
+                .prefetch_related(Prefetch(
+                    'student_classes',
+                    queryset=StudentClass.objects.order_by('name', 'id'),
+                )).order_by('name', 'id'),
+                'serializer_class': TeacherSubjectSerializer,
+            },
+            {
+                'label': 'recent_marks',
+                'queryset': Mark.objects
+                .filter(scope_filter(get_teaching_scope(user.pk)))
+                .order_by('-updated_at', '-id')
+                .values(*MarkListSerializer.values_fields)
+                [:config['MARKS']],
+                'serializer_class': MarkListSerializer,
+            },
+        )
+
+    def list(self, request, *args, **kwargs):
+        """Serialize sections, in parallel threads if the database allows
+        and section threads are free, otherwise one after another"""
+        querylist = self.get_querylist()
+        workers = 0
+        if can_query_concurrently():
+            limit = min(get_dashboard_config()['CONCURRENCY'], len(querylist))
+            while workers < limit and section_threads.acquire(blocking=False):
+                workers += 1
+        try:
+            if workers > 1:
+                with ThreadPoolExecutor(
+                        max_workers=workers,
+                        thread_name_prefix='dashboard') as pool:
+                    sections = list(pool.map(self.serialize_in_thread,
+                                             querylist))
+            else:
+                sections = list(map(self.serialize, querylist))
+        finally:
+            for _ in range(workers):
+                section_threads.release()
+
+        results = self.get_empty_results()
+        for query_data, data in zip(querylist, sections):
+            results = self.add_to_results(data, query_data['label'], results)
+
+        return Response(self.format_results(results, request))
+
+    def serialize(self, query_data):
+        """Return serialized data of a section"""
+        self.check_query_data(query_data)
+        queryset = self.load_queryset(query_data, self.request)
+
+        return query_data['serializer_class'](
+            queryset, many=True, context=self.get_serializer_context()).data
+
+    def serialize_in_thread(self, query_data):
+        """Serialize a section counting its queries into the request
+        profile and releasing the connection of the thread"""
+        try:
+            with record_queries(self.request):
+                return self.serialize(query_data)
+        finally:
+            connection.close()